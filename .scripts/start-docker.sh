@@ -2,7 +2,8 @@
 set -e
 
 echo "Removing existing containers..."
-docker-compose down --remove-orphans -v
+# No -v: that would also delete the upstream_cache volume
+docker-compose down --remove-orphans
 
 echo "Building and starting containers..."
 docker-compose up --build -d
@@ -6,5 +6,16 @@ echo "Starting Django application..."
 # Run migrations
 python manage.py migrate
 
-# Start Gunicorn
-gunicorn --bind 0.0.0.0:8000 House_Price_Prediction.wsgi:application --workers 3
+# Hashed, pre-compressed static files (served by the app)
+python manage.py collectstatic --noinput
+
+# Comparable-sales index, built once here so the workers only load it
+python manage.py build_comparables_index || echo "Comparables index not built; workers will build it on first use"
+
+# Model server shared by the gunicorn workers (only when MODEL_SERVER_SOCKET is set)
+python manage.py run_model_server --if-configured &
+
+# Start Gunicorn; threaded workers keep API client connections alive between requests.
+# WEB_CONCURRENCY also tells each worker its share of the CPUs for inference threads.
+export WEB_CONCURRENCY=${WEB_CONCURRENCY:-3}
+gunicorn --bind 0.0.0.0:8000 House_Price_Prediction.wsgi:application --workers "$WEB_CONCURRENCY" --threads 4 --keep-alive 5
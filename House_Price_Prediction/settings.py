@@ -76,6 +76,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "price_prediction.middleware.StaticFilesMiddleware",
+    "price_prediction.middleware.MetricsMiddleware",
+    "price_prediction.middleware.ProfilingMiddleware",
+    "price_prediction.middleware.ApiCompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -155,6 +159,14 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
+# collectstatic writes content-hashed copies plus .gz/.br siblings, and the
+# app serves them with immutable caching (price_prediction.static_assets).
+# Set STATIC_SERVE=False when a web server in front serves STATIC_ROOT.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "price_prediction.static_assets.CompressedManifestStaticFilesStorage"},
+}
+STATIC_SERVE = get_setting(ENV, 'STATIC_SERVE', default=not DEBUG)
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -168,6 +180,151 @@ GOOGLE_MAPS_API_KEY = get_setting(ENV, 'GOOGLE_MAPS_API_KEY',
 # Ensure it's a string and strip whitespace
 if GOOGLE_MAPS_API_KEY:
     GOOGLE_MAPS_API_KEY = str(GOOGLE_MAPS_API_KEY).strip()
+
+# Upstream time budget per request (Overpass, Photon, Nominatim, Google).
+# Clients may ask for a different budget with X-Request-Budget-Ms, capped here.
+UPSTREAM_BUDGET_SEC = float(get_setting(ENV, 'UPSTREAM_BUDGET_SEC', default=5.0))
+UPSTREAM_BUDGET_MAX_SEC = float(get_setting(ENV, 'UPSTREAM_BUDGET_MAX_SEC', default=10.0))
+
+# Upstream endpoints. Setting UPSTREAM_SIMULATOR_URL (settings.ini or the
+# environment) points all of them at `manage.py simulate_upstreams` for load
+# tests, and keeps the simulated answers out of the persistent cache.
+OVERPASS_ENDPOINTS = get_setting(ENV, 'OVERPASS_ENDPOINTS', default=[
+    "https://overpass.kumi.systems/api/interpreter",
+    "https://lz4.overpass-api.de/api/interpreter",
+    "https://overpass-api.de/api/interpreter",
+    "https://overpass.osm.ch/api/interpreter",
+])
+if isinstance(OVERPASS_ENDPOINTS, str):
+    OVERPASS_ENDPOINTS = [OVERPASS_ENDPOINTS]
+PHOTON_URL = get_setting(ENV, 'PHOTON_URL', default="https://photon.komoot.io/api/")
+NOMINATIM_URL = get_setting(ENV, 'NOMINATIM_URL', default="https://nominatim.openstreetmap.org")
+GOOGLE_DISTANCE_MATRIX_URL = get_setting(ENV, 'GOOGLE_DISTANCE_MATRIX_URL',
+    default="https://maps.googleapis.com/maps/api/distancematrix/json")
+UPSTREAM_SIMULATOR_URL = os.environ.get('UPSTREAM_SIMULATOR_URL') or get_setting(ENV, 'UPSTREAM_SIMULATOR_URL', default='')
+if UPSTREAM_SIMULATOR_URL:
+    _simulator = str(UPSTREAM_SIMULATOR_URL).rstrip('/')
+    OVERPASS_ENDPOINTS = [f"{_simulator}/overpass/{i}/api/interpreter" for i in range(len(OVERPASS_ENDPOINTS))]
+    PHOTON_URL = f"{_simulator}/photon/api/"
+    NOMINATIM_URL = f"{_simulator}/nominatim"
+    GOOGLE_DISTANCE_MATRIX_URL = f"{_simulator}/google/maps/api/distancematrix/json"
+    GOOGLE_MAPS_API_KEY = GOOGLE_MAPS_API_KEY or 'simulator'
+
+# Amenity prefetch: reverse-geocode/search results warm the amenity cache in
+# the background so the follow-up amenities request is usually a cache hit.
+AMENITY_PREFETCH_ENABLED = get_setting(ENV, 'AMENITY_PREFETCH_ENABLED', default=True)
+AMENITY_PREFETCH_MAX_CONCURRENT = int(get_setting(ENV, 'AMENITY_PREFETCH_MAX_CONCURRENT', default=2))
+
+# Photon amenity fallback: stop once every bucket has this many places, and
+# keep at most this many Photon queries in flight per lookup.
+PHOTON_MIN_RESULTS_PER_BUCKET = int(get_setting(ENV, 'PHOTON_MIN_RESULTS_PER_BUCKET', default=3))
+PHOTON_MAX_PARALLEL = int(get_setting(ENV, 'PHOTON_MAX_PARALLEL', default=5))
+
+# Persistent upstream response cache (SQLite, WAL mode) under the in-memory
+# amenity/geocoding/distance caches so restarts do not start cold. It has to
+# live outside the image to survive redeploys: docker-compose.yaml mounts the
+# upstream_cache volume and sets UPSTREAM_CACHE_PATH in the environment.
+UPSTREAM_CACHE_ENABLED = get_setting(ENV, 'UPSTREAM_CACHE_ENABLED', default=True) and not UPSTREAM_SIMULATOR_URL
+UPSTREAM_CACHE_PATH = get_setting(
+    ENV, 'UPSTREAM_CACHE_PATH', default=os.environ.get('UPSTREAM_CACHE_PATH') or BASE_DIR / 'upstream_cache.sqlite3'
+)
+UPSTREAM_CACHE_WARM_KEYS = int(get_setting(ENV, 'UPSTREAM_CACHE_WARM_KEYS', default=100))
+# Seconds each namespace stays valid on disk
+UPSTREAM_CACHE_TTLS = {
+    'amenities': int(get_setting(ENV, 'UPSTREAM_CACHE_TTL_AMENITIES', default=6 * 3600)),
+    'amenity_buckets': int(get_setting(ENV, 'UPSTREAM_CACHE_TTL_AMENITY_BUCKETS', default=24 * 3600)),
+    'reverse_geocode': int(get_setting(ENV, 'UPSTREAM_CACHE_TTL_REVERSE_GEOCODE', default=7 * 24 * 3600)),
+    'location_search': int(get_setting(ENV, 'UPSTREAM_CACHE_TTL_LOCATION_SEARCH', default=24 * 3600)),
+    'distance': int(get_setting(ENV, 'UPSTREAM_CACHE_TTL_DISTANCE', default=3600)),
+}
+
+# Load (or build) the comparable-sales index in the background at startup.
+COMPARABLES_WARM_ON_STARTUP = get_setting(ENV, 'COMPARABLES_WARM_ON_STARTUP', default=True)
+
+# Metrics exported at /metrics (Prometheus text format). Each process writes
+# its values to METRICS_DIR, which all gunicorn workers must share (management
+# commands use METRICS_DIR/<command>); set METRICS_TOKEN to require
+# "Authorization: Bearer <token>" on scrapes.
+METRICS_ENABLED = get_setting(ENV, 'METRICS_ENABLED', default=True)
+METRICS_DIR = get_setting(ENV, 'METRICS_DIR', default=os.environ.get('METRICS_DIR', ''))
+METRICS_FLUSH_SEC = float(get_setting(ENV, 'METRICS_FLUSH_SEC', default=1.0))
+METRICS_TOKEN = get_setting(ENV, 'METRICS_TOKEN', default=os.environ.get('METRICS_TOKEN', ''))
+
+# On-demand request profiling (stack sampler, tracemalloc, RSS), browsable
+# in the admin under Request profiles. Off by default; when off the
+# middleware drops out of the stack. A request is profiled when chosen at
+# PROFILING_SAMPLE_RATE or when it sends "X-Profile-Request: <PROFILING_TOKEN>".
+PROFILING_ENABLED = get_setting(ENV, 'PROFILING_ENABLED', default=False)
+PROFILING_SAMPLE_RATE = float(get_setting(ENV, 'PROFILING_SAMPLE_RATE', default=0.0))
+PROFILING_TOKEN = get_setting(ENV, 'PROFILING_TOKEN', default=os.environ.get('PROFILING_TOKEN', ''))
+PROFILING_EXCLUDE_PATHS = get_setting(ENV, 'PROFILING_EXCLUDE_PATHS', default=['/admin/', '/static/', '/metrics'])
+if isinstance(PROFILING_EXCLUDE_PATHS, str):
+    PROFILING_EXCLUDE_PATHS = [PROFILING_EXCLUDE_PATHS]
+PROFILING_INTERVAL_MS = float(get_setting(ENV, 'PROFILING_INTERVAL_MS', default=5))
+PROFILING_TRACEMALLOC_FRAMES = int(get_setting(ENV, 'PROFILING_TRACEMALLOC_FRAMES', default=1))
+PROFILING_TOP_N = int(get_setting(ENV, 'PROFILING_TOP_N', default=30))
+PROFILING_DIR = get_setting(ENV, 'PROFILING_DIR', default=BASE_DIR / 'request_profiles')
+PROFILING_MAX_PROFILES = int(get_setting(ENV, 'PROFILING_MAX_PROFILES', default=200))
+PROFILING_RETENTION_DAYS = float(get_setting(ENV, 'PROFILING_RETENTION_DAYS', default=7))
+
+# Rendered-page cache for the portfolio home page and the empty prediction
+# form (see price_prediction.page_cache): pre-compressed bodies, ETag and
+# Last-Modified, 304 on conditional GETs.
+PAGE_CACHE_ENABLED = get_setting(ENV, 'PAGE_CACHE_ENABLED', default=True)
+PAGE_CACHE_MAX_ENTRIES = int(get_setting(ENV, 'PAGE_CACHE_MAX_ENTRIES', default=16))
+PAGE_CACHE_CONTROL = get_setting(ENV, 'PAGE_CACHE_CONTROL', default='no-cache')
+if isinstance(PAGE_CACHE_CONTROL, list):
+    PAGE_CACHE_CONTROL = ', '.join(PAGE_CACHE_CONTROL)
+
+# JSON API responses (price_prediction.api_response): bodies of at least
+# API_COMPRESS_MIN_BYTES are sent brotli/gzip-compressed when accepted.
+API_COMPRESSION_ENABLED = get_setting(ENV, 'API_COMPRESSION_ENABLED', default=True)
+API_COMPRESS_MIN_BYTES = int(get_setting(ENV, 'API_COMPRESS_MIN_BYTES', default=1024))
+API_GZIP_LEVEL = int(get_setting(ENV, 'API_GZIP_LEVEL', default=6))
+API_BROTLI_QUALITY = int(get_setting(ENV, 'API_BROTLI_QUALITY', default=4))
+# Decimal places kept for coordinates in ?compact=1 responses (5 ≈ 1 m).
+API_COMPACT_COORD_DECIMALS = int(get_setting(ENV, 'API_COMPACT_COORD_DECIMALS', default=5))
+
+# Versioned prediction API (price_prediction.api, /house-price-prediction/api/v1/).
+# JSON in and out only, and no authentication classes: the API carries no
+# session, so no session lookup or CSRF check runs per request.
+REST_FRAMEWORK = {
+    "DEFAULT_VERSIONING_CLASS": "rest_framework.versioning.URLPathVersioning",
+    "ALLOWED_VERSIONS": ("v1",),
+    "DEFAULT_RENDERER_CLASSES": ("price_prediction.renderers.FastJSONRenderer",),
+    "DEFAULT_PARSER_CLASSES": ("price_prediction.renderers.FastJSONParser",),
+    "DEFAULT_AUTHENTICATION_CLASSES": (),
+    "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.AllowAny",),
+    "UNAUTHENTICATED_USER": None,
+}
+
+# Model server (price_prediction.model_server, `manage.py run_model_server`):
+# one process holds the model and scores for every gunicorn worker over this
+# Unix socket, batching their requests together. Unset, each worker loads its
+# own model. Workers predict in-process when the server is unreachable or
+# slower than MODEL_SERVER_TIMEOUT_SEC, and retry it after MODEL_SERVER_RETRY_SEC.
+MODEL_SERVER_SOCKET = get_setting(ENV, 'MODEL_SERVER_SOCKET', default='')
+MODEL_SERVER_TIMEOUT_SEC = float(get_setting(ENV, 'MODEL_SERVER_TIMEOUT_SEC', default=5.0))
+MODEL_SERVER_RETRY_SEC = float(get_setting(ENV, 'MODEL_SERVER_RETRY_SEC', default=30.0))
+MODEL_SERVER_MAX_BATCH_ROWS = int(get_setting(ENV, 'MODEL_SERVER_MAX_BATCH_ROWS', default=4096))
+MODEL_SERVER_BATCH_WAIT_MS = float(get_setting(ENV, 'MODEL_SERVER_BATCH_WAIT_MS', default=1.0))
+# How often workers and the model server check ML_Files/model_config.pkl for a
+# newly published model and reload it (a negative value never reloads).
+MODEL_RELOAD_CHECK_SEC = float(get_setting(ENV, 'MODEL_RELOAD_CHECK_SEC', default=5.0))
+
+# Native thread budget for inference (price_prediction.thread_budget): each
+# web worker gets CPUs / workers threads for XGBoost and BLAS (the model
+# server gets all CPUs), with CPUs capped by the cgroup quota. Workers are
+# THREAD_BUDGET_WEB_WORKERS, else WEB_CONCURRENCY. A model call uses one thread
+# per THREAD_BUDGET_ROWS_PER_THREAD rows, up to the budget.
+THREAD_BUDGET_ENABLED = get_setting(ENV, 'THREAD_BUDGET_ENABLED', default=True)
+THREAD_BUDGET_WEB_WORKERS = int(get_setting(ENV, 'THREAD_BUDGET_WEB_WORKERS', default=0))
+THREAD_BUDGET_INFERENCE_THREADS = int(get_setting(ENV, 'THREAD_BUDGET_INFERENCE_THREADS', default=0))
+THREAD_BUDGET_ROWS_PER_THREAD = int(get_setting(ENV, 'THREAD_BUDGET_ROWS_PER_THREAD', default=256))
+
+# Most recent predictions (with their explanations) kept in memory per process.
+PREDICTION_CACHE_SIZE = int(get_setting(ENV, 'PREDICTION_CACHE_SIZE', default=4096))
+
 # CSRF Trusted Origins
 CSRF_TRUSTED_ORIGINS = [
     "https://3.110.11.96",
@@ -18,8 +18,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from price_prediction import views as price_prediction_views
+
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", price_prediction_views.metrics_export, name="metrics"),
     path("", include("portfolio.urls")),
     path("house-price-prediction/", include("price_prediction.urls")),
 ]
@@ -7,6 +7,10 @@ import sys
 def main():
     """Run administrative tasks."""
     os.environ.setdefault("DJANGO_SETTINGS_MODULE", "House_Price_Prediction.settings")
+    # Commands record metrics apart from the web workers (runserver is a web worker);
+    # subprocesses a command starts inherit its source.
+    if len(sys.argv) > 1 and sys.argv[1] != "runserver":
+        os.environ.setdefault("METRICS_SOURCE", sys.argv[1])
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
@@ -1,9 +1,15 @@
-from django.shortcuts import render
+from price_prediction import page_cache
 
 
 def portfolio_home(request):
     """Portfolio homepage showcasing profile, experience, and projects."""
-    context = {
+    # Static content: rendered once per process by the page cache.
+    return page_cache.render_page(request, 'portfolio/home.html', get_portfolio_context)
+
+
+def get_portfolio_context():
+    """Profile, skills, experience and projects shown on the homepage."""
+    return {
         'name': 'Md Ali Raza',
         'title': 'AI & Backend Engineer',
         'tagline': 'Python · FastAPI · LLM · Django · AWS · Microservices',
@@ -228,4 +234,3 @@ def portfolio_home(request):
             {'value': 4, 'suffix': '', 'label': 'AI/LLM Systems'},
         ],
     }
-    return render(request, 'portfolio/home.html', context)
@@ -1,3 +1,97 @@
 from django.contrib import admin
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
 
-# Register your models here.
+from .models import RequestProfile
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    """Profiles written by ProfilingMiddleware; read-only apart from deleting."""
+
+    list_display = ('created_at', 'method', 'path', 'view_name', 'status_code', 'wall_ms', 'cpu_ms',
+                    'alloc_peak_kb', 'rss_delta_kb', 'trigger', 'pid')
+    list_filter = ('trigger', 'view_name', 'method', 'status_code')
+    search_fields = ('path', 'view_name')
+    date_hierarchy = 'created_at'
+    fields = ('created_at', 'method', 'path', 'view_name', 'status_code', 'trigger', 'pid', 'timings',
+              'downloads', 'top_functions', 'top_allocations')
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def delete_queryset(self, request, queryset):
+        # One by one so each profile's file goes with its row.
+        for record in queryset:
+            record.delete()
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/stacks.txt', self.admin_site.admin_view(self.stacks_view),
+                 name='price_prediction_requestprofile_stacks'),
+            path('<int:pk>/profile.json', self.admin_site.admin_view(self.json_view),
+                 name='price_prediction_requestprofile_json'),
+        ] + super().get_urls()
+
+    def _profile(self, pk):
+        data = get_object_or_404(RequestProfile, pk=pk).load()
+        if data is None:
+            raise Http404("Profile file is missing")
+        return data
+
+    def stacks_view(self, request, pk):
+        """Collapsed stacks, one "frame;frame;... count" per line (flamegraph.pl, speedscope)."""
+        stacks = self._profile(pk)['sampler']['stacks']
+        body = ''.join(f'{stack} {count}\n' for stack, count in stacks.items())
+        return HttpResponse(body, content_type='text/plain; charset=utf-8')
+
+    def json_view(self, request, pk):
+        return JsonResponse(self._profile(pk))
+
+    @admin.display(description="Timings")
+    def timings(self, obj):
+        data = obj.load() or {}
+        rss = data.get('rss', {})
+        return format_html(
+            "wall {} ms, request thread CPU {} ms, process CPU {} ms; {} samples every {} ms; "
+            "traced peak {} KiB; RSS {} → {} KiB",
+            obj.wall_ms, obj.cpu_ms, data.get('process_cpu_ms', '—'), obj.samples,
+            data.get('sampler', {}).get('interval_ms', '—'), obj.alloc_peak_kb,
+            rss.get('before_kb', '—'), rss.get('after_kb', '—'),
+        )
+
+    @admin.display(description="Downloads")
+    def downloads(self, obj):
+        return format_html(
+            '<a href="{}">collapsed stacks</a> · <a href="{}">full profile (JSON)</a>',
+            reverse('admin:price_prediction_requestprofile_stacks', args=[obj.pk]),
+            reverse('admin:price_prediction_requestprofile_json', args=[obj.pk]),
+        )
+
+    @admin.display(description="Top functions (samples)")
+    def top_functions(self, obj):
+        rows = (obj.load() or {}).get('sampler', {}).get('top_functions', [])
+        if not rows:
+            return "No samples (request shorter than the sampling interval)"
+        return format_html(
+            "<table><tr><th>self</th><th>total</th><th>function</th></tr>{}</table>",
+            format_html_join('', "<tr><td>{}</td><td>{}</td><td>{}</td></tr>",
+                             ((r['self'], r['total'], r['function']) for r in rows)),
+        )
+
+    @admin.display(description="Top allocations (still held at the end)")
+    def top_allocations(self, obj):
+        rows = (obj.load() or {}).get('allocations', {}).get('top', [])
+        if not rows:
+            return "—"
+        return format_html(
+            "<table><tr><th>KiB</th><th>blocks</th><th>line</th></tr>{}</table>",
+            format_html_join('', "<tr><td>{}</td><td>{}</td><td>{}</td></tr>",
+                             ((r['size_kb'], r['count'], r['where']) for r in rows)),
+        )
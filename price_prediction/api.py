@@ -0,0 +1,88 @@
+"""
+Versioned JSON prediction API (/house-price-prediction/api/v1/...), built
+on Django REST framework for programmatic clients.
+
+POST /api/v1/predict/ takes one property object or a list of them, with
+the prediction form's fields. A single object is validated by
+PropertySerializer; a list is validated in one vectorized pass by
+PropertyListSerializer and priced in one model call, valid items getting a
+price and invalid ones their field errors, so one bad row doesn't fail a
+batch. ?tier=, ?latency_budget_ms= and ?explain=1 work as on /api/estimate/;
+without them the full tier is used.
+
+These views render and parse JSON only, with orjson (renderers.py; there
+is no browsable API and so no template rendering), and have no
+authentication classes, so no session lookup or CSRF check runs per
+request.
+"""
+
+import time
+
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .serializers import MAX_ITEMS, PropertySerializer
+from .utils import PREDICTION_TIERS, estimate_prices, get_property_types
+from .views import _truthy, format_price, get_prediction_tier, prepare_model_input
+
+
+class PredictionView(APIView):
+    """Price one property or a list of properties."""
+
+    def post(self, request, version=None):
+        started = time.perf_counter()
+        try:
+            tier, tier_settings = get_prediction_tier(request.query_params, default='full')
+        except (ValueError, TypeError) as e:
+            return Response({'errors': {'tier': [str(e)]}}, status=status.HTTP_400_BAD_REQUEST)
+        explain = _truthy(request.query_params.get('explain', ''))
+        data = request.data
+
+        if isinstance(data, list):
+            if not data:
+                return Response({'errors': {'non_field_errors': ["Expected a non-empty list of properties"]}},
+                                status=status.HTTP_400_BAD_REQUEST)
+            if len(data) > MAX_ITEMS:
+                return Response({'errors': {'non_field_errors': [f"At most {MAX_ITEMS} properties per request"]}},
+                                status=status.HTTP_400_BAD_REQUEST)
+            validated, errors = PropertySerializer(many=True).validate_items(data)
+        else:
+            serializer = PropertySerializer(data=data)
+            if not serializer.is_valid():
+                return Response({'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+            validated, errors = {0: serializer.validated_data}, {}
+
+        positions = sorted(validated)
+        estimates = []
+        if positions:
+            rows = [prepare_model_input(validated[i]) for i in positions]
+            estimates = estimate_prices(rows, tier=tier, explain=explain)
+        priced = {}
+        for i, estimate in zip(positions, estimates):
+            estimate['formatted_price'] = format_price(estimate['price'])
+            priced[i] = estimate
+
+        payload = {'tier': tier, 'rounds': tier_settings['rounds']}
+        if isinstance(data, list):
+            payload['results'] = [priced[i] if i in priced else {'errors': errors[i]} for i in range(len(data))]
+            payload['valid'] = len(priced)
+            payload['invalid'] = len(errors)
+        else:
+            payload.update(priced[0])
+        payload['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        response = Response(payload, status=status.HTTP_200_OK if priced else status.HTTP_400_BAD_REQUEST)
+        response['X-Prediction-Tier'] = tier
+        return response
+
+
+class PredictionOptionsView(APIView):
+    """Values clients need to build requests: property types and tiers."""
+
+    def get(self, request, version=None):
+        return Response({
+            'version': request.version,
+            'property_types': sorted(get_property_types()),
+            'tiers': list(PREDICTION_TIERS),
+            'max_items': MAX_ITEMS,
+        })
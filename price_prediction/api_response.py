@@ -0,0 +1,107 @@
+"""
+JSON responses for the /api/ views.
+
+ApiJsonResponse encodes with orjson when it is installed (several times
+faster than the stdlib encoder on the amenity and distance payloads) and
+falls back to json for anything orjson rejects. The time spent encoding is
+kept on the response; ApiCompressionMiddleware reports it with the bytes
+sent, after compressing bodies above API_COMPRESS_MIN_BYTES with brotli or
+gzip as the client accepts.
+
+Clients that ask for ?compact=1 get the compact schemas below: amenity
+places flattened to name/lat/lng with coordinates rounded and the always-
+zero rating fields dropped, and Distance Matrix elements reduced to
+metres/seconds without the display text.
+"""
+
+import gzip
+import json
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content encodings ApiCompressionMiddleware can produce.
+ENCODINGS = ('identity', 'gzip', 'br') if brotli is not None else ('identity', 'gzip')
+
+
+def dumps(data):
+    """data as UTF-8 JSON bytes."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+class ApiJsonResponse(HttpResponse):
+    """JsonResponse with the fast encoder; any object is allowed, not just dicts."""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        start = time.perf_counter()
+        content = dumps(data)
+        self.json_encode_seconds = time.perf_counter() - start
+        super().__init__(content=content, **kwargs)
+
+
+def compress_body(body, coding):
+    """Compress on the fly: levels chosen for speed, since each body is sent once."""
+    if coding == 'br':
+        return brotli.compress(body, quality=int(getattr(settings, 'API_BROTLI_QUALITY', 4)), mode=brotli.MODE_TEXT)
+    return gzip.compress(body, compresslevel=int(getattr(settings, 'API_GZIP_LEVEL', 6)), mtime=0)
+
+
+def wants_compact(request):
+    return str(request.GET.get('compact', '')).lower() in ('1', 'true', 'yes', 'on')
+
+
+def _coord(value):
+    return round(float(value), int(getattr(settings, 'API_COMPACT_COORD_DECIMALS', 5)))
+
+
+def compact_amenities(payload):
+    """Amenities payload with each place as {"name", "lat", "lng"}."""
+    results = {}
+    for key, bucket in (payload.get('results') or {}).items():
+        places = []
+        for place in bucket.get('results') or []:
+            location = (place.get('geometry') or {}).get('location') or {}
+            if location.get('lat') is None or location.get('lng') is None:
+                continue
+            places.append({'name': place.get('name'), 'lat': _coord(location['lat']),
+                           'lng': _coord(location['lng'])})
+        results[key] = {'status': bucket.get('status'), 'results': places}
+    return dict(payload, results=results)
+
+
+def compact_distance_matrix(data):
+    """Distance Matrix body as rows of {"status", "distance_m", "duration_s"} elements."""
+    if not data:
+        return data
+    rows = []
+    for row in data.get('rows') or []:
+        elements = []
+        for element in row.get('elements') or []:
+            elements.append({
+                'status': element.get('status'),
+                'distance_m': (element.get('distance') or {}).get('value'),
+                'duration_s': (element.get('duration') or {}).get('value'),
+            })
+        rows.append({'elements': elements})
+    compact = {'status': data.get('status'), 'rows': rows}
+    if data.get('error_message'):
+        compact['error_message'] = data['error_message']
+    return compact
@@ -1,6 +1,22 @@
+import threading
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class PricePredictionConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "price_prediction"
+
+    def ready(self):
+        # Load the comparables index off the request path, in web processes only
+        # (start.sh builds it once before gunicorn; commands load it on demand).
+        from .metrics import WEB_SOURCE, current_source
+        if getattr(settings, 'COMPARABLES_WARM_ON_STARTUP', True) and current_source() == WEB_SOURCE:
+            from .comparables import get_index
+            threading.Thread(target=get_index, name="comparables-warm", daemon=True).start()
+
+        # Size this process's native thread pools (redone in each worker after a fork).
+        from .thread_budget import enabled, get_budget
+        if enabled():
+            get_budget()
@@ -0,0 +1,485 @@
+"""
+Benchmarks for the inference and amenity hot paths.
+
+Each benchmark is a setup function registered with @benchmark. It prepares
+its inputs, returns the callable to time plus how many operations one call
+performs, and registers any cleanup on the ExitStack it is given. The
+runner calls it a few times to warm up, then times `repeat` calls and
+reports per-call and per-operation statistics. Results are plain JSON so
+runs from two commits can be compared (see compare()).
+
+Upstream providers are stubbed with canned payloads (upstream_payloads)
+and the views get memory-only caches, so view timings measure this code
+rather than Overpass or Google, and nothing is written to the persistent
+upstream cache.
+"""
+
+import platform
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from itertools import count
+from pathlib import Path
+from unittest import mock
+from urllib.parse import urlparse
+
+import numpy as np
+from django.conf import settings
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from . import upstream_payloads, utils, views
+from .upstream_cache import PersistentStore, TieredCache
+
+SAMPLE_INPUT = {
+    'number of bedrooms': 3,
+    'number of bathrooms': 2.0,
+    'living area': 1800,
+    'lot area': 5000,
+    'floor': 1,
+    'property_type': 'Flat',
+    'Lattitude': 52.9,
+    'Longitude': -114.5,
+}
+SAMPLE_FORM = {
+    'bedrooms': 3, 'bathrooms': 2, 'living_area': 1800, 'lot_area': 5000, 'floor': 1,
+    'property_type': 'Flat', 'latitude': 52.9, 'longitude': -114.5,
+}
+# Amenity lookups are benchmarked around this point (central Bengaluru).
+AMENITY_POINT = (12.9716, 77.5946)
+
+BENCHMARKS = {}
+
+
+class Skip(Exception):
+    """Raised by a setup function when the benchmark cannot run here."""
+
+
+def benchmark(name, group):
+    def register(setup):
+        BENCHMARKS[name] = (group, setup)
+        return setup
+    return register
+
+
+def _require_model():
+    if not (utils.get_ml_files_path() / 'best_house_price_model.pkl').exists():
+        raise Skip("no trained model in ML_Files (run train_price_model)")
+
+
+def _reset_model_cache():
+    for key in utils._model_cache:
+        utils._model_cache[key] = None
+    utils._prediction_cache.clear()
+
+
+# --- Inference -------------------------------------------------------------
+
+@benchmark('model.load_cold', 'inference')
+def _bench_load_cold(stack, options):
+    _require_model()
+
+    def run():
+        _reset_model_cache()
+        utils.load_model_artifacts()
+    return run, 1
+
+
+@benchmark('predict.cold', 'inference')
+def _bench_predict_cold(stack, options):
+    _require_model()
+
+    def run():
+        _reset_model_cache()
+        utils.predict_house_price(SAMPLE_INPUT)
+    return run, 1
+
+
+@benchmark('predict.warm', 'inference')
+def _bench_predict_warm(stack, options):
+    _require_model()
+    utils.load_model_artifacts()
+    return lambda: utils.predict_house_price(SAMPLE_INPUT), 1
+
+
+def _batch_columns(rows):
+    columns = {name: np.full(rows, value) for name, value in SAMPLE_INPUT.items()}
+    columns['living area'] = np.linspace(500, 5000, rows)
+    return columns
+
+
+@benchmark('predict.batch_1k', 'inference')
+def _bench_predict_batch(stack, options):
+    _require_model()
+    utils.load_model_artifacts()
+    columns = _batch_columns(1000)
+    return lambda: utils.predict_house_prices(columns), 1000
+
+
+@benchmark('explain.batch_1k', 'inference')
+def _bench_explain_batch(stack, options):
+    _require_model()
+    utils.load_model_artifacts()
+    columns = _batch_columns(1000)
+    return lambda: utils.explain_house_prices(columns), 1000
+
+
+# --- Formatting ------------------------------------------------------------
+
+_PRICES = [float(v) for v in np.geomspace(999, 9.9e9, 1000)]
+
+
+@benchmark('format.price', 'formatting')
+def _bench_format_price(stack, options):
+    def run():
+        for price in _PRICES:
+            views.format_price(price)
+    return run, len(_PRICES)
+
+
+@benchmark('format.indian_number', 'formatting')
+def _bench_format_indian_number(stack, options):
+    numbers = [int(price) for price in _PRICES]
+
+    def run():
+        for number in numbers:
+            views.format_indian_number(number)
+    return run, len(numbers)
+
+
+# --- Amenity processing ----------------------------------------------------
+
+@benchmark('amenity.classify_tags', 'amenities')
+def _bench_classify(stack, options):
+    elements = upstream_payloads.overpass_payload(*AMENITY_POINT, elements=600)['elements']
+    tags = [el.get('tags') or {} for el in elements]
+
+    def run():
+        for t in tags:
+            views._classify_osm_tags(t)
+    return run, len(tags)
+
+
+@benchmark('amenity.finalize_buckets', 'amenities')
+def _bench_finalize(stack, options):
+    lat_f, lng_f = AMENITY_POINT
+    buckets = {key: [] for key in views._EMPTY_AMENITY_RESULTS}
+    for el in upstream_payloads.overpass_payload(lat_f, lng_f)['elements']:
+        key = views._classify_osm_tags(el.get('tags') or {})
+        place = views._el_to_place(el, key) if key else None
+        if place:
+            buckets[key].append(place)
+    return lambda: views._finalize_buckets(lat_f, lng_f, buckets), 1
+
+
+def _contention(cache, threads, ops_per_thread, keys=400, write_share=0.1):
+    """threads workers hammering cache with a get-heavy mix over `keys` points."""
+    payload = {"status": "OK", "results": {"school": {"status": "OK", "results": [{"name": "x"}]}}}
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(seed):
+        rng = np.random.default_rng(seed)
+        picks = rng.integers(0, keys, ops_per_thread)
+        writes = rng.random(ops_per_thread) < write_share
+        barrier.wait()
+        for pick, write in zip(picks, writes):
+            key = (round(12.9 + pick * 0.001, 3), 77.594)
+            if write or cache.get(key) is None:
+                cache.set(key, payload)
+
+    def run():
+        pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        for t in pool:
+            t.start()
+        barrier.wait()
+        for t in pool:
+            t.join()
+    return run
+
+
+@benchmark('amenity.cache_contention', 'amenities')
+def _bench_cache_contention(stack, options):
+    cache = TieredCache("amenities", views._AMENITY_CACHE_TTL_SEC, max_entries=200)
+    threads = options['threads']
+    return _contention(cache, threads, 2000), threads * 2000
+
+
+@benchmark('amenity.cache_contention_persistent', 'amenities')
+def _bench_cache_contention_persistent(stack, options):
+    tmp = Path(stack.enter_context(tempfile.TemporaryDirectory(prefix='cache-bench-')))
+    store = PersistentStore(tmp / 'bench.sqlite3')
+    cache = TieredCache("amenities", views._AMENITY_CACHE_TTL_SEC, max_entries=200, store=store)
+    threads = options['threads']
+    return _contention(cache, threads, 2000), threads * 2000
+
+
+# --- Views (stubbed upstreams) ---------------------------------------------
+
+class _StubResponse:
+    status_code = 200
+
+    def __init__(self, payload):
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        pass
+
+
+def _stub_get(latency_sec):
+    def get(url, params=None, **kwargs):
+        if latency_sec:
+            time.sleep(latency_sec)
+        params = params or {}
+        path = urlparse(url).path
+        if url == views._PHOTON_URL:
+            lon_min, lat_min, lon_max, lat_max = map(float, params['bbox'].split(','))
+            payload = upstream_payloads.photon_payload(
+                params['q'], (lat_min + lat_max) / 2, (lon_min + lon_max) / 2, limit=params.get('limit', 8)
+            )
+        elif path.endswith('/reverse'):
+            payload = upstream_payloads.nominatim_reverse_payload(float(params['lat']), float(params['lon']))
+        elif path.endswith('/search'):
+            payload = upstream_payloads.nominatim_search_payload(params['q'], params.get('limit', 5))
+        elif url == views._DISTANCE_MATRIX_URL:
+            payload = upstream_payloads.distance_matrix_payload(
+                params['origins'], params['destinations'], params['mode']
+            )
+        else:
+            raise AssertionError(f"Unexpected upstream GET {url}")
+        return _StubResponse(payload)
+    return get
+
+
+def _stub_post(latency_sec):
+    def post(url, data=None, **kwargs):
+        if latency_sec:
+            time.sleep(latency_sec)
+        query = (data or {}).get('data', '')
+        # around:<radius>,<lat>,<lng> in the generated query
+        lat_f, lng_f = map(float, query.split('around:', 1)[1].split(')', 1)[0].split(',')[1:3])
+        return _StubResponse(upstream_payloads.overpass_payload(lat_f, lng_f))
+    return post
+
+
+def _stub_upstreams(stack, options):
+    """Patch the HTTP calls and caches the views use; undone when stack closes."""
+    latency = options['upstream_latency_ms'] / 1000.0
+    stack.enter_context(mock.patch.object(views.requests, 'get', _stub_get(latency)))
+    stack.enter_context(mock.patch.object(views.requests, 'post', _stub_post(latency)))
+    for name in ('_AMENITY_CACHE', '_AMENITY_BUCKET_CACHE', '_GEOCODE_CACHE', '_SEARCH_CACHE', '_DISTANCE_CACHE'):
+        live = getattr(views, name)
+        stack.enter_context(mock.patch.object(
+            views, name, TieredCache(live.namespace, live.memory_ttl_sec, live.max_entries)
+        ))
+    stack.enter_context(override_settings(
+        ALLOWED_HOSTS=['testserver'], GOOGLE_MAPS_API_KEY='benchmark', AMENITY_PREFETCH_ENABLED=False,
+    ))
+    return Client()
+
+
+def _checked(response):
+    if response.status_code >= 400:
+        raise RuntimeError(f"{response.status_code}: {response.content[:200]!r}")
+    return response
+
+
+def _fresh_points():
+    """A new point per call (about 110 m apart) so every lookup misses the caches."""
+    step = count()
+    lat_f, lng_f = AMENITY_POINT
+    return lambda: (round(lat_f + next(step) * 0.001, 6), lng_f)
+
+
+@benchmark('view.predict_form', 'views')
+def _bench_view_predict(stack, options):
+    _require_model()
+    client = _stub_upstreams(stack, options)
+    url = reverse('price_prediction:predict')
+    return lambda: _checked(client.post(url, SAMPLE_FORM)), 1
+
+
+@benchmark('view.portfolio_page', 'views')
+def _bench_view_portfolio(stack, options):
+    client = _stub_upstreams(stack, options)
+    url = reverse('portfolio:home')
+    headers = {'HTTP_ACCEPT_ENCODING': 'gzip, br'}
+    return lambda: _checked(client.get(url, **headers)), 1
+
+
+@benchmark('view.predict_page', 'views')
+def _bench_view_predict_page(stack, options):
+    _require_model()
+    client = _stub_upstreams(stack, options)
+    url = reverse('price_prediction:predict')
+    headers = {'HTTP_ACCEPT_ENCODING': 'gzip, br'}
+    return lambda: _checked(client.get(url, **headers)), 1
+
+
+@benchmark('view.estimate', 'views')
+def _bench_view_estimate(stack, options):
+    _require_model()
+    client = _stub_upstreams(stack, options)
+    url = reverse('price_prediction:quick_estimate')
+    return lambda: _checked(client.get(url, SAMPLE_FORM)), 1
+
+
+@benchmark('view.amenities_miss', 'views')
+def _bench_view_amenities_miss(stack, options):
+    client = _stub_upstreams(stack, options)
+    url = reverse('price_prediction:fetch_all_amenities')
+    point = _fresh_points()
+
+    def run():
+        lat_f, lng_f = point()
+        _checked(client.get(url, {'lat': lat_f, 'lng': lng_f}))
+    return run, 1
+
+
+@benchmark('view.amenities_hit', 'views')
+def _bench_view_amenities_hit(stack, options):
+    client = _stub_upstreams(stack, options)
+    url = reverse('price_prediction:fetch_all_amenities')
+    params = {'lat': AMENITY_POINT[0], 'lng': AMENITY_POINT[1]}
+    _checked(client.get(url, params))
+    return lambda: _checked(client.get(url, params)), 1
+
+
+@benchmark('view.reverse_geocode_miss', 'views')
+def _bench_view_reverse_geocode(stack, options):
+    client = _stub_upstreams(stack, options)
+    url = reverse('price_prediction:reverse_geocode')
+    point = _fresh_points()
+
+    def run():
+        lat_f, lon_f = point()
+        _checked(client.get(url, {'lat': lat_f, 'lon': lon_f}))
+    return run, 1
+
+
+@benchmark('view.location_search_miss', 'views')
+def _bench_view_location_search(stack, options):
+    client = _stub_upstreams(stack, options)
+    url = reverse('price_prediction:location_search')
+    step = count()
+    return lambda: _checked(client.get(url, {'q': f"indiranagar {next(step)}"})), 1
+
+
+@benchmark('view.distance_both_miss', 'views')
+def _bench_view_distance(stack, options):
+    client = _stub_upstreams(stack, options)
+    url = reverse('price_prediction:calculate_batch_distances_both')
+    point = _fresh_points()
+    destinations = '|'.join(f"{12.95 + i * 0.004:.4f},{77.58 + i * 0.003:.4f}" for i in range(10))
+
+    def run():
+        lat_f, lng_f = point()
+        _checked(client.get(url, {'origin_lat': lat_f, 'origin_lng': lng_f, 'destinations': destinations}))
+    return run, 1
+
+
+# --- Runner ----------------------------------------------------------------
+
+def _summary(timings, ops):
+    ordered = sorted(timings)
+    median = statistics.median(ordered)
+    return {
+        'repeat': len(ordered),
+        'ops': ops,
+        'min_ms': ordered[0] * 1000,
+        'median_ms': median * 1000,
+        'mean_ms': statistics.fmean(ordered) * 1000,
+        'p95_ms': ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))] * 1000,
+        'max_ms': ordered[-1] * 1000,
+        'stdev_ms': statistics.stdev(ordered) * 1000 if len(ordered) > 1 else 0.0,
+        'per_op_us': median / ops * 1e6,
+        'ops_per_sec': ops / median if median else None,
+    }
+
+
+def _environment():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    import xgboost
+    return {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'numpy': np.__version__,
+        'xgboost': xgboost.__version__,
+    }
+
+
+def run_suite(names=None, repeat=20, warmup=3, threads=8, upstream_latency_ms=0.0):
+    """
+    Run the named benchmarks (default: all) and return the results document:
+    {'environment': ..., 'options': ..., 'results': {name: summary}}.
+    Benchmarks that cannot run here report {'skipped': reason}; ones that
+    fail report {'error': message}.
+    """
+    options = {
+        'repeat': repeat, 'warmup': warmup, 'threads': threads,
+        'upstream_latency_ms': upstream_latency_ms,
+    }
+    results = {}
+    for name in names or BENCHMARKS:
+        if name not in BENCHMARKS:
+            raise ValueError(f"Unknown benchmark: {name}")
+        group, setup = BENCHMARKS[name]
+        try:
+            with ExitStack() as stack:
+                fn, ops = setup(stack, options)
+                for _ in range(warmup):
+                    fn()
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    fn()
+                    timings.append(time.perf_counter() - start)
+            results[name] = dict(group=group, **_summary(timings, ops))
+        except Skip as e:
+            results[name] = {'group': group, 'skipped': str(e)}
+        except Exception as e:
+            results[name] = {'group': group, 'error': f"{type(e).__name__}: {str(e)}"}
+    return {'environment': _environment(), 'options': options, 'results': results}
+
+
+def compare(baseline, current, threshold=0.10):
+    """
+    Median ratios current/baseline for benchmarks present in both documents.
+    A ratio above 1 + threshold is a regression, below 1 - threshold an
+    improvement. Returns {name: {'baseline_ms', 'current_ms', 'ratio', 'verdict'}}.
+    """
+    out = {}
+    for name, now in current['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if not before or 'median_ms' not in before or 'median_ms' not in now:
+            continue
+        ratio = now['median_ms'] / before['median_ms'] if before['median_ms'] else float('inf')
+        if ratio > 1 + threshold:
+            verdict = 'regression'
+        elif ratio < 1 - threshold:
+            verdict = 'improvement'
+        else:
+            verdict = 'same'
+        out[name] = {
+            'baseline_ms': before['median_ms'],
+            'current_ms': now['median_ms'],
+            'ratio': ratio,
+            'verdict': verdict,
+        }
+    return out
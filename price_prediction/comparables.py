@@ -0,0 +1,348 @@
+"""
+Comparable-sales lookup over ML_Files/House_Price_India.csv.
+
+Two KD-tree indexes answer top-k queries:
+  * nearby  - great-circle neighbours on (Lattitude, Longitude), using unit
+              sphere coordinates so chord distance orders like haversine;
+  * similar - one tree per property_type over scaled living area, bedrooms,
+              bathrooms and location, so a 5 km move weighs about as much as
+              one standard deviation in a physical feature.
+
+Full builds keep only row numbers into the shared memory-mapped columnar
+dataset (dataset.py) and read sale details from its columns, so neither
+the saved index nor any worker holds its own copy of the sales. The index is saved to ML_Files/comparables_index.pkl and reloaded at startup
+while the CSV is unchanged. Rows appended to the CSV are indexed as a small
+delta segment instead of rebuilding everything; segments are merged back
+into one once the delta grows past a fraction of the base.
+"""
+
+import hashlib
+import io
+import logging
+import math
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from .dataset import ColumnarDataset, get_dataset_path, load_dataset
+from .utils import get_ml_files_path
+
+logger = logging.getLogger(__name__)
+
+_INDEX_VERSION = 2
+_COLUMNS = [
+    'id', 'Lattitude', 'Longitude', 'living area', 'lot area', 'number of bedrooms',
+    'number of bathrooms', 'floor', 'property_type', 'city', 'Price',
+]
+_REQUIRED = ['Lattitude', 'Longitude', 'living area']
+_EARTH_RADIUS_KM = 6371.0
+_LOCATION_SCALE_KM = 5.0
+_MERGE_DELTA_FRACTION = 0.1
+_FRESHNESS_CHECK_SEC = 30.0
+MAX_K = 50
+
+_state = {'index': None, 'checked_at': 0.0, 'stat': None}
+_lock = threading.Lock()
+
+
+def get_index_path():
+    return get_ml_files_path() / 'comparables_index.pkl'
+
+
+def _unit_xyz(lat, lon):
+    rlat = np.radians(np.asarray(lat, dtype=np.float64))
+    rlon = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(rlat)
+    return np.column_stack((cos_lat * np.cos(rlon), cos_lat * np.sin(rlon), np.sin(rlat)))
+
+
+def _haversine_km(lat1, lon1, lat2, lon2):
+    rlat1, rlon1, rlat2, rlon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((rlat2 - rlat1) / 2) ** 2 + math.cos(rlat1) * math.cos(rlat2) * math.sin((rlon2 - rlon1) / 2) ** 2
+    return 2 * _EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _chord_to_km(chord):
+    return 2 * _EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0, 1))
+
+
+class _FrameColumns:
+    """Column access over parsed CSV rows (appended delta rows), like ColumnarDataset."""
+
+    def __init__(self, frame):
+        self._arrays = {col: frame[col].to_numpy() for col in _COLUMNS}
+
+    def column(self, name):
+        return self._arrays[name]
+
+    def categories(self, name):
+        return None
+
+
+class _Segment:
+    """
+    One immutable slice of the dataset with its own trees. Only row numbers
+    into the source's columns are kept: for a full build the source is the
+    shared memory-mapped dataset, so workers don't each hold a copy of the
+    sales; a delta segment keeps its few parsed rows.
+    """
+
+    def __init__(self, source, source_rows, scale):
+        self._source = source
+        self.source_rows = np.asarray(source_rows, dtype=np.int64)
+        self.size = len(self.source_rows)
+        xyz = _unit_xyz(self.gather('Lattitude'), self.gather('Longitude'))
+        self.spatial = cKDTree(xyz)
+        features = _feature_matrix(
+            self.gather('living area'), self.gather('number of bedrooms'),
+            self.gather('number of bathrooms'), xyz, scale,
+        )
+        property_types = self.gather('property_type')
+        self.by_type = {}
+        for ptype in np.unique(property_types):
+            rows = np.flatnonzero(property_types == ptype)
+            self.by_type[ptype] = (rows, cKDTree(features[rows]))
+
+    @property
+    def source(self):
+        # A saved index is reattached to this process's dataset on first use;
+        # refresh_index has checked by then that the indexed rows are its prefix.
+        if self._source is None:
+            self._source = load_dataset()
+        return self._source
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        if isinstance(self._source, ColumnarDataset):
+            state['_source'] = None
+        return state
+
+    def gather(self, name):
+        """Decoded values of a column for every row of the segment."""
+        values = np.asarray(self.source.column(name))[self.source_rows]
+        categories = self.source.categories(name)
+        return values if categories is None else np.asarray(categories, dtype=object)[values]
+
+    def value(self, name, row):
+        value = self.source.column(name)[self.source_rows[row]]
+        categories = self.source.categories(name)
+        return value if categories is None else categories[value]
+
+
+def _feature_matrix(living_area, bedrooms, bathrooms, xyz, scale):
+    physical = np.column_stack((
+        np.log1p(np.asarray(living_area, dtype=np.float64)),
+        np.asarray(bedrooms, dtype=np.float64),
+        np.asarray(bathrooms, dtype=np.float64),
+    ))
+    physical = (physical - scale['mean']) / scale['std']
+    location = xyz * (_EARTH_RADIUS_KM / _LOCATION_SCALE_KM)
+    return np.hstack((physical, location))
+
+
+class ComparablesIndex:
+    """Base segment plus optional delta segments for appended rows."""
+
+    def __init__(self, segments, scale, indexed_bytes, prefix_sha1):
+        self.segments = segments
+        self.scale = scale
+        self.indexed_bytes = indexed_bytes
+        self.prefix_sha1 = prefix_sha1
+
+    @property
+    def size(self):
+        return sum(seg.size for seg in self.segments)
+
+    def nearby(self, lats, lons, k):
+        """k nearest sales to each point: one list of (chord, segment, row) per point."""
+        xyz = _unit_xyz(lats, lons)
+        hits = [[] for _ in range(len(xyz))]
+        for seg in self.segments:
+            kk = min(k, seg.size)
+            dist, rows = seg.spatial.query(xyz, k=kk)
+            dist, rows = dist.reshape(len(xyz), kk), rows.reshape(len(xyz), kk)
+            for i in range(len(xyz)):
+                hits[i].extend((d, seg, r) for d, r in zip(dist[i], rows[i]))
+        return [sorted(h, key=lambda t: t[0])[:k] for h in hits]
+
+    def similar(self, subjects, k):
+        """k most similar sales of the same property type, one list per subject."""
+        xyz = _unit_xyz([s['latitude'] for s in subjects], [s['longitude'] for s in subjects])
+        features = _feature_matrix(
+            [s['living_area'] for s in subjects], [s['bedrooms'] for s in subjects],
+            [s['bathrooms'] for s in subjects], xyz, self.scale,
+        )
+        hits = [[] for _ in subjects]
+        # Group subjects by type so each tree is queried once per batch.
+        types = np.array([s['property_type'] for s in subjects], dtype=object)
+        for ptype in set(types):
+            subject_rows = np.flatnonzero(types == ptype)
+            for seg in self.segments:
+                entry = seg.by_type.get(ptype)
+                if entry is None:
+                    continue
+                rows, tree = entry
+                kk = min(k, len(rows))
+                dist, idx = tree.query(features[subject_rows], k=kk)
+                dist, idx = dist.reshape(len(subject_rows), kk), idx.reshape(len(subject_rows), kk)
+                for j, i in enumerate(subject_rows):
+                    hits[i].extend((d, seg, rows[n]) for d, n in zip(dist[j], idx[j]))
+        return [sorted(h, key=lambda t: t[0])[:k] for h in hits]
+
+
+def _read_tail(raw_tail):
+    header = pd.read_csv(get_dataset_path(), nrows=0).columns.tolist()
+    frame = pd.read_csv(io.BytesIO(raw_tail), header=None, names=header, usecols=_COLUMNS)
+    return frame.dropna(subset=_REQUIRED).reset_index(drop=True)
+
+
+def _scale_for(living_area, bedrooms, bathrooms):
+    physical = np.column_stack((
+        np.log1p(np.asarray(living_area, dtype=np.float64)),
+        np.asarray(bedrooms, dtype=np.float64),
+        np.asarray(bathrooms, dtype=np.float64),
+    ))
+    std = physical.std(axis=0)
+    return {'mean': physical.mean(axis=0), 'std': np.where(std > 0, std, 1.0)}
+
+
+def build_index(dataset=None):
+    """Full build over the shared columnar dataset (see dataset.py), without copying its rows."""
+    dataset = dataset or load_dataset()
+    valid = np.ones(len(dataset), dtype=bool)
+    for name in _REQUIRED:
+        valid &= ~pd.isna(dataset.column(name))
+    rows = np.flatnonzero(valid)
+    scale = _scale_for(*(np.asarray(dataset.column(name))[rows]
+                         for name in ('living area', 'number of bedrooms', 'number of bathrooms')))
+    # The whole converted file is the prefix later appends are checked against.
+    size = dataset.meta['source_stat'][0]
+    return ComparablesIndex([_Segment(dataset, rows, scale)], scale, size, dataset.sha1)
+
+
+def refresh_index(index, raw):
+    """
+    Bring index up to date with raw CSV bytes. Appended rows become a delta
+    segment; anything else (edits, deletions) forces a full rebuild.
+    """
+    if len(raw) == index.indexed_bytes and hashlib.sha1(raw).hexdigest() == index.prefix_sha1:
+        return index
+    prefix = raw[:index.indexed_bytes]
+    if len(raw) < index.indexed_bytes or hashlib.sha1(prefix).hexdigest() != index.prefix_sha1:
+        logger.info("Comparables dataset changed; rebuilding index")
+        return build_index()
+    tail = _read_tail(raw[index.indexed_bytes:])
+    segments = list(index.segments)
+    if len(tail):
+        segments.append(_Segment(_FrameColumns(tail), np.arange(len(tail)), index.scale))
+    base = segments[0].size
+    if sum(seg.size for seg in segments[1:]) > base * _MERGE_DELTA_FRACTION:
+        logger.info("Comparables delta segments grew large; merging")
+        return build_index()
+    logger.info(f"Comparables index extended with {len(tail)} appended rows")
+    return ComparablesIndex(segments, index.scale, len(raw), hashlib.sha1(raw).hexdigest())
+
+
+def save_index(index, path=None):
+    path = path or get_index_path()
+    # Per-process temp name: several processes may save the same index at once.
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, 'wb') as f:
+        pickle.dump({'version': _INDEX_VERSION, 'index': index}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def load_index(path=None):
+    path = path or get_index_path()
+    try:
+        with open(path, 'rb') as f:
+            stored = pickle.load(f)
+    except (FileNotFoundError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+    if stored.get('version') != _INDEX_VERSION:
+        return None
+    return stored['index']
+
+
+def get_index():
+    """
+    Process-wide index: precomputed file if present, refreshed against the
+    CSV at most every _FRESHNESS_CHECK_SEC, saved back when it changed.
+    """
+    now = time.monotonic()
+    index = _state['index']
+    if index is not None and now - _state['checked_at'] < _FRESHNESS_CHECK_SEC:
+        return index
+    with _lock:
+        index = _state['index']
+        if index is not None and now - _state['checked_at'] < _FRESHNESS_CHECK_SEC:
+            return index
+        stat = os.stat(get_dataset_path())
+        stat = (stat.st_size, stat.st_mtime_ns)
+        if index is not None and stat == _state['stat']:
+            _state['checked_at'] = now
+            return index
+        index = index or load_index()
+        if index is None:
+            fresh = build_index()
+        else:
+            fresh = refresh_index(index, get_dataset_path().read_bytes())
+        if fresh is not index:
+            try:
+                save_index(fresh)
+            except OSError as e:
+                logger.warning(f"Could not save comparables index: {str(e)}")
+        _state['index'] = fresh
+        _state['checked_at'] = now
+        _state['stat'] = stat
+        return fresh
+
+
+def _to_sale(seg, row, distance, subject):
+    lat, lon = float(seg.value('Lattitude', row)), float(seg.value('Longitude', row))
+    if distance is None:
+        distance = _haversine_km(subject['latitude'], subject['longitude'], lat, lon)
+    return {
+        'id': int(seg.value('id', row)),
+        'price': float(seg.value('Price', row)),
+        'latitude': lat,
+        'longitude': lon,
+        'living_area': int(seg.value('living area', row)),
+        'lot_area': int(seg.value('lot area', row)),
+        'bedrooms': int(seg.value('number of bedrooms', row)),
+        'bathrooms': float(seg.value('number of bathrooms', row)),
+        'floor': int(seg.value('floor', row)),
+        'property_type': str(seg.value('property_type', row)),
+        'city': str(seg.value('city', row)),
+        'distance_km': round(distance, 3),
+    }
+
+
+def find_comparables(subjects, k=5, mode='similar'):
+    """
+    Top-k comparable sales for each subject dict (latitude, longitude and,
+    for mode='similar', living_area, bedrooms, bathrooms, property_type).
+    Returns one list of sale dicts per subject, best match first.
+    """
+    if not subjects:
+        return []
+    k = max(1, min(int(k), MAX_K))
+    index = get_index()
+    if mode == 'nearby':
+        hits = index.nearby([s['latitude'] for s in subjects], [s['longitude'] for s in subjects], k)
+        return [
+            [_to_sale(seg, row, float(_chord_to_km(chord)), subject) for chord, seg, row in found]
+            for subject, found in zip(subjects, hits)
+        ]
+    if mode == 'similar':
+        hits = index.similar(subjects, k)
+        return [
+            [_to_sale(seg, row, None, subject) for _score, seg, row in found]
+            for subject, found in zip(subjects, hits)
+        ]
+    raise ValueError(f"Unknown comparables mode: {mode}")
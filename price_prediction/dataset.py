@@ -0,0 +1,212 @@
+"""
+Typed columnar cache of ML_Files/House_Price_India.csv.
+
+The CSV is parsed once and written as one .npy file per column under
+ML_Files/dataset_cache/<content hash>v<format>/. Numeric columns are loaded
+memory-mapped and read-only, so every gunicorn worker shares the same
+page-cache copy instead of holding its own DataFrame; text columns are
+stored as dictionary-encoded integer codes plus a category list.
+
+Freshness is decided by the SHA-1 of the CSV contents. The file size and
+mtime recorded next to the cache let unchanged files skip re-hashing.
+A cache directory only ever appears complete (converted under a temporary
+name, then renamed into place) and is never replaced while it is current,
+so workers converting concurrently cannot pull files from under each other.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .utils import get_ml_files_path
+
+logger = logging.getLogger(__name__)
+
+_FORMAT_VERSION = 1
+_state = {'dataset': None, 'stat': None}
+_lock = threading.Lock()
+
+
+def get_dataset_path():
+    return get_ml_files_path() / 'House_Price_India.csv'
+
+
+def get_cache_root():
+    return get_ml_files_path() / 'dataset_cache'
+
+
+def _file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _stat_key(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+class ColumnarDataset:
+    """Read-only view over a converted dataset directory."""
+
+    def __init__(self, directory, meta):
+        self.directory = directory
+        self.meta = meta
+        self.sha1 = meta['sha1']
+        self.columns = [col['name'] for col in meta['columns']]
+        self._specs = {col['name']: col for col in meta['columns']}
+        self._arrays = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.meta['rows']
+
+    def is_categorical(self, name):
+        return 'categories' in self._specs[name]
+
+    def categories(self, name):
+        return self._specs[name].get('categories')
+
+    def column(self, name):
+        """Memory-mapped column array (integer codes for categorical columns)."""
+        arr = self._arrays.get(name)
+        if arr is None:
+            spec = self._specs[name]
+            arr = np.load(self.directory / spec['file'], mmap_mode='r')
+            with self._lock:
+                self._arrays[name] = arr
+        return arr
+
+    def values(self, name):
+        """Decoded column: the mmap for numbers, an object array for categories."""
+        arr = self.column(name)
+        cats = self.categories(name)
+        if cats is None:
+            return arr
+        return np.asarray(cats, dtype=object)[arr]
+
+    def frame(self, columns=None):
+        """
+        DataFrame over the requested columns. Numeric columns wrap the mmaps
+        without copying; categorical columns become pandas Categoricals.
+        """
+        data = {}
+        for name in columns or self.columns:
+            cats = self.categories(name)
+            if cats is None:
+                data[name] = self.column(name)
+            else:
+                data[name] = pd.Categorical.from_codes(self.column(name), categories=cats)
+        return pd.DataFrame(data, copy=False)
+
+
+def convert_csv(csv_path, target_dir, sha1):
+    """Parse the CSV once and write one .npy per column plus meta.json."""
+    frame = pd.read_csv(csv_path)
+    tmp_dir = target_dir.with_name(target_dir.name + f'.tmp{os.getpid()}')
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    columns = []
+    for i, name in enumerate(frame.columns):
+        series = frame[name]
+        spec = {'name': name, 'file': f'col{i:03d}.npy'}
+        if pd.api.types.is_numeric_dtype(series):
+            arr = series.to_numpy()
+        else:
+            cat = series.astype('category')
+            spec['categories'] = [str(c) for c in cat.cat.categories]
+            codes = cat.cat.codes.to_numpy()
+            arr = codes.astype(np.int16 if len(spec['categories']) < 2 ** 15 else np.int32)
+        spec['dtype'] = str(arr.dtype)
+        np.save(tmp_dir / spec['file'], np.ascontiguousarray(arr))
+        columns.append(spec)
+    meta = {
+        'version': _FORMAT_VERSION,
+        'sha1': sha1,
+        'rows': len(frame),
+        'source_stat': _stat_key(csv_path),
+        'columns': columns,
+    }
+    with open(tmp_dir / 'meta.json', 'w') as f:
+        json.dump(meta, f)
+    try:
+        os.rename(tmp_dir, target_dir)
+    except OSError:
+        # Another worker finished the same conversion first; keep its copy.
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return target_dir
+
+
+def _read_meta(directory):
+    try:
+        with open(directory / 'meta.json') as f:
+            meta = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    return meta if meta.get('version') == _FORMAT_VERSION else None
+
+
+def _prune_old(keep):
+    root = get_cache_root()
+    for entry in root.iterdir():
+        if entry.is_dir() and entry.name != keep and '.tmp' not in entry.name:
+            shutil.rmtree(entry, ignore_errors=True)
+
+
+def load_dataset(csv_path=None):
+    """
+    Process-wide columnar dataset, converting the CSV when its contents
+    changed. Safe to call on every use: an unchanged file costs one stat().
+    """
+    csv_path = csv_path or get_dataset_path()
+    stat = _stat_key(csv_path)
+    dataset = _state['dataset']
+    if dataset is not None and stat == _state['stat']:
+        return dataset
+    with _lock:
+        dataset = _state['dataset']
+        if dataset is not None and stat == _state['stat']:
+            return dataset
+        root = get_cache_root()
+        root.mkdir(parents=True, exist_ok=True)
+        pointer = root / 'current.json'
+        sha1 = None
+        try:
+            with open(pointer) as f:
+                current = json.load(f)
+            if current.get('source_stat') == stat:
+                sha1 = current['sha1']
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+        if sha1 is None:
+            sha1 = _file_sha1(csv_path)
+        # The format version is part of the name, so an existing directory is
+        # always a complete conversion of this content in this format.
+        directory = root / f'{sha1[:16]}v{_FORMAT_VERSION}'
+        meta = _read_meta(directory)
+        if meta is None:
+            logger.info(f"Converting {csv_path} to columnar cache {directory}")
+            convert_csv(csv_path, directory, sha1)
+            meta = _read_meta(directory)
+            _prune_old(keep=directory.name)
+        if meta is None or meta['sha1'] != sha1:
+            raise RuntimeError(
+                f"Columnar dataset cache {directory} is unreadable or belongs to another file; "
+                f"delete it to rebuild"
+            )
+        tmp_pointer = root / f'current.json.tmp{os.getpid()}'
+        with open(tmp_pointer, 'w') as f:
+            json.dump({'sha1': sha1, 'source_stat': stat}, f)
+        os.replace(tmp_pointer, pointer)
+        dataset = ColumnarDataset(directory, meta)
+        _state['dataset'] = dataset
+        _state['stat'] = stat
+        return dataset
@@ -0,0 +1,136 @@
+"""
+Per-request time budget shared by every upstream call a view makes.
+
+A Deadline is created once per request (from settings or the client's
+X-Request-Budget-Ms header) and passed explicitly to the helpers that fan
+out to Overpass, Photon, Nominatim and Google. Each HTTP call derives its
+connect/read timeouts from the time left, and work that cannot finish in
+time is skipped instead of started.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+
+BUDGET_HEADER = "HTTP_X_REQUEST_BUDGET_MS"
+
+# Below this, starting a new HTTP call is pointless: TCP + TLS alone eat it.
+_MIN_CALL_SEC = 0.3
+_DEFAULT_CONNECT_SEC = 1.2
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when there is not enough budget left to start a call."""
+
+
+class Deadline:
+    """Monotonic deadline with a shared record of how the budget was spent."""
+
+    def __init__(self, budget_sec, expires_at=None, _spans=None, _lock=None):
+        self.budget_sec = float(budget_sec)
+        self.started_at = time.monotonic()
+        self.expires_at = expires_at if expires_at is not None else self.started_at + self.budget_sec
+        self._spans = _spans if _spans is not None else {}
+        self._lock = _lock or threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        return cls(getattr(settings, 'UPSTREAM_BUDGET_SEC', 5.0))
+
+    @classmethod
+    def from_request(cls, request):
+        """Use the client's budget header when present, capped by settings."""
+        default = float(getattr(settings, 'UPSTREAM_BUDGET_SEC', 5.0))
+        ceiling = float(getattr(settings, 'UPSTREAM_BUDGET_MAX_SEC', 10.0))
+        raw = request.META.get(BUDGET_HEADER)
+        if raw:
+            try:
+                requested = float(raw) / 1000.0
+            except (TypeError, ValueError):
+                requested = None
+            if requested and requested > 0:
+                return cls(min(requested, ceiling))
+        return cls(default)
+
+    def child(self, reserve_sec):
+        """Deadline ending reserve_sec earlier, e.g. to leave time to merge results."""
+        return Deadline(
+            self.budget_sec,
+            expires_at=max(self.started_at, self.expires_at - reserve_sec),
+            _spans=self._spans,
+            _lock=self._lock,
+        )
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def can_start(self, min_sec=_MIN_CALL_SEC):
+        return self.remaining() >= min_sec
+
+    def timeout(self, connect=_DEFAULT_CONNECT_SEC, read_cap=None):
+        """
+        (connect, read) timeout tuple for requests, derived from time left.
+        Raises DeadlineExceeded when the call could not finish in time anyway.
+        """
+        remaining = self.remaining()
+        if remaining < _MIN_CALL_SEC:
+            raise DeadlineExceeded("Request time budget exhausted")
+        read = remaining if read_cap is None else min(remaining, read_cap)
+        return (min(connect, remaining), read)
+
+    def record(self, name, elapsed_sec):
+        with self._lock:
+            total, count = self._spans.get(name, (0.0, 0))
+            self._spans[name] = (total + elapsed_sec, count + 1)
+
+    def skip(self, name):
+        self.record(f"{name}_skipped", 0.0)
+
+    @contextmanager
+    def span(self, name):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(name, time.monotonic() - start)
+
+    def report(self):
+        """How the budget was spent: per-span milliseconds and call counts."""
+        with self._lock:
+            spans = {
+                name: {"ms": round(total * 1000, 1), "count": count}
+                for name, (total, count) in self._spans.items()
+            }
+        return {
+            "budget_ms": round(self.budget_sec * 1000, 1),
+            "elapsed_ms": round((time.monotonic() - self.started_at) * 1000, 1),
+            "remaining_ms": round(self.remaining() * 1000, 1),
+            "spans": spans,
+        }
+
+
+def add_timing_headers(response, deadline):
+    """Expose the budget report as a Server-Timing header (visible in devtools)."""
+    report = deadline.report()
+    parts = [f'budget;dur={report["budget_ms"]}', f'total;dur={report["elapsed_ms"]}']
+    for name, span in sorted(report["spans"].items()):
+        parts.append(f'{name};dur={span["ms"]};desc="x{span["count"]}"')
+    response["Server-Timing"] = ", ".join(parts)
+    response["X-Request-Budget-Remaining-Ms"] = str(report["remaining_ms"])
+    return response
+
+
+def with_deadline(view):
+    """Attach request.deadline to a view and report its spend on the response."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.deadline = Deadline.from_request(request)
+        response = view(request, *args, **kwargs)
+        return add_timing_headers(response, request.deadline)
+    return wrapper
@@ -0,0 +1,257 @@
+"""
+Incremental updates of the served model from newly observed sales.
+
+Starts from the booster in ML_Files/best_house_price_model.pkl and uses only
+the new rows, in one of two modes:
+  * add-trees      - boost a few more rounds on the new rows;
+  * refresh-leaves - keep every tree's structure and recompute its leaf
+                     values from the new rows (XGBoost's refresh updater).
+
+New rows are encoded and capped with the served encoder and the capping
+bounds recorded in model_config.pkl. A slice of them is held back, and the
+update is only published when it does not regress on that slice nor on the
+reference holdout saved with the served model (model_holdout.npz). The
+published holdout is a reservoir sample of every row held back so far,
+at most training.HOLDOUT_ROWS rows, so evaluating against it costs the
+same however many updates came before. Time and memory scale with the new
+rows and the model size, not with the history.
+"""
+
+import pickle
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from . import training
+from .streaming_training import to_regressor
+from .utils import get_ml_files_path
+
+MODES = ('add-trees', 'refresh-leaves')
+# A gate decided on a handful of rows is noise: at least one holdout set
+# must have this many rows before an update can be published unforced.
+MIN_CHECK_ROWS = 30
+_RAW_COLUMNS = [
+    'number of bedrooms', 'number of bathrooms', 'living area', 'lot area', 'floor',
+    'Lattitude', 'Longitude', 'property_type', training.TARGET_COL,
+]
+
+
+def load_served(model_dir=None):
+    """Served model, features, config, encoders and reference holdout from model_dir."""
+    model_dir = model_dir or get_ml_files_path()
+    served = {}
+    for key, filename in (
+        ('model', 'best_house_price_model.pkl'),
+        ('features', 'model_features.pkl'),
+        ('config', 'model_config.pkl'),
+        ('property_type_encoder', 'property_type_encoder.pkl'),
+    ):
+        with open(model_dir / filename, 'rb') as f:
+            served[key] = pickle.load(f)
+    try:
+        with open(model_dir / 'city_encoder.pkl', 'rb') as f:
+            served['city_encoder'] = pickle.load(f)
+    except FileNotFoundError:
+        served['city_encoder'] = None
+    try:
+        with np.load(model_dir / 'model_holdout.npz') as stored:
+            served['holdout'] = (stored['X'], stored['y'])
+            served['holdout_seen'] = int(stored['seen']) if 'seen' in stored.files else len(stored['y'])
+    except FileNotFoundError:
+        served['holdout'] = None
+        served['holdout_seen'] = 0
+    return served
+
+
+def merge_holdout(holdout, seen, X_new, y_new, seed=training.SPLIT_SEED):
+    """
+    Add (X_new, y_new) to holdout, a uniform sample of seen rows, keeping a
+    uniform sample of all of them (reservoir sampling) of at most
+    training.HOLDOUT_ROWS rows. Returns (X, y, seen).
+    """
+    size = training.HOLDOUT_ROWS
+    if holdout is None:
+        X, y = np.empty((0, X_new.shape[1])), np.empty(0)
+    else:
+        X, y = holdout
+    # Fill up to the reservoir size first.
+    fill = max(0, min(size - len(y), len(y_new)))
+    X = np.concatenate([X, X_new[:fill]])
+    y = np.concatenate([y, y_new[:fill]])
+    seen += fill
+    rest = len(y_new) - fill
+    if rest:
+        X, y = X.copy(), y.copy()
+        # Row t (1-based over everything seen) replaces a random slot with probability size / t.
+        slots = np.random.default_rng(seed).integers(0, np.arange(seen + 1, seen + rest + 1))
+        for i in np.flatnonzero(slots < size):
+            X[slots[i]], y[slots[i]] = X_new[fill + i], y_new[fill + i]
+        seen += rest
+    return X, y, seen
+
+
+def prepare_rows(frame, served):
+    """
+    Encode, engineer and cap new sales like the served model's training
+    data. Rows with missing values or unknown property types are dropped.
+    Returns (X, y, dropped).
+    """
+    frame = frame.dropna(subset=_RAW_COLUMNS)
+    encoder = served['property_type_encoder']
+    known = frame['property_type'].astype(str).isin(encoder.classes_)
+    dropped = int((~known).sum())
+    frame = frame[known]
+    columns = {
+        name: frame[name].to_numpy(dtype=np.float64)
+        for name in _RAW_COLUMNS if name not in ('property_type', training.TARGET_COL)
+    }
+    columns['property_type_encoded'] = encoder.transform(frame['property_type'].astype(str)).astype(np.float64)
+    training.engineer_features(columns)
+    bounds = served['config'].get('capping_bounds') or {}
+    X = np.column_stack([
+        np.clip(columns[f], *bounds[f]) if f in bounds else columns[f]
+        for f in served['features']
+    ])
+    return X, frame[training.TARGET_COL].to_numpy(dtype=np.float64), dropped
+
+
+def _served_booster(model):
+    """
+    Copy of the served booster truncated to best_iteration, since the
+    sklearn wrapper would otherwise keep ignoring trees added after it.
+    """
+    booster = model.get_booster()
+    best = booster.attr('best_iteration')
+    if best is not None:
+        booster = booster[: int(best) + 1]
+    else:
+        booster = booster.copy()
+    booster.set_attr(best_iteration=None, best_score=None)
+    return booster
+
+
+def update_model(model, X, y, features, mode='add-trees', rounds=50, learning_rate=None, n_jobs=None):
+    """New regressor derived from model using only (X, y)."""
+    if mode not in MODES:
+        raise ValueError(f"Unknown update mode: {mode}")
+    booster = _served_booster(model)
+    params = {k: v for k, v in model.get_xgb_params().items() if v is not None}
+    params['nthread'] = n_jobs or params.get('n_jobs') or 1
+    params.pop('n_jobs', None)
+    dnew = xgb.DMatrix(pd.DataFrame(X, columns=features), label=np.log1p(y))
+    if mode == 'add-trees':
+        if learning_rate is not None:
+            params['learning_rate'] = learning_rate
+        booster = xgb.train(params, dnew, num_boost_round=rounds, xgb_model=booster)
+    else:
+        params.update(process_type='update', updater='refresh', refresh_leaf=True)
+        booster = xgb.train(params, dnew, num_boost_round=booster.num_boosted_rounds(), xgb_model=booster)
+    return to_regressor(booster, n_jobs)
+
+
+def _score(model, X, y, features):
+    if X is None or not len(y):
+        return None
+    return training.evaluate(model, pd.DataFrame(X, columns=features), y)
+
+
+def incremental_update(frame, mode='add-trees', rounds=50, learning_rate=None, holdout_fraction=0.2,
+                       max_regression=0.01, model_dir=None, output_dir=None, n_jobs=None,
+                       publish=True, force=False, seed=training.SPLIT_SEED):
+    """
+    Update the served model with the sales in frame and publish it to
+    output_dir (default: model_dir) when it passes the regression gate:
+    on every holdout set the updated MAE may exceed the served MAE by at
+    most max_regression (a fraction), and at least one holdout set has
+    MIN_CHECK_ROWS rows. force publishes regardless of the gate.
+    """
+    if not 0 < holdout_fraction < 1:
+        raise ValueError(f"holdout_fraction must be between 0 and 1 (exclusive), got {holdout_fraction}")
+    timer = training.StageTimer()
+    model_dir = model_dir or get_ml_files_path()
+    with timer.stage('load_model'):
+        served = load_served(model_dir)
+    features = served['features']
+    with timer.stage('prepare'):
+        X, y, dropped = prepare_rows(frame, served)
+        if not len(y):
+            raise ValueError("No usable rows in the update")
+        held = np.random.default_rng(seed).random(len(y)) < holdout_fraction
+        X_new, y_new, X_held, y_held = X[~held], y[~held], X[held], y[held]
+    with timer.stage('update'):
+        updated = update_model(served['model'], X_new, y_new, features, mode, rounds, learning_rate, n_jobs)
+
+    checks = {}
+    with timer.stage('evaluate'):
+        sets = {'new_rows': (X_held, y_held)}
+        if served['holdout'] is not None:
+            sets['reference'] = served['holdout']
+        for name, (X_eval, y_eval) in sets.items():
+            before = _score(served['model'], X_eval, y_eval, features)
+            after = _score(updated, X_eval, y_eval, features)
+            if before is None:
+                continue
+            checks[name] = {
+                'rows': int(len(y_eval)),
+                'before': before,
+                'after': after,
+                'passed': after['mae'] <= before['mae'] * (1 + max_regression),
+            }
+    enough_rows = any(check['rows'] >= MIN_CHECK_ROWS for check in checks.values())
+    passed = enough_rows and all(check['passed'] for check in checks.values())
+    tiers = None
+    X_tier, y_tier = served['holdout'] if served['holdout'] is not None else (X_held, y_held)
+    if len(y_tier):
+        with timer.stage('tiers'):
+            tiers = training.measure_tiers(updated, pd.DataFrame(X_tier, columns=features), y_tier)
+
+    published = False
+    output_dir = output_dir or model_dir
+    if publish and (passed or force):
+        config = served['config']
+        reference = checks.get('reference') or checks.get('new_rows')
+        X_ref, y_ref, seen = merge_holdout(served['holdout'], served['holdout_seen'], X_held, y_held, seed)
+        with timer.stage('save'):
+            training.save_artifacts(
+                updated,
+                {
+                    'features': features,
+                    'capping_bounds': config.get('capping_bounds'),
+                    'property_type_encoder': served['property_type_encoder'],
+                    'city_encoder': served['city_encoder'],
+                },
+                output_dir,
+                log_target=config.get('log_target', True),
+                extra_config={
+                    'dataset_sha1': config.get('dataset_sha1'),
+                    'metrics': reference['after'] if reference else config.get('metrics'),
+                    'parent_version': config.get('model_version'),
+                    'prediction_tiers': tiers,
+                    'update': {'mode': mode, 'rows': int(len(y_new)), 'rounds': rounds},
+                },
+                holdout=(X_ref, y_ref),
+                holdout_seen=seen,
+            )
+        published = True
+
+    return {
+        'mode': mode,
+        'rows': int(len(y)),
+        'dropped_rows': dropped,
+        'update_rows': int(len(y_new)),
+        'holdout_rows': int(len(y_held)),
+        'capped': bool(served['config'].get('capping_bounds')),
+        'trees_before': _served_booster(served['model']).num_boosted_rounds(),
+        'trees_after': updated.get_booster().num_boosted_rounds(),
+        'parent_version': served['config'].get('model_version'),
+        'checks': checks,
+        'tiers': tiers,
+        'enough_rows': enough_rows,
+        'passed': passed,
+        'published': published,
+        'stages': timer.stages,
+        'total_sec': timer.total,
+        'output_dir': str(output_dir) if published else None,
+        'model': updated,
+    }
@@ -0,0 +1,254 @@
+"""
+Load driver for the upstream proxy endpoints (amenities, reverse geocode,
+location search, batch distances).
+
+A fixed number of client threads send a weighted mix of requests at random
+points for a fixed time and record each response's latency, status and the
+server's own total from its Server-Timing header. While they run, the
+server's processes are sampled for thread counts (Linux /proc), so the
+effect of the per-request budget and of the fan-out pools on gunicorn
+workers shows up next to the latency percentiles.
+
+Run it against a server started with UPSTREAM_SIMULATOR_URL pointing at
+the upstream simulator; `manage.py load_test_endpoints --gunicorn` does
+all of that in one go.
+"""
+
+import os
+import random
+import re
+import socket
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import requests
+
+# Endpoint → relative weight in the default mix: the amenities panel is
+# the heaviest and most frequent call, the rest follow a pin drop or search.
+DEFAULT_MIX = {
+    'amenities': 4,
+    'reverse_geocode': 2,
+    'location_search': 1,
+    'distance_both': 2,
+}
+# Points are drawn around these city centres (lat, lng).
+_CITIES = ((12.9716, 77.5946), (19.0760, 72.8777), (28.6139, 77.2090), (17.3850, 78.4867))
+_SEARCH_TERMS = ("mg road", "indiranagar", "koramangala", "andheri", "bandra", "connaught place",
+                 "hitech city", "whitefield", "powai", "saket")
+_TOTAL_TIMING = re.compile(r'(?:^|,\s*)total;dur=([0-9.]+)')
+
+
+def _point(rng, spread=0.05):
+    lat, lng = rng.choice(_CITIES)
+    return round(lat + rng.uniform(-spread, spread), 5), round(lng + rng.uniform(-spread, spread), 5)
+
+
+def build_request(name, rng, prefix):
+    """(path, params) for one request of the named endpoint."""
+    if name == 'amenities':
+        lat, lng = _point(rng)
+        return f'{prefix}api/all-amenities/', {'lat': lat, 'lng': lng}
+    if name == 'reverse_geocode':
+        lat, lng = _point(rng)
+        return f'{prefix}api/reverse-geocode/', {'lat': lat, 'lon': lng}
+    if name == 'location_search':
+        return f'{prefix}api/location-search/', {'q': f"{rng.choice(_SEARCH_TERMS)} {rng.randint(1, 500)}"}
+    if name == 'distance_both':
+        lat, lng = _point(rng)
+        destinations = '|'.join(f"{d_lat},{d_lng}" for d_lat, d_lng in (_point(rng) for _ in range(8)))
+        return f'{prefix}api/batch-distance-both/', {
+            'origin_lat': lat, 'origin_lng': lng, 'destinations': destinations,
+        }
+    raise ValueError(f"Unknown endpoint: {name}")
+
+
+def _descendants(pid):
+    """pid and all its descendant process ids (Linux)."""
+    children = {}
+    for entry in Path('/proc').iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / 'stat').read_text()
+        except OSError:
+            continue
+        # Field 4 (ppid) follows the parenthesised command name.
+        ppid = int(stat.rsplit(')', 1)[1].split()[1])
+        children.setdefault(ppid, []).append(int(entry.name))
+    found, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        found.append(current)
+        stack.extend(children.get(current, ()))
+    return found
+
+
+def thread_counts(pid):
+    """{pid: threads} for pid and its descendants, or {} where /proc is unavailable."""
+    counts = {}
+    try:
+        pids = _descendants(pid)
+    except OSError:
+        return counts
+    for p in pids:
+        try:
+            for line in Path(f'/proc/{p}/status').read_text().splitlines():
+                if line.startswith('Threads:'):
+                    counts[p] = int(line.split()[1])
+                    break
+        except OSError:
+            continue
+    return counts
+
+
+def _percentiles(values):
+    if not values:
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None, 'mean_ms': None}
+    arr = np.asarray(values) * 1000
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {
+        'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99),
+        'max_ms': float(arr.max()), 'mean_ms': float(arr.mean()),
+    }
+
+
+def run_load(base_url, concurrency=16, duration_sec=30.0, mix=None, prefix='/house-price-prediction/',
+             budget_ms=None, server_pid=None, timeout_sec=30.0, sample_interval_sec=0.5, seed=None):
+    """
+    Drive the endpoints with `concurrency` client threads for duration_sec.
+    Returns a report with overall and per-endpoint throughput, latency
+    percentiles and status counts, plus server thread-count samples when
+    server_pid is given.
+    """
+    mix = dict(mix or DEFAULT_MIX)
+    names = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in names]
+    for name in names:
+        build_request(name, random.Random(0), prefix)
+    headers = {'X-Request-Budget-Ms': str(int(budget_ms))} if budget_ms else {}
+    base_url = base_url.rstrip('/')
+
+    records = []
+    records_lock = threading.Lock()
+    stop_at = time.monotonic() + duration_sec
+    master = random.Random(seed)
+
+    def client(worker_seed):
+        rng = random.Random(worker_seed)
+        session = requests.Session()
+        local = []
+        while time.monotonic() < stop_at:
+            name = rng.choices(names, weights)[0]
+            path, params = build_request(name, rng, prefix)
+            start = time.perf_counter()
+            try:
+                resp = session.get(base_url + path, params=params, headers=headers, timeout=timeout_sec)
+                status = resp.status_code
+                match = _TOTAL_TIMING.search(resp.headers.get('Server-Timing', ''))
+                server_ms = float(match.group(1)) if match else None
+            except requests.RequestException as e:
+                status, server_ms = type(e).__name__, None
+            local.append((name, time.perf_counter() - start, status, server_ms))
+        session.close()
+        with records_lock:
+            records.extend(local)
+
+    samples = []
+    sampler_done = threading.Event()
+
+    def sampler():
+        while not sampler_done.wait(sample_interval_sec):
+            counts = thread_counts(server_pid)
+            if counts:
+                samples.append((len(counts), sum(counts.values()), max(counts.values())))
+
+    threads = [threading.Thread(target=client, args=(master.random(),), daemon=True) for _ in range(concurrency)]
+    sampler_thread = threading.Thread(target=sampler, daemon=True) if server_pid else None
+    started = time.monotonic()
+    if sampler_thread:
+        sampler_thread.start()
+    for t in threads:
+        t.start()
+    peak_client_threads = threading.active_count()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+    sampler_done.set()
+    if sampler_thread:
+        sampler_thread.join()
+
+    def summarise(rows):
+        statuses = {}
+        for _name, _latency, status, _server in rows:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        ok = [latency for _name, latency, status, _server in rows if status == 200]
+        server = [s / 1000 for _name, _latency, _status, s in rows if s is not None]
+        return {
+            'requests': len(rows),
+            'ok': len(ok),
+            'rps': len(rows) / elapsed if elapsed else None,
+            'ok_rps': len(ok) / elapsed if elapsed else None,
+            'statuses': dict(sorted(statuses.items())),
+            'latency': _percentiles([latency for _name, latency, _status, _server in rows]),
+            'ok_latency': _percentiles(ok),
+            'server_total': _percentiles(server),
+        }
+
+    report = {
+        'base_url': base_url,
+        'concurrency': concurrency,
+        'duration_sec': elapsed,
+        'budget_ms': budget_ms,
+        'mix': {name: mix[name] for name in names},
+        'overall': summarise(records),
+        'endpoints': {name: summarise([r for r in records if r[0] == name]) for name in names},
+        'client_threads': peak_client_threads,
+    }
+    if samples:
+        report['server_threads'] = {
+            'samples': len(samples),
+            'processes': max(s[0] for s in samples),
+            'total_mean': float(np.mean([s[1] for s in samples])),
+            'total_max': max(s[1] for s in samples),
+            'per_process_max': max(s[2] for s in samples),
+        }
+    return report
+
+
+def parse_mix(text):
+    """'amenities=4,reverse_geocode=1' → {'amenities': 4, 'reverse_geocode': 1}."""
+    mix = {}
+    for part in filter(None, (p.strip() for p in text.split(','))):
+        name, _, weight = part.partition('=')
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown endpoint in mix: {name} (choose from {', '.join(DEFAULT_MIX)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def wait_until_up(url, timeout_sec=60.0, process=None):
+    """Poll url until it answers; raises RuntimeError if process exits or time runs out."""
+    deadline = time.monotonic() + timeout_sec
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        try:
+            requests.get(url, timeout=2)
+            return
+        except requests.RequestException:
+            time.sleep(0.25)
+    raise RuntimeError(f"Server at {url} did not come up within {timeout_sec:.0f}s")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def gunicorn_env(simulator_url):
+    env = dict(os.environ, UPSTREAM_SIMULATOR_URL=simulator_url)
+    env.setdefault('SECRET_KEY', 'load-test')
+    return env
@@ -0,0 +1,93 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from price_prediction import benchmarks
+
+
+class Command(BaseCommand):
+    help = ("Benchmark the inference and amenity hot paths (upstream providers stubbed). "
+            "Save the JSON with --output and pass it as --baseline on a later commit to compare.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help="Benchmarks or groups to run (default: all)")
+        parser.add_argument('--repeat', type=int, default=20, help="Timed calls per benchmark")
+        parser.add_argument('--warmup', type=int, default=3, help="Untimed calls before timing")
+        parser.add_argument('--threads', type=int, default=8, help="Threads for the cache contention runs")
+        parser.add_argument('--upstream-latency-ms', type=float, default=0.0,
+                            help="Delay added to every stubbed upstream call")
+        parser.add_argument('--list', action='store_true', help="List the benchmarks and exit")
+        parser.add_argument('--output', default=None, help="Write the results JSON here")
+        parser.add_argument('--baseline', default=None, help="Results JSON from an earlier run to compare with")
+        parser.add_argument('--threshold', type=float, default=0.10,
+                            help="Relative median change reported as a regression or improvement")
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help="Exit with an error when any benchmark regressed against --baseline")
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for name, (group, _setup) in benchmarks.BENCHMARKS.items():
+                self.stdout.write(f"{group:<12}{name}")
+            return
+        if options['repeat'] < 1 or options['warmup'] < 0:
+            raise CommandError("--repeat must be at least 1 and --warmup at least 0")
+
+        names = []
+        for name in options['names']:
+            matched = [n for n, (group, _setup) in benchmarks.BENCHMARKS.items() if name in (n, group)]
+            if not matched:
+                raise CommandError(f"Unknown benchmark or group: {name}")
+            names.extend(n for n in matched if n not in names)
+
+        baseline = None
+        if options['baseline']:
+            try:
+                baseline = json.loads(Path(options['baseline']).read_text())
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read baseline: {str(e)}")
+
+        report = benchmarks.run_suite(
+            names or None,
+            repeat=options['repeat'],
+            warmup=options['warmup'],
+            threads=max(1, options['threads']),
+            upstream_latency_ms=options['upstream_latency_ms'],
+        )
+        comparison = benchmarks.compare(baseline, report, options['threshold']) if baseline else {}
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2))
+
+        if options['json']:
+            self.stdout.write(json.dumps(dict(report, comparison=comparison) if baseline else report, indent=2))
+        else:
+            self._write_table(report, comparison, baseline)
+
+        regressions = [name for name, row in comparison.items() if row['verdict'] == 'regression']
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f"Regressed against baseline: {', '.join(regressions)}")
+
+    def _write_table(self, report, comparison, baseline):
+        env = report['environment']
+        self.stdout.write(f"commit {env['commit'] or '?'}  python {env['python']}  xgboost {env['xgboost']}")
+        if baseline:
+            self.stdout.write(f"baseline commit {baseline.get('environment', {}).get('commit') or '?'}")
+        header = f"{'benchmark':<38}{'median ms':>11}{'p95 ms':>10}{'per op us':>12}{'ops/s':>12}"
+        self.stdout.write(header + (f"{'vs base':>10}" if baseline else ""))
+        for name, r in report['results'].items():
+            if 'skipped' in r or 'error' in r:
+                style = self.style.WARNING if 'skipped' in r else self.style.ERROR
+                self.stdout.write(style(f"{name:<38}{r.get('skipped') or r.get('error')}"))
+                continue
+            line = (f"{name:<38}{r['median_ms']:>11.3f}{r['p95_ms']:>10.3f}"
+                    f"{r['per_op_us']:>12.2f}{r['ops_per_sec']:>12,.0f}")
+            row = comparison.get(name)
+            if row:
+                change = f"{row['ratio']:>9.2f}x"
+                if row['verdict'] == 'regression':
+                    change = self.style.ERROR(change)
+                elif row['verdict'] == 'improvement':
+                    change = self.style.SUCCESS(change)
+                line += " " + change
+            self.stdout.write(line)
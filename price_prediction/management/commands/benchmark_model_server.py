@@ -0,0 +1,204 @@
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from price_prediction import model_server, utils
+from price_prediction.benchmarks import SAMPLE_INPUT
+
+MODES = ('in-process', 'model-server')
+
+
+def _memory_kb(pid):
+    """RSS and PSS of a process in KiB (PSS splits shared pages between the processes mapping them)."""
+    values = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                key, _, rest = line.partition(':')
+                if key in ('Rss', 'Pss'):
+                    values[key.lower() + '_kb'] = int(rest.split()[0])
+    except OSError:
+        pass
+    return values
+
+
+class Command(BaseCommand):
+    help = ("Compare prediction throughput and total memory of web worker processes that each load "
+            "the model with the same workers sharing one model server (run_model_server).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=3, help="Worker processes (gunicorn --workers)")
+        parser.add_argument('--threads', type=int, default=4, help="Request threads per worker (gunicorn --threads)")
+        parser.add_argument('--duration', type=float, default=5.0, help="Seconds each mode runs")
+        parser.add_argument('--rows', type=int, default=1, help="Properties per prediction call")
+        parser.add_argument('--tier', choices=utils.PREDICTION_TIERS, default='fast')
+        parser.add_argument('--batch-wait-ms', type=float, default=None)
+        parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+        parser.add_argument('--json', action='store_true', help="Print results as JSON")
+        # Internal: run as one of the benchmark's worker processes.
+        parser.add_argument('--worker', choices=MODES, default=None, help=argparse.SUPPRESS)
+        parser.add_argument('--socket', default=None, help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            return self._worker(options)
+        if not (utils.get_ml_files_path() / 'best_house_price_model.pkl').exists():
+            raise CommandError("No trained model in ML_Files (run train_price_model)")
+        results = [self._run_mode(mode, options) for mode in options['modes']]
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"{'mode':<14}{'workers':>8}{'req/s':>10}{'rows/s':>10}{'p50 ms':>9}{'p99 ms':>9}"
+                          f"{'fallback':>9}{'RSS MB':>9}{'PSS MB':>9}{'server MB':>11}")
+        for r in results:
+            self.stdout.write(
+                f"{r['mode']:<14}{r['workers']:>8}{r['requests_per_sec']:>10.0f}{r['rows_per_sec']:>10.0f}"
+                f"{r['p50_ms']:>9.2f}{r['p99_ms']:>9.2f}{r['fallbacks']:>9}{r['total_rss_mb']:>9.0f}"
+                f"{r['total_pss_mb']:>9.0f}{r['server_rss_mb']:>11.0f}"
+            )
+
+    def _manage(self, *args):
+        return [sys.executable, str(Path(settings.BASE_DIR) / 'manage.py'), *args]
+
+    def _start_server(self, path, options):
+        cmd = self._manage('run_model_server', '--socket', path)
+        if options['batch_wait_ms'] is not None:
+            cmd += ['--batch-wait-ms', str(options['batch_wait_ms'])]
+        server = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"Model server exited:\n{server.stderr.read()[-2000:]}")
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(path)
+                return server
+            except OSError:
+                time.sleep(0.1)
+            finally:
+                probe.close()
+        server.kill()
+        raise CommandError("Model server did not start within 60s")
+
+    def _run_mode(self, mode, options):
+        with tempfile.TemporaryDirectory(prefix='model-server-bench-') as tmp:
+            path = str(Path(tmp) / 'model.sock')
+            server = self._start_server(path, options) if mode == 'model-server' else None
+            try:
+                workers = [
+                    subprocess.Popen(
+                        self._manage('benchmark_model_server', '--worker', mode, '--socket', path,
+                                     '--threads', str(options['threads']), '--duration', str(options['duration']),
+                                     '--rows', str(options['rows']), '--tier', options['tier']),
+                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+                    )
+                    for _ in range(options['workers'])
+                ]
+                # Start the timed loops together, once every worker has loaded what it needs.
+                for worker in workers:
+                    if worker.stdout.readline().strip() != 'ready':
+                        raise CommandError(f"A {mode} benchmark worker failed to start")
+                for worker in workers:
+                    worker.stdin.write('go\n')
+                    worker.stdin.flush()
+                reports = []
+                for worker in workers:
+                    out, _ = worker.communicate(timeout=options['duration'] + 120)
+                    if worker.returncode != 0:
+                        raise CommandError(f"A {mode} benchmark worker failed")
+                    reports.append(json.loads(out))
+                server_memory = _memory_kb(server.pid) if server else {}
+            finally:
+                if server is not None:
+                    server.terminate()
+                    server.wait(timeout=30)
+
+        latencies = sorted(ms for r in reports for ms in r['latencies_ms'])
+        elapsed = max(r['elapsed_sec'] for r in reports)
+        requests = sum(r['requests'] for r in reports)
+        return {
+            'mode': mode,
+            'workers': options['workers'],
+            'threads': options['threads'],
+            'rows_per_request': options['rows'],
+            'tier': options['tier'],
+            'requests': requests,
+            'requests_per_sec': requests / elapsed,
+            'rows_per_sec': requests * options['rows'] / elapsed,
+            'p50_ms': statistics.median(latencies) if latencies else 0.0,
+            'p99_ms': latencies[int(len(latencies) * 0.99)] if latencies else 0.0,
+            'fallbacks': sum(r['fallbacks'] for r in reports),
+            'worker_rss_mb': [r['rss_kb'] / 1024 for r in reports],
+            'server_rss_mb': server_memory.get('rss_kb', 0) / 1024,
+            'total_rss_mb': (sum(r['rss_kb'] for r in reports) + server_memory.get('rss_kb', 0)) / 1024,
+            'total_pss_mb': (sum(r['pss_kb'] for r in reports) + server_memory.get('pss_kb', 0)) / 1024,
+        }
+
+    def _worker(self, options):
+        if options['worker'] == 'model-server':
+            settings.MODEL_SERVER_SOCKET = options['socket']
+        else:
+            settings.MODEL_SERVER_SOCKET = ''
+        rows, tier = options['rows'], options['tier']
+
+        def columns(rng):
+            data = {name: np.full(rows, value) for name, value in SAMPLE_INPUT.items()}
+            data['living area'] = rng.uniform(500, 5000, rows)
+            data['lot area'] = rng.uniform(1000, 10000, rows)
+            return data
+
+        utils.predict_house_prices(columns(np.random.default_rng(0)), tier)
+        sys.stdout.write('ready\n')
+        sys.stdout.flush()
+        sys.stdin.readline()
+
+        latencies = [[] for _ in range(options['threads'])]
+        fallbacks = []
+        start = time.perf_counter()
+        end = start + options['duration']
+
+        def loop(index):
+            rng = np.random.default_rng(index + 1)
+            timings = latencies[index]
+            while time.perf_counter() < end:
+                data = columns(rng)
+                started = time.perf_counter()
+                utils.predict_house_prices(data, tier)
+                timings.append((time.perf_counter() - started) * 1000)
+
+        original = model_server.mark_unavailable
+
+        def counted(error, op):
+            fallbacks.append(op)
+            original(error, op)
+        model_server.mark_unavailable = counted
+
+        threads = [threading.Thread(target=loop, args=(i,)) for i in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        memory = _memory_kb(os.getpid())
+        merged = [ms for timings in latencies for ms in timings]
+        sys.stdout.write(json.dumps({
+            'requests': len(merged),
+            'elapsed_sec': elapsed,
+            'latencies_ms': [round(ms, 3) for ms in merged],
+            'fallbacks': len(fallbacks),
+            'rss_kb': memory.get('rss_kb', 0),
+            'pss_kb': memory.get('pss_kb', 0),
+        }))
@@ -0,0 +1,75 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from price_prediction import streaming_training
+
+
+class Command(BaseCommand):
+    help = ("Benchmark out-of-core training on synthetic CSVs scaled up from House_Price_India.csv. "
+            "Each size trains in its own process so peak RSS is measured per run.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[300_000, 1_000_000],
+                            help="Synthetic dataset sizes to benchmark")
+        parser.add_argument('--chunksize', type=int, default=streaming_training.DEFAULT_CHUNKSIZE)
+        parser.add_argument('--n-estimators', type=int, default=100,
+                            help="Boosting rounds per run (the notebook uses 500)")
+        parser.add_argument('--n-jobs', type=int, default=None)
+        parser.add_argument('--workdir', default=None,
+                            help="Where to write the synthetic CSVs (default: a temporary directory)")
+        parser.add_argument('--json', action='store_true', help="Print results as JSON")
+
+    def handle(self, *args, **options):
+        results = []
+        with tempfile.TemporaryDirectory(prefix='stream-bench-') as tmp:
+            workdir = Path(options['workdir'] or tmp)
+            workdir.mkdir(parents=True, exist_ok=True)
+            for rows in options['rows']:
+                csv_path = workdir / f'synthetic_{rows}.csv'
+                start = time.perf_counter()
+                streaming_training.write_synthetic_csv(csv_path, rows, chunksize=options['chunksize'])
+                generate_sec = time.perf_counter() - start
+                report = self._run(csv_path, options)
+                report.update(
+                    csv_mb=os.path.getsize(csv_path) / 2 ** 20,
+                    generate_sec=generate_sec,
+                    rows_per_sec=report['rows'] / report['total_sec'],
+                )
+                results.append(report)
+                if not options['workdir']:
+                    csv_path.unlink()
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2, default=str))
+            return
+        self.stdout.write(f"{'rows':>10}{'CSV MB':>9}{'chunk':>9}{'bounds s':>10}{'dmatrix s':>11}"
+                          f"{'fit s':>8}{'eval s':>8}{'rows/s':>10}{'peak MB':>9}{'R²':>8}")
+        for r in results:
+            s = r['stages']
+            self.stdout.write(
+                f"{r['rows']:>10}{r['csv_mb']:>9.1f}{r['chunksize']:>9}{s['bounds']:>10.2f}"
+                f"{s['build_dmatrix']:>11.2f}{s['fit']:>8.2f}{s['evaluate']:>8.2f}"
+                f"{r['rows_per_sec']:>10.0f}{r['peak_rss_mb']:>9.0f}{r['metrics']['r2']:>8.4f}"
+            )
+
+    def _run(self, csv_path, options):
+        cmd = [
+            sys.executable, str(Path(settings.BASE_DIR) / 'manage.py'), 'train_price_model',
+            '--stream', '--csv', str(csv_path), '--chunksize', str(options['chunksize']),
+            '--n-estimators', str(options['n_estimators']),
+            '--dry-run', '--no-feature-cache', '--json',
+        ]
+        if options['n_jobs']:
+            cmd += ['--n-jobs', str(options['n_jobs'])]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise CommandError(f"Streaming training failed for {csv_path}:\n{proc.stderr[-2000:]}")
+        return json.loads(proc.stdout)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from price_prediction import comparables
+
+
+class Command(BaseCommand):
+    help = ("Build (or bring up to date) the comparable-sales index in ML_Files, so web workers "
+            "only load it at startup.")
+
+    def handle(self, *args, **options):
+        try:
+            index = comparables.get_index()
+        except FileNotFoundError as e:
+            raise CommandError(f"Missing dataset: {str(e)}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Comparables index: {index.size} sales in {len(index.segments)} segment(s) "
+            f"at {comparables.get_index_path()}"
+        ))
@@ -0,0 +1,57 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from price_prediction import price_tiles
+
+
+class Command(BaseCommand):
+    help = ("Precompute the price-surface map tiles for the served model. Tiles already built for "
+            "the current model version are skipped.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-zoom', type=int, default=price_tiles.DEFAULT_ZOOMS[0])
+        parser.add_argument('--max-zoom', type=int, default=price_tiles.DEFAULT_ZOOMS[1])
+        parser.add_argument('--cells', type=int, default=price_tiles.TILE_CELLS,
+                            help="Grid cells per tile side")
+        parser.add_argument('--profiles', nargs='+', choices=list(price_tiles.PROFILES), default=None,
+                            help="Reference configurations to render (default: all)")
+        parser.add_argument('--workers', type=int, default=None, help="Processes (default: all CPUs)")
+        parser.add_argument('--tiles-per-task', type=int, default=16,
+                            help="Tiles scored together in one model call")
+        parser.add_argument('--model-dir', default=None, help="Model artifacts (default: ML_Files)")
+        parser.add_argument('--force', action='store_true', help="Rebuild tiles that already exist")
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+
+    def handle(self, *args, **options):
+        if not 0 <= options['min_zoom'] <= options['max_zoom'] <= 18:
+            raise CommandError("Zoom levels must satisfy 0 <= --min-zoom <= --max-zoom <= 18")
+        try:
+            report = price_tiles.build_tileset(
+                model_dir=Path(options['model_dir']) if options['model_dir'] else None,
+                zooms=(options['min_zoom'], options['max_zoom']),
+                cells=options['cells'],
+                profiles=options['profiles'],
+                workers=options['workers'],
+                tiles_per_task=max(1, options['tiles_per_task']),
+                force=options['force'],
+            )
+        except FileNotFoundError as e:
+            raise CommandError(f"Missing model artifact: {str(e)}")
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.stdout.write(
+            f"Tileset {report['tileset']}: {report['tiles']} tiles x {report['layers']} layers; "
+            f"built {report['built']}, already present {report['skipped']}"
+        )
+        if report['rows']:
+            self.stdout.write(
+                f"Scored {report['rows']:,} grid cells on {report['workers']} workers "
+                f"({report['rows_per_sec']:,.0f} cells/s)"
+            )
+        for name, seconds in report['stages'].items():
+            self.stdout.write(f"  {name:<10}{seconds:8.3f}s")
+        self.stdout.write(self.style.SUCCESS(f"Tiles in {report['directory']}"))
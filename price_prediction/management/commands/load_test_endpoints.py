@@ -0,0 +1,158 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from price_prediction import load_driver, upstream_simulator
+
+
+class Command(BaseCommand):
+    help = ("Load-test the upstream proxy endpoints and report throughput, p50/p95/p99 latency and "
+            "server thread counts. With --gunicorn, starts the upstream simulator and a gunicorn "
+            "server pointed at it, so no public service is contacted.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default=None, help="Base URL of an already running server")
+        parser.add_argument('--server-pid', type=int, default=None,
+                            help="PID of that server (e.g. the gunicorn master) to sample thread counts")
+        parser.add_argument('--gunicorn', action='store_true',
+                            help="Start gunicorn (and the simulator) for the run")
+        parser.add_argument('--workers', type=int, default=3, help="gunicorn workers (start.sh uses 3)")
+        parser.add_argument('--threads', type=int, default=1, help="gunicorn threads per worker")
+        parser.add_argument('--profile', choices=list(upstream_simulator.PROFILES), default='realistic',
+                            help="Simulator profile when --gunicorn starts one")
+        parser.add_argument('--simulator-config', default=None, help="JSON overrides for the simulator")
+        parser.add_argument('--simulator-url', default=None,
+                            help="Use a simulator that is already running instead of starting one")
+        parser.add_argument('--concurrency', type=int, default=16, help="Client threads")
+        parser.add_argument('--duration', type=float, default=30.0, help="Seconds to run")
+        parser.add_argument('--mix', default=None,
+                            help="Endpoint weights, e.g. amenities=4,reverse_geocode=2,"
+                                 "location_search=1,distance_both=2")
+        parser.add_argument('--budget-ms', type=float, default=None,
+                            help="Send X-Request-Budget-Ms with every request")
+        parser.add_argument('--timeout', type=float, default=30.0, help="Client timeout per request")
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--output', default=None, help="Write the report JSON here")
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+
+    def handle(self, *args, **options):
+        if not options['url'] and not options['gunicorn']:
+            raise CommandError("Pass --url of a running server or --gunicorn to start one")
+        try:
+            mix = load_driver.parse_mix(options['mix']) if options['mix'] else None
+        except ValueError as e:
+            raise CommandError(str(e))
+        prefix = reverse('price_prediction:predict')
+
+        simulator = server = None
+        try:
+            url, server_pid = options['url'], options['server_pid']
+            if options['gunicorn']:
+                simulator_url = options['simulator_url']
+                if not simulator_url:
+                    simulator = upstream_simulator.start_simulator(
+                        profile=options['profile'], overrides=self._overrides(options['simulator_config']),
+                        seed=options['seed'],
+                    )
+                    simulator_url = simulator.url
+                server, url = self._start_gunicorn(options, simulator_url, prefix)
+                server_pid = server.pid
+                self.stderr.write(f"gunicorn {server_pid} at {url} -> upstreams at {simulator_url}")
+
+            report = load_driver.run_load(
+                url,
+                concurrency=max(1, options['concurrency']),
+                duration_sec=options['duration'],
+                mix=mix,
+                prefix=prefix,
+                budget_ms=options['budget_ms'],
+                server_pid=server_pid,
+                timeout_sec=options['timeout'],
+                seed=options['seed'],
+            )
+            if server is not None:
+                report['gunicorn'] = {'workers': options['workers'], 'threads': options['threads']}
+            if simulator is not None:
+                report['simulator'] = {'profile': options['profile'], 'requests': simulator.stats_snapshot()}
+        finally:
+            if server is not None:
+                server.terminate()
+                try:
+                    server.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    server.kill()
+            if simulator is not None:
+                simulator.shutdown()
+                simulator.server_close()
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2))
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._write_report(report)
+
+    def _overrides(self, path):
+        if not path:
+            return None
+        try:
+            return json.loads(Path(path).read_text())
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read simulator config: {str(e)}")
+
+    def _start_gunicorn(self, options, simulator_url, prefix):
+        port = load_driver.free_port()
+        url = f"http://127.0.0.1:{port}"
+        cmd = [
+            sys.executable, '-m', 'gunicorn', 'House_Price_Prediction.wsgi:application',
+            '--bind', f'127.0.0.1:{port}',
+            '--workers', str(options['workers']),
+            '--threads', str(options['threads']),
+            '--timeout', '120',
+            '--chdir', str(settings.BASE_DIR),
+            '--log-level', 'warning',
+        ]
+        server = subprocess.Popen(cmd, env=load_driver.gunicorn_env(simulator_url), cwd=settings.BASE_DIR)
+        try:
+            load_driver.wait_until_up(f"{url}{prefix}api/amenity-prefetch-stats/", process=server)
+        except RuntimeError as e:
+            server.kill()
+            raise CommandError(str(e))
+        return server, url
+
+    def _write_report(self, report):
+        self.stdout.write(
+            f"{report['concurrency']} clients for {report['duration_sec']:.1f}s against {report['base_url']}"
+            + (f", budget {report['budget_ms']:.0f} ms" if report['budget_ms'] else "")
+        )
+        self.stdout.write(f"{'endpoint':<18}{'reqs':>7}{'ok':>7}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}"
+                          f"{'p99 ms':>9}{'max ms':>9}  statuses")
+        rows = list(report['endpoints'].items()) + [('overall', report['overall'])]
+        for name, r in rows:
+            lat = r['latency']
+            if not r['requests']:
+                self.stdout.write(f"{name:<18}{0:>7}")
+                continue
+            statuses = ' '.join(f"{k}:{v}" for k, v in r['statuses'].items())
+            self.stdout.write(
+                f"{name:<18}{r['requests']:>7}{r['ok']:>7}{r['rps']:>8.1f}{lat['p50_ms']:>9.0f}"
+                f"{lat['p95_ms']:>9.0f}{lat['p99_ms']:>9.0f}{lat['max_ms']:>9.0f}  {statuses}"
+            )
+        threads = report.get('server_threads')
+        if threads:
+            self.stdout.write(
+                f"Server threads: {threads['processes']} processes, total mean {threads['total_mean']:.0f} / "
+                f"max {threads['total_max']}, busiest process {threads['per_process_max']}"
+            )
+        self.stdout.write(f"Client threads: {report['client_threads']}")
+        if 'simulator' in report:
+            counts = ', '.join(
+                f"{name} {c['ok']}/{c['error']}/{c['timeout']}"
+                for name, c in sorted(report['simulator']['requests'].items())
+            )
+            self.stdout.write(f"Simulator ({report['simulator']['profile']}) ok/error/timeout: {counts}")
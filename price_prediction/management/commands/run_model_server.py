@@ -0,0 +1,47 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from price_prediction.model_server import ModelServer
+
+
+class Command(BaseCommand):
+    help = ("Serve the price model to all web workers over a Unix socket (MODEL_SERVER_SOCKET), "
+            "batching their prediction requests together.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socket', default=None, help="Socket path (default: MODEL_SERVER_SOCKET)")
+        parser.add_argument('--max-batch-rows', type=int, default=None)
+        parser.add_argument('--batch-wait-ms', type=float, default=None,
+                            help="How long to hold a batch open for more requests (0 = only what is queued)")
+        parser.add_argument('--if-configured', action='store_true',
+                            help="Exit quietly when no socket is configured (for start scripts)")
+
+    def handle(self, *args, **options):
+        path = options['socket'] or getattr(settings, 'MODEL_SERVER_SOCKET', '')
+        if not path:
+            if options['if_configured']:
+                return
+            raise CommandError("Set MODEL_SERVER_SOCKET or pass --socket")
+        server = ModelServer(path, options['max_batch_rows'], options['batch_wait_ms'])
+        try:
+            server.bind()
+        except Exception as e:
+            raise CommandError(f"Could not start the model server: {str(e)}")
+        # SIGTERM (systemd, docker stop) closes the listener so the socket file goes too.
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda signum, frame: server.close())
+        self.stdout.write(self.style.SUCCESS(
+            f"Model server on {path} (batches up to {server.max_batch_rows} rows, "
+            f"wait {server.batch_wait * 1000:g} ms)"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            self.stdout.write(f"Served {server.stats['requests']} requests in {server.stats['batches']} batches "
+                              f"({server.stats['rows']} rows)")
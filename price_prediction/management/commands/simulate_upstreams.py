@@ -0,0 +1,46 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from price_prediction import upstream_simulator
+
+
+class Command(BaseCommand):
+    help = ("Serve local stand-ins for Overpass, Photon, Nominatim and the Distance Matrix API "
+            "with configurable latency, errors and timeouts. Point the app at it with "
+            "UPSTREAM_SIMULATOR_URL.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--profile', choices=list(upstream_simulator.PROFILES), default='realistic')
+        parser.add_argument('--config', default=None,
+                            help="JSON file of per-provider overrides, e.g. "
+                                 '{"overpass": {"median_ms": 2000, "mirrors": {"1": {"error_rate": 1}}}}')
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        overrides = None
+        if options['config']:
+            try:
+                overrides = json.loads(Path(options['config']).read_text())
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read simulator config: {str(e)}")
+        settings = upstream_simulator.resolve_profile(options['profile'], overrides)
+        server = upstream_simulator.SimulatorServer((options['host'], options['port']), settings, options['seed'])
+        for name, provider in settings.items():
+            self.stdout.write(
+                f"  {name:<10} median {provider['median_ms']:>6} ms  p95 {provider['p95_ms']:>6} ms  "
+                f"errors {provider['error_rate']:.1%} ({provider['error_status']})  "
+                f"timeouts {provider['timeout_rate']:.1%}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Simulating upstreams at {server.url}"))
+        self.stdout.write(f"Run the app with UPSTREAM_SIMULATOR_URL={server.url}; stats at {server.url}/_stats")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(json.dumps(server.stats_snapshot(), indent=2))
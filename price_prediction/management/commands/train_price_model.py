@@ -0,0 +1,142 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from price_prediction import streaming_training, training
+
+
+class Command(BaseCommand):
+    help = "Retrain the house price model from ML_Files/House_Price_India.csv and write its artifacts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--n-jobs', type=int, default=None,
+                            help="XGBoost threads (default: all CPUs)")
+        parser.add_argument('--n-estimators', type=int, default=training.DEFAULT_PARAMS['n_estimators'])
+        parser.add_argument('--max-depth', type=int, default=training.DEFAULT_PARAMS['max_depth'])
+        parser.add_argument('--learning-rate', type=float, default=training.DEFAULT_PARAMS['learning_rate'])
+        parser.add_argument('--output-dir', default=None,
+                            help="Where to write the .pkl artifacts (default: ML_Files)")
+        parser.add_argument('--no-feature-cache', action='store_true',
+                            help="Recompute the preprocessed feature matrix even if cached")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Train and evaluate without writing artifacts")
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+        stream = parser.add_argument_group('out-of-core training')
+        stream.add_argument('--stream', action='store_true',
+                            help="Read the CSV in chunks and train through XGBoost external memory")
+        stream.add_argument('--csv', default=None, help="CSV to stream (default: ML_Files/House_Price_India.csv)")
+        stream.add_argument('--chunksize', type=int, default=streaming_training.DEFAULT_CHUNKSIZE)
+        search = parser.add_argument_group('hyperparameter search')
+        search.add_argument('--search', action='store_true',
+                            help="Tune hyperparameters instead of training the notebook configuration")
+        search.add_argument('--candidates', type=int, default=24, help="Configurations to try")
+        search.add_argument('--budget-sec', type=float, default=600,
+                            help="Wall-clock budget for the whole search")
+        search.add_argument('--latency-budget-ms', type=float, default=None,
+                            help="Only select models whose median single-row predict time fits")
+        search.add_argument('--workers', type=int, default=None,
+                            help="Search processes (default: all CPUs)")
+
+    def handle(self, *args, **options):
+        params = {
+            'n_estimators': options['n_estimators'],
+            'max_depth': options['max_depth'],
+            'learning_rate': options['learning_rate'],
+        }
+        output_dir = Path(options['output_dir']) if options['output_dir'] else None
+        common = {
+            'output_dir': output_dir,
+            'use_cache': not options['no_feature_cache'],
+            'save': not options['dry_run'],
+        }
+        try:
+            if options['search']:
+                report = training.search(
+                    candidates=options['candidates'],
+                    budget_sec=options['budget_sec'],
+                    latency_budget_ms=options['latency_budget_ms'],
+                    workers=options['workers'],
+                    **common,
+                )
+            elif options['stream']:
+                report = streaming_training.stream_train(
+                    csv_path=options['csv'],
+                    chunksize=options['chunksize'],
+                    params=params,
+                    n_jobs=options['n_jobs'],
+                    **common,
+                )
+            else:
+                report = training.train(params=params, n_jobs=options['n_jobs'], **common)
+        except FileNotFoundError as e:
+            raise CommandError(f"Training data not found: {str(e)}")
+        except (RuntimeError, ValueError) as e:
+            raise CommandError(str(e))
+        report.pop('model')
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2, default=str))
+            return
+
+        if options['stream']:
+            self.stdout.write(
+                f"Rows: {report['rows']} (train {report['train_rows']}, test {report['test_rows']}) "
+                f"in chunks of {report['chunksize']}; capping bounds "
+                f"{'cached' if report['bounds_cache_hit'] else 'computed'}"
+                f"{'' if report['bounds_exact'] else ' from a sample'}; peak RSS {report['peak_rss_mb']:.0f} MB"
+            )
+        else:
+            self.stdout.write(
+                f"Rows: {report['rows']} (train {report['train_rows']}, test {report['test_rows']}); "
+                f"feature cache {'hit' if report['feature_cache_hit'] else 'miss'}"
+            )
+        if options['search']:
+            self._write_search_table(report)
+        self.stdout.write("Stage timings:")
+        for name, seconds in report['stages'].items():
+            self.stdout.write(f"  {name:<14}{seconds:8.3f}s")
+        self.stdout.write(f"  {'total':<14}{report['total_sec']:8.3f}s")
+        metrics = report['metrics']
+        self.stdout.write(
+            f"MAE: {metrics['mae']:,.0f}  MAPE: {metrics['mape']:.2f}%  R²: {metrics['r2']:.4f}"
+        )
+        if report.get('tiers'):
+            self._write_tiers(report['tiers'])
+        if report['output_dir']:
+            self.stdout.write(self.style.SUCCESS(f"Artifacts written to {report['output_dir']}"))
+            self.stdout.write(f"Running servers using that directory pick them up within MODEL_RELOAD_CHECK_SEC "
+                              f"({getattr(settings, 'MODEL_RELOAD_CHECK_SEC', 5.0):g}s)")
+        else:
+            self.stdout.write("Dry run: no artifacts written")
+
+    def _write_tiers(self, tiers):
+        self.stdout.write("Prediction tiers:")
+        for name, tier in tiers.items():
+            self.stdout.write(
+                f"  {name:<9}{tier['rounds']:>5} trees  MAE {tier['mae']:>12,.0f}  MAPE {tier['mape']:6.2f}%  "
+                f"R² {tier['r2']:.4f}  {tier['latency_ms']:.3f} ms/row"
+            )
+
+    def _write_search_table(self, report):
+        self.stdout.write(
+            f"Search: {len(report['candidates'])} candidates on {report['workers']} workers "
+            f"({report['n_jobs_per_worker']} threads each)"
+        )
+        self.stdout.write(f"  {'#':>3} {'status':<10}{'trees':>6}{'MAE(log)':>10}{'MAPE(log)':>11}"
+                          f"{'ms/row':>9}{'us/row@batch':>14}  params")
+        for c in report['candidates']:
+            mark = '*' if c['index'] == report['selected'] else ' '
+            if 'mae' not in c:
+                self.stdout.write(f"{mark} {c['index']:>3} {c['status']:<10}")
+                continue
+            params = ', '.join(f"{k}={v}" for k, v in c['params'].items())
+            self.stdout.write(
+                f"{mark} {c['index']:>3} {c['status']:<10}{c['best_iteration'] + 1:>6}{c['mae']:>10.4f}"
+                f"{c['mape']:>10.3f}%{c['latency_ms']:>9.3f}{c['batch_us_per_row']:>14.2f}  {params}"
+            )
+        if report['latency_budget_ms'] is not None and not report['within_latency_budget']:
+            self.stdout.write(self.style.WARNING(
+                f"No candidate met the {report['latency_budget_ms']} ms latency budget; selected the fastest"
+            ))
@@ -0,0 +1,90 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from price_prediction import incremental_training
+
+
+class Command(BaseCommand):
+    help = ("Update the served house price model with newly observed sales (same columns as "
+            "House_Price_India.csv) and publish it if it does not regress.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv', help="CSV with the new sales only")
+        parser.add_argument('--mode', choices=incremental_training.MODES, default='add-trees')
+        parser.add_argument('--rounds', type=int, default=50, help="Trees to add in add-trees mode")
+        parser.add_argument('--learning-rate', type=float, default=None,
+                            help="Learning rate for the added trees (default: the served model's)")
+        parser.add_argument('--holdout-fraction', type=float, default=0.2,
+                            help="Share of the new rows held back for the regression check")
+        parser.add_argument('--max-regression', type=float, default=0.01,
+                            help="Largest allowed relative MAE increase on any holdout set")
+        parser.add_argument('--model-dir', default=None, help="Served artifacts (default: ML_Files)")
+        parser.add_argument('--output-dir', default=None, help="Where to publish (default: --model-dir)")
+        parser.add_argument('--n-jobs', type=int, default=None)
+        parser.add_argument('--dry-run', action='store_true', help="Update and check without publishing")
+        parser.add_argument('--force', action='store_true', help="Publish even if the check fails")
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+
+    def handle(self, *args, **options):
+        if not 0 < options['holdout_fraction'] < 1:
+            raise CommandError("--holdout-fraction must be between 0 and 1 (exclusive)")
+        try:
+            frame = pd.read_csv(options['csv'])
+            report = incremental_training.incremental_update(
+                frame,
+                mode=options['mode'],
+                rounds=options['rounds'],
+                learning_rate=options['learning_rate'],
+                holdout_fraction=options['holdout_fraction'],
+                max_regression=options['max_regression'],
+                model_dir=Path(options['model_dir']) if options['model_dir'] else None,
+                output_dir=Path(options['output_dir']) if options['output_dir'] else None,
+                n_jobs=options['n_jobs'],
+                publish=not options['dry_run'],
+                force=options['force'],
+            )
+        except FileNotFoundError as e:
+            raise CommandError(f"Missing file: {str(e)}")
+        except (KeyError, ValueError) as e:
+            raise CommandError(f"Could not update model: {str(e)}")
+        report.pop('model')
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2, default=str))
+        else:
+            self.stdout.write(
+                f"{report['mode']}: {report['update_rows']} rows used, {report['holdout_rows']} held back, "
+                f"{report['dropped_rows']} dropped; trees {report['trees_before']} -> {report['trees_after']}"
+            )
+            if not report['capped']:
+                self.stdout.write(self.style.WARNING(
+                    "Served config has no capping bounds; new rows were not IQR-capped"
+                ))
+            for name, check in report['checks'].items():
+                status = self.style.SUCCESS('ok') if check['passed'] else self.style.ERROR('REGRESSED')
+                self.stdout.write(
+                    f"  {name:<10} {check['rows']:>6} rows  MAE {check['before']['mae']:,.0f} -> "
+                    f"{check['after']['mae']:,.0f}  MAPE {check['before']['mape']:.2f}% -> "
+                    f"{check['after']['mape']:.2f}%  {status}"
+                )
+            if not report['enough_rows']:
+                self.stdout.write(self.style.WARNING(
+                    f"No holdout set has {incremental_training.MIN_CHECK_ROWS} rows; the check cannot pass"
+                ))
+            self.stdout.write("Stage timings:")
+            for name, seconds in report['stages'].items():
+                self.stdout.write(f"  {name:<14}{seconds:8.3f}s")
+            if report['published']:
+                self.stdout.write(self.style.SUCCESS(f"Published to {report['output_dir']}"))
+                self.stdout.write(f"Running servers pick it up within MODEL_RELOAD_CHECK_SEC "
+                                  f"({getattr(settings, 'MODEL_RELOAD_CHECK_SEC', 5.0):g}s)")
+            elif options['dry_run']:
+                self.stdout.write("Dry run: nothing published")
+
+        if not report['passed'] and not options['force'] and not options['dry_run']:
+            reason = "regressed" if report['enough_rows'] else "was not checked on enough rows"
+            raise CommandError(f"Updated model {reason}; served model left unchanged (use --force to publish anyway)")
@@ -0,0 +1,444 @@
+"""
+Process-local metrics (counters, gauges, histograms) exported in the
+Prometheus text format and aggregated across gunicorn workers.
+
+Recording only touches an in-memory dict under a per-metric lock. A
+background thread in each process writes a JSON snapshot of its values to
+METRICS_DIR (metrics_<pid>_<start time>.json, atomic rename, so a new
+process that reuses a pid doesn't overwrite an exited one's file) about
+once a second, and the /metrics view merges every snapshot it finds.
+Counters and histograms are summed over all processes; gauges such as
+in-flight requests only count live processes. When a process has exited,
+its counters and histograms are folded into aggregate.json (under a file
+lock) before its snapshot is deleted, so exported totals never go down
+and Prometheus doesn't see a counter reset.
+
+Management commands (run_model_server, benchmarks, training) record to
+their own subdirectory, METRICS_DIR/<command>, set by manage.py through
+METRICS_SOURCE, so they don't show up in the web workers' totals;
+/metrics?source=<command> exports one of them.
+"""
+
+import atexit
+import bisect
+import fcntl
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+# Seconds; covers cached lookups (sub-millisecond) up to the upstream budget.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_REGISTRY = {}
+_state = {'flusher': None, 'pid': None, 'start': None, 'dirty': False}
+_state_lock = threading.Lock()
+
+WEB_SOURCE = 'web'
+_SOURCE_NAME = re.compile(r'^[\w-]+$')
+_AGGREGATE = 'aggregate.json'
+
+
+def enabled():
+    return bool(getattr(settings, 'METRICS_ENABLED', True))
+
+
+def current_source():
+    """Which processes this one records with: 'web', or the management command it runs."""
+    source = os.environ.get('METRICS_SOURCE') or WEB_SOURCE
+    return source if _SOURCE_NAME.match(source) else WEB_SOURCE
+
+
+def metrics_dir(source=None):
+    base = Path(getattr(settings, 'METRICS_DIR', None) or Path(tempfile.gettempdir()) / 'house_price_metrics')
+    source = source or current_source()
+    return base if source == WEB_SOURCE else base / source
+
+
+def sources():
+    """'web' plus every management command that has recorded metrics."""
+    base = metrics_dir(WEB_SOURCE)
+    found = [WEB_SOURCE]
+    if base.is_dir():
+        found += sorted(p.name for p in base.iterdir() if p.is_dir() and _SOURCE_NAME.match(p.name))
+    return found
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _REGISTRY[name] = self
+
+    def _touch(self):
+        if _state['pid'] != os.getpid():
+            _start_flusher()
+        _state['dirty'] = True
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), value if not isinstance(value, list) else list(value)]
+                    for key, value in self._values.items()]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1.0):
+        if not enabled():
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+        self._touch()
+
+
+class Gauge(_Metric):
+    """Per-process value; the exported value is the sum over live processes."""
+    kind = 'gauge'
+
+    def inc(self, *labels, amount=1.0):
+        if not enabled():
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+        self._touch()
+
+    def dec(self, *labels, amount=1.0):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        if not enabled():
+            return
+        with self._lock:
+            self._values[labels] = float(value)
+        self._touch()
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+        self._touch()
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        if not enabled():
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                # One slot per bucket plus +Inf, then sum and count.
+                counts = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            counts[index] += 1
+            counts[-2] += value
+            counts[-1] += 1
+        self._touch()
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+
+# --- Metrics -----------------------------------------------------------------
+
+HTTP_REQUESTS = Counter('http_requests_total', "HTTP requests by view, method and status",
+                        ('view', 'method', 'status'))
+HTTP_LATENCY = Histogram('http_request_duration_seconds', "Time to produce the response, by view", ('view',))
+HTTP_IN_FLIGHT = Gauge('http_requests_in_flight', "Requests being handled, by view", ('view',))
+MODEL_LOAD = Histogram('model_load_seconds', "Loading the model artifacts from ML_Files",
+                       buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+FEATURE_BUILD = Histogram('model_feature_build_seconds', "Encoding and engineering model features", ('kind',))
+INFERENCE = Histogram('model_inference_seconds', "Model evaluation (predict or contributions)", ('kind',))
+PREDICTION_ROWS = Counter('model_predicted_rows_total', "Rows scored by the model", ('kind',))
+UPSTREAM_LATENCY = Histogram('upstream_request_duration_seconds', "Upstream provider calls by outcome",
+                             ('provider', 'outcome'))
+OVERPASS_RACE = Counter('overpass_race_total', "Overpass mirror races by result and winning mirror",
+                        ('result', 'mirror'))
+JSON_ENCODE = Histogram('api_json_encode_seconds', "Encoding API response bodies to JSON, by view", ('view',))
+API_RESPONSE_BYTES = Histogram('api_response_bytes', "API response bodies as sent, by view and content encoding",
+                               ('view', 'encoding'),
+                               buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304))
+API_UNCOMPRESSED_BYTES = Counter('api_response_uncompressed_bytes_total',
+                                 "API response bytes before compression, by view", ('view',))
+CACHE_REQUESTS = Counter('cache_requests_total', "Cache lookups by cache and result (hit or miss)",
+                         ('cache', 'result'))
+THREAD_BUDGET = Gauge('thread_budget', "Thread budget of each process: CPUs (online, cgroup quota, usable), "
+                      "web workers and inference threads", ('pid', 'role', 'kind'))
+INFERENCE_THREADS = Histogram('model_inference_threads', "Native threads granted per model call, by kind", ('kind',),
+                              buckets=(1, 2, 4, 8, 16, 32, 64))
+MODEL_SERVER_REQUESTS = Counter('model_server_requests_total',
+                                "Worker calls to the model server by op and result (ok, error, fallback)",
+                                ('op', 'result'))
+MODEL_SERVER_LATENCY = Histogram('model_server_request_seconds', "Round trip to the model server, by op", ('op',))
+MODEL_SERVER_BATCH_ROWS = Histogram('model_server_batch_rows', "Rows per model call in the model server, by op",
+                                    ('op',), buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096))
+MODEL_SERVER_BATCH_REQUESTS = Histogram('model_server_batch_requests',
+                                        "Worker requests merged into one model call, by op",
+                                        ('op',), buckets=(1, 2, 3, 4, 6, 8, 12, 16, 24, 32, 64))
+AMENITY_PREFETCH = Counter('amenity_prefetch_total',
+                           "Background amenity prefetches by result (scheduled, completed, failed, used, "
+                           "skipped_cached, skipped_inflight, dropped)", ('result',))
+AMENITY_PREFETCH_ACTIVE = Gauge('amenity_prefetch_active', "Amenity prefetches running")
+
+
+def cache_lookup(cache, hit):
+    CACHE_REQUESTS.inc(cache, 'hit' if hit else 'miss')
+
+
+# --- Snapshots -----------------------------------------------------------------
+
+def _process_start(pid):
+    """Start time of a process (clock ticks since boot) from /proc, or None where unavailable."""
+    try:
+        stat = Path(f'/proc/{pid}/stat').read_text()
+    except OSError:
+        return None
+    # Fields after the parenthesised command name; starttime is the 22nd field.
+    fields = stat.rpartition(')')[2].split()
+    return fields[19] if len(fields) > 19 else None
+
+
+def _snapshot():
+    return {
+        'pid': os.getpid(),
+        'start': _state['start'],
+        'written_at': time.time(),
+        'metrics': {name: metric.snapshot() for name, metric in _REGISTRY.items()},
+    }
+
+
+def flush():
+    """Write this process's snapshot now (if anything changed since the last one)."""
+    if not _state['dirty']:
+        return
+    _state['dirty'] = False
+    directory = metrics_dir()
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / _snapshot_name()
+        tmp = path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(_snapshot(), separators=(',', ':')))
+        os.replace(tmp, path)
+    except OSError:
+        _state['dirty'] = True
+
+
+def _flush_loop():
+    interval = float(getattr(settings, 'METRICS_FLUSH_SEC', 1.0))
+    while True:
+        time.sleep(interval)
+        flush()
+
+
+def _snapshot_name():
+    return f"metrics_{os.getpid()}_{_state['start'] or 0}.json"
+
+
+def _start_flusher():
+    # Per process: gunicorn forks workers after the app may have recorded.
+    with _state_lock:
+        if _state['pid'] == os.getpid():
+            return
+        _state['pid'] = os.getpid()
+        _state['start'] = _process_start(os.getpid())
+        if _state['flusher'] is None:
+            atexit.register(flush)
+        thread = threading.Thread(target=_flush_loop, name='metrics-flush', daemon=True)
+        _state['flusher'] = thread
+        thread.start()
+
+
+def _reset_after_fork():
+    # The parent reports what it recorded before forking; the child starts from zero.
+    for metric in _REGISTRY.values():
+        metric._values = {}
+        metric._lock = threading.Lock()
+    _state['dirty'] = False
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _alive(pid, start=None):
+    if not isinstance(pid, int) or pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    # A live process with a different start time has only reused the pid.
+    return start is None or _process_start(pid) in (None, start)
+
+
+def _merge(merged, metrics_values, gauges=True):
+    for name, values in metrics_values.items():
+        metric = _REGISTRY.get(name)
+        if metric is None or (metric.kind == 'gauge' and not gauges):
+            continue
+        target = merged.setdefault(name, {})
+        for key, value in values:
+            key = tuple(key)
+            if isinstance(value, list):
+                current = target.get(key)
+                target[key] = list(value) if current is None else [a + b for a, b in zip(current, value)]
+            else:
+                target[key] = target.get(key, 0.0) + value
+
+
+def _as_pairs(merged):
+    return {name: [[list(key), value] for key, value in values.items()] for name, values in merged.items()}
+
+
+def _read_aggregate(directory):
+    try:
+        return json.loads((directory / _AGGREGATE).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _fold_dead(directory, dead):
+    """
+    Add exited processes' counters and histograms to aggregate.json, then
+    delete their snapshots. The aggregate records the snapshots folded into
+    it until they are gone, so one is never counted twice.
+    """
+    aggregate = _read_aggregate(directory)
+    folded = set(aggregate.get('folded', []))
+    merged = {}
+    _merge(merged, aggregate.get('metrics', {}))
+    for path, data in dead:
+        if path.name not in folded:
+            _merge(merged, data.get('metrics', {}), gauges=False)
+            folded.add(path.name)
+    folded = sorted(name for name in folded if (directory / name).exists())
+    tmp = directory / (_AGGREGATE + '.tmp')
+    tmp.write_text(json.dumps({'folded': folded, 'metrics': _as_pairs(merged)}, separators=(',', ':')))
+    os.replace(tmp, directory / _AGGREGATE)
+    for path, _ in dead:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+def _read_snapshots(source=None):
+    source = source or current_source()
+    own = source == current_source()
+    snapshots = [dict(_snapshot(), alive=True)] if own else []
+    directory = metrics_dir(source)
+    if not directory.is_dir():
+        return snapshots
+    # Scrapes from different workers take turns, so a snapshot being folded
+    # is never read both on its own and through the aggregate.
+    with open(directory / '.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        dead = []
+        for path in directory.glob('metrics_*.json'):
+            if own and path.name == _snapshot_name():
+                continue
+            try:
+                data = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            if _alive(data.get('pid'), data.get('start')):
+                snapshots.append(dict(data, alive=True))
+            else:
+                dead.append((path, data))
+        if dead:
+            try:
+                _fold_dead(directory, dead)
+            except OSError:
+                pass
+        aggregate = _read_aggregate(directory)
+    folded = set(aggregate.get('folded', []))
+    for path, data in dead:
+        if path.name not in folded:
+            # Couldn't fold (read-only directory): still count it this time.
+            snapshots.append(dict(data, alive=False))
+    if aggregate:
+        snapshots.append({'metrics': aggregate.get('metrics', {}), 'alive': False})
+    return snapshots
+
+
+def collect(source=None):
+    """name → {key tuple: merged value} over every process's snapshot."""
+    merged = {name: {} for name in _REGISTRY}
+    for snapshot in _read_snapshots(source):
+        _merge(merged, snapshot.get('metrics', {}), gauges=snapshot['alive'])
+    return merged
+
+
+# --- Exposition ----------------------------------------------------------------
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{n}="{_escape(v)}"' for n, v in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render(source=None):
+    """All metrics, merged across processes, in the Prometheus text format (0.0.4)."""
+    merged = collect(source)
+    lines = []
+    for name, metric in _REGISTRY.items():
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        for key, value in sorted(merged[name].items()):
+            if metric.kind != 'histogram':
+                lines.append(f'{name}{_labels(metric.labelnames, key)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets + (float('inf'),), value[:-2]):
+                cumulative += count
+                le = _labels(metric.labelnames, key, [('le', _number(bound))])
+                lines.append(f'{name}_bucket{le} {_number(cumulative)}')
+            lines.append(f'{name}_sum{_labels(metric.labelnames, key)} {_number(value[-2])}')
+            lines.append(f'{name}_count{_labels(metric.labelnames, key)} {_number(value[-1])}')
+
+    # Hit ratios, derived from cache_requests_total for dashboards without PromQL.
+    lines.append('# HELP cache_hit_ratio Share of cache lookups that were hits, since the counters started')
+    lines.append('# TYPE cache_hit_ratio gauge')
+    totals = {}
+    for (cache, result), count in merged['cache_requests_total'].items():
+        hits, lookups = totals.get(cache, (0.0, 0.0))
+        totals[cache] = (hits + (count if result == 'hit' else 0.0), lookups + count)
+    for cache, (hits, lookups) in sorted(totals.items()):
+        if lookups:
+            lines.append(f'cache_hit_ratio{_labels(("cache",), (cache,))} {_number(hits / lookups)}')
+    return '\n'.join(lines) + '\n'
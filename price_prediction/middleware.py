@@ -0,0 +1,197 @@
+"""
+Request middleware for the price_prediction app.
+"""
+
+import hmac
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class StaticFilesMiddleware:
+    """
+    Serves collected static files (see static_assets) ahead of the rest of
+    the stack. Off under DEBUG, where runserver serves them from the
+    source directories, and when STATIC_SERVE is False (e.g. nginx serves
+    STATIC_ROOT).
+    """
+
+    def __init__(self, get_response):
+        from .static_assets import StaticIndex, static_url_prefix
+
+        prefix = static_url_prefix()
+        if not getattr(settings, 'STATIC_SERVE', not settings.DEBUG) or prefix is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = prefix
+        self.index = StaticIndex(settings.STATIC_ROOT, prefix)
+        if not self.index.files:
+            logger.warning(f"No collected static files in {settings.STATIC_ROOT}; run collectstatic")
+
+    def __call__(self, request):
+        if not request.path_info.startswith(self.prefix) or request.method not in ('GET', 'HEAD'):
+            return self.get_response(request)
+        entry = self.index.get(request.path_info)
+        if entry is None:
+            return self.get_response(request)
+        return self._serve(request, entry)
+
+    def _serve(self, request, entry):
+        from .page_cache import negotiate_encoding
+        from .static_assets import IMMUTABLE
+
+        coding = negotiate_encoding(request, entry['variants'])
+        path, size = entry['variants'][coding]
+        etag = f'"{entry["etag"]}{"" if coding == "identity" else "-" + coding}"'
+        response = FileResponse(open(path, 'rb'), content_type=entry['content_type'])
+        del response['Content-Disposition']
+        response['Content-Length'] = str(size)
+        if coding != 'identity':
+            response['Content-Encoding'] = coding
+        if len(entry['variants']) > 1:
+            response['Vary'] = 'Accept-Encoding'
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(entry['last_modified'])
+        response['Cache-Control'] = IMMUTABLE if entry['immutable'] else 'no-cache'
+        response['X-Content-Type-Options'] = 'nosniff'
+        conditional = get_conditional_response(
+            request, etag=etag, last_modified=entry['last_modified'], response=response,
+        )
+        if conditional is not response:
+            response.close()
+        return conditional
+
+
+class MetricsMiddleware:
+    """
+    Per-view latency, status codes and in-flight requests. Views are labelled
+    by URL name (e.g. price_prediction:fetch_all_amenities) so the label set
+    stays small; requests that match no URL are labelled 'unresolved'.
+    """
+
+    def __init__(self, get_response):
+        if not metrics.enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            view = getattr(request, '_metrics_view', None)
+            if view is not None:
+                metrics.HTTP_IN_FLIGHT.dec(view)
+        view = view or 'unresolved'
+        metrics.HTTP_LATENCY.observe(time.perf_counter() - start, view)
+        metrics.HTTP_REQUESTS.inc(view, request.method, str(response.status_code))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        view = (match.view_name if match else None) or getattr(view_func, '__name__', 'unknown')
+        request._metrics_view = view
+        metrics.HTTP_IN_FLIGHT.inc(view)
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a PROFILING_SAMPLE_RATE fraction of requests, and any request
+    whose X-Profile-Request header matches PROFILING_TOKEN (see profiling).
+    Profiled responses carry X-Profile-Id. When PROFILING_ENABLED is off the
+    middleware removes itself from the stack at startup.
+    """
+
+    header = 'X-Profile-Request'
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = float(getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0))
+        self.token = getattr(settings, 'PROFILING_TOKEN', '')
+        self.exclude = tuple(getattr(settings, 'PROFILING_EXCLUDE_PATHS', ()))
+
+    def _trigger(self, request):
+        if self.token and request.headers.get(self.header):
+            return 'header' if hmac.compare_digest(request.headers[self.header], self.token) else None
+        if self.sample_rate > 0 and not request.path.startswith(self.exclude) and random.random() < self.sample_rate:
+            return 'sampled'
+        return None
+
+    def __call__(self, request):
+        trigger = self._trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+        from . import profiling
+
+        profiler = profiling.try_start()
+        if profiler is None:
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            data = profiling.finish(profiler)
+        try:
+            record = profiling.save_profile(data, request, response, trigger)
+            response['X-Profile-Id'] = str(record.pk)
+        except Exception as e:
+            logger.warning(f"Could not store request profile: {str(e)}")
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        request._profiling_view = (match.view_name if match else None) or getattr(view_func, '__name__', '')
+
+
+class ApiCompressionMiddleware:
+    """
+    Compresses ApiJsonResponse bodies of at least API_COMPRESS_MIN_BYTES
+    with brotli or gzip, whichever the client prefers (see api_response),
+    and records encode time and bytes sent per view.
+    """
+
+    def __init__(self, get_response):
+        from .api_response import ENCODINGS, compress_body
+        from .page_cache import negotiate_encoding
+
+        self.get_response = get_response
+        self.min_bytes = int(getattr(settings, 'API_COMPRESS_MIN_BYTES', 1024))
+        self.compress = getattr(settings, 'API_COMPRESSION_ENABLED', True)
+        self.encodings = ENCODINGS
+        self.compress_body = compress_body
+        self.negotiate = negotiate_encoding
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        encode_seconds = getattr(response, 'json_encode_seconds', None)
+        if encode_seconds is None or response.streaming:
+            return response
+        view = getattr(request.resolver_match, 'view_name', None) or 'unresolved'
+        metrics.JSON_ENCODE.observe(encode_seconds, view)
+        metrics.API_UNCOMPRESSED_BYTES.inc(view, amount=len(response.content))
+
+        coding = 'identity'
+        if self.compress and len(response.content) >= self.min_bytes and not response.has_header('Content-Encoding'):
+            patch_vary_headers(response, ('Accept-Encoding',))
+            coding = self.negotiate(request, self.encodings)
+            if coding != 'identity':
+                compressed = self.compress_body(response.content, coding)
+                if len(compressed) < len(response.content):
+                    response.content = compressed
+                    response['Content-Encoding'] = coding
+                else:
+                    coding = 'identity'
+        response['Content-Length'] = str(len(response.content))
+        metrics.API_RESPONSE_BYTES.observe(len(response.content), view, coding)
+        return response
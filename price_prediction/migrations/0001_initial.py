@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('file_name', models.CharField(max_length=100, unique=True)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=500)),
+                ('view_name', models.CharField(blank=True, max_length=200)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('trigger', models.CharField(choices=[('sampled', 'Sampled'), ('header', 'Requested by header')], max_length=10)),
+                ('pid', models.PositiveIntegerField()),
+                ('wall_ms', models.FloatField(verbose_name='wall time (ms)')),
+                ('cpu_ms', models.FloatField(verbose_name='request thread CPU (ms)')),
+                ('samples', models.PositiveIntegerField()),
+                ('alloc_peak_kb', models.FloatField(verbose_name='traced peak (KiB)')),
+                ('rss_delta_kb', models.IntegerField(blank=True, null=True, verbose_name='RSS delta (KiB)')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
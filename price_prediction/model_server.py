@@ -0,0 +1,461 @@
+"""
+Model server: one process that owns the model and scores predictions for
+every gunicorn worker over a Unix domain socket.
+
+Without it each worker unpickles its own copy of the model (and imports
+XGBoost), so memory grows with the worker count, and each worker's model
+calls only ever batch its own requests. With MODEL_SERVER_SOCKET set,
+utils.predict_house_price(s), explain_house_prices and the model metadata
+helpers (property types, tiers, model version) ask the server instead, and
+a worker never loads the model unless it has to fall back.
+
+Frames are little-endian structs followed by float64 arrays:
+
+    request   id u32, op u8, tier u8, pad u16, rows u32 | rows x INPUT_COLUMNS
+    response  id u32, status u8, pad u8 x3, rows u32, cols u32, bytes u32 | body
+
+The body is rows x cols float64 for predictions and explanations, JSON for
+OP_INFO and a UTF-8 message for errors. A reader thread per connection
+queues requests; one batcher thread takes everything queued (waiting up to
+MODEL_SERVER_BATCH_WAIT_MS for more, at most MODEL_SERVER_MAX_BATCH_ROWS
+rows), scores requests with the same op and tier in one model call and
+sends each caller its slice, so requests from all workers share batches.
+
+Clients keep one connection per thread. When the server cannot be reached
+or does not answer within MODEL_SERVER_TIMEOUT_SEC the call falls back to
+in-process inference, and the worker retries the server after
+MODEL_SERVER_RETRY_SEC.
+"""
+
+import itertools
+import json
+import logging
+import os
+import queue
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from . import metrics, thread_budget, utils
+
+logger = logging.getLogger(__name__)
+
+OP_INFO, OP_PREDICT, OP_EXPLAIN = 0, 1, 2
+OP_NAMES = {OP_INFO: 'info', OP_PREDICT: 'predict', OP_EXPLAIN: 'explain'}
+# Inputs sent for every row, in this order; property_type travels encoded.
+INPUT_COLUMNS = ('number of bedrooms', 'number of bathrooms', 'living area', 'lot area', 'floor',
+                 'property_type_encoded', 'Lattitude', 'Longitude')
+TIER_CODES = {None: 0, 'fast': 1, 'balanced': 2, 'full': 3}
+_TIERS = {code: tier for tier, code in TIER_CODES.items()}
+
+STATUS_OK, STATUS_VALUE_ERROR, STATUS_KEY_ERROR, STATUS_TYPE_ERROR, STATUS_SERVER_ERROR = range(5)
+# Errors about the caller's input travel back and are raised as themselves.
+_ERRORS = {STATUS_VALUE_ERROR: ValueError, STATUS_KEY_ERROR: KeyError, STATUS_TYPE_ERROR: TypeError}
+_STATUSES = {cls: status for status, cls in _ERRORS.items()}
+
+_REQUEST = struct.Struct('<IBBxxI')
+_RESPONSE = struct.Struct('<IBxxxIII')
+_FLOAT = np.dtype('<f8')
+# Larger requests are a framing error; the connection is dropped.
+_MAX_REQUEST_ROWS = 1_000_000
+
+
+class ModelServerUnavailable(Exception):
+    """The server could not be reached or failed; predict in-process instead."""
+
+
+def _recv_exact(sock, size):
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            raise ConnectionError("model server connection closed")
+        received += n
+    return bytes(buffer)
+
+
+def _error_message(error):
+    return error.args[0] if isinstance(error, KeyError) and error.args else str(error)
+
+
+# --- Server --------------------------------------------------------------------
+
+class _Job:
+    __slots__ = ('conn', 'lock', 'request_id', 'op', 'tier', 'matrix')
+
+    def __init__(self, conn, lock, request_id, op, tier, matrix):
+        self.conn = conn
+        self.lock = lock
+        self.request_id = request_id
+        self.op = op
+        self.tier = tier
+        self.matrix = matrix
+
+
+class ModelServer:
+    """Serves the model loaded by utils.load_model_artifacts() on a Unix socket."""
+
+    def __init__(self, path, max_batch_rows=None, batch_wait_ms=None):
+        self.path = str(path)
+        self.max_batch_rows = int(max_batch_rows or getattr(settings, 'MODEL_SERVER_MAX_BATCH_ROWS', 4096))
+        wait_ms = batch_wait_ms if batch_wait_ms is not None else getattr(settings, 'MODEL_SERVER_BATCH_WAIT_MS', 1.0)
+        self.batch_wait = max(0.0, float(wait_ms)) / 1000
+        self._queue = queue.Queue()
+        self._listener = None
+        self._closed = threading.Event()
+        self._info = None
+        self._info_model = None
+        self.stats = {'connections': 0, 'requests': 0, 'batches': 0, 'rows': 0}
+
+    def info(self):
+        artifacts = utils.load_model_artifacts()
+        return {
+            'pid': os.getpid(),
+            'model_version': utils.get_model_version(),
+            'property_types': [str(t) for t in utils.get_property_types()],
+            'encodes_property_type': artifacts['property_type_encoder'] is not None,
+            'tiers': utils.get_prediction_tiers(),
+            'log_target': bool((artifacts['config'] or {}).get('log_target', False)),
+        }
+
+    def _info_bytes(self):
+        """info() as sent to workers; rebuilt once utils has reloaded a newly published model."""
+        model = utils.load_model_artifacts()['model']
+        if model is not self._info_model:
+            self._info = json.dumps(self.info(), default=str).encode()
+            self._info_model = model
+        return self._info
+
+    def bind(self):
+        """Load the model and listen; replaces a stale socket file left by a dead server."""
+        _state['serving'] = True
+        thread_budget.configure(role='model_server')
+        self._info_bytes()
+        if os.path.exists(self.path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+            except OSError:
+                os.unlink(self.path)
+            else:
+                raise OSError(f"A model server is already listening on {self.path}")
+            finally:
+                probe.close()
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(self.path)
+        self._listener.listen(128)
+
+    def serve_forever(self):
+        if self._listener is None:
+            self.bind()
+        threading.Thread(target=self._batch_loop, name='model-server-batcher', daemon=True).start()
+        try:
+            while not self._closed.is_set():
+                try:
+                    conn, _ = self._listener.accept()
+                except OSError:
+                    if self._closed.is_set():
+                        break
+                    raise
+                self.stats['connections'] += 1
+                threading.Thread(target=self._read_loop, args=(conn,), name='model-server-conn',
+                                 daemon=True).start()
+        finally:
+            self.close()
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._queue.put(None)
+        if self._listener is not None:
+            try:
+                self._listener.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._listener.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def _read_loop(self, conn):
+        lock = threading.Lock()
+        try:
+            while True:
+                request_id, op, tier, rows = _REQUEST.unpack(_recv_exact(conn, _REQUEST.size))
+                if rows > _MAX_REQUEST_ROWS:
+                    break
+                matrix = None
+                if rows:
+                    body = _recv_exact(conn, rows * len(INPUT_COLUMNS) * _FLOAT.itemsize)
+                    matrix = np.frombuffer(body, dtype=_FLOAT).reshape(rows, len(INPUT_COLUMNS))
+                self.stats['requests'] += 1
+                if op == OP_INFO:
+                    self._reply(conn, lock, request_id, STATUS_OK, 0, 0, self._info_bytes())
+                elif op not in OP_NAMES or tier not in _TIERS or matrix is None:
+                    self._reply(conn, lock, request_id, STATUS_VALUE_ERROR, 0, 0, b"Malformed request")
+                else:
+                    self._queue.put(_Job(conn, lock, request_id, op, _TIERS[tier], matrix))
+        except (OSError, ConnectionError):
+            pass
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _reply(conn, lock, request_id, status, rows, cols, body):
+        try:
+            with lock:
+                conn.sendall(_RESPONSE.pack(request_id, status, rows, cols, len(body)) + body)
+        except OSError:
+            pass
+
+    def _next_batch(self):
+        """Jobs to score together: whatever is queued, plus arrivals within batch_wait."""
+        job = self._queue.get()
+        if job is None:
+            return None
+        jobs, rows = [job], len(job.matrix)
+        deadline = time.monotonic() + self.batch_wait
+        while rows < self.max_batch_rows:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    job = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if job is None:
+                self._queue.put(None)
+                break
+            jobs.append(job)
+            rows += len(job.matrix)
+        return jobs
+
+    def _batch_loop(self):
+        while True:
+            jobs = self._next_batch()
+            if jobs is None:
+                return
+            groups = {}
+            for job in jobs:
+                groups.setdefault((job.op, job.tier), []).append(job)
+            for (op, tier), group in groups.items():
+                self._score_group(op, tier, group)
+
+    def _score_group(self, op, tier, jobs):
+        matrix = jobs[0].matrix if len(jobs) == 1 else np.concatenate([job.matrix for job in jobs])
+        metrics.MODEL_SERVER_BATCH_ROWS.observe(len(matrix), OP_NAMES[op])
+        metrics.MODEL_SERVER_BATCH_REQUESTS.observe(len(jobs), OP_NAMES[op])
+        try:
+            result = score(op, tier, matrix)
+        except (ValueError, KeyError, TypeError) as e:
+            if len(jobs) > 1:
+                # Someone's input is bad; score callers separately so only they get the error.
+                for job in jobs:
+                    self._score_group(op, tier, [job])
+                return
+            status = _STATUSES.get(type(e), STATUS_VALUE_ERROR)
+            self._reply(jobs[0].conn, jobs[0].lock, jobs[0].request_id, status, 0, 0, _error_message(e).encode())
+            return
+        except Exception as e:
+            logger.error(f"Model server batch failed: {str(e)}")
+            for job in jobs:
+                self._reply(job.conn, job.lock, job.request_id, STATUS_SERVER_ERROR, 0, 0, str(e).encode())
+            return
+        self.stats['batches'] += 1
+        self.stats['rows'] += len(matrix)
+        start = 0
+        for job in jobs:
+            part = np.ascontiguousarray(result[start:start + len(job.matrix)], dtype=_FLOAT)
+            start += len(job.matrix)
+            self._reply(job.conn, job.lock, job.request_id, STATUS_OK, part.shape[0], part.shape[1],
+                        part.tobytes())
+
+
+def score(op, tier, matrix):
+    """Run an op on a rows x INPUT_COLUMNS matrix: prices, or prices, baseline and contributions."""
+    columns = {name: matrix[:, i] for i, name in enumerate(INPUT_COLUMNS)}
+    columns['property_type_encoded'] = columns['property_type_encoded'].astype(int)
+    if op == OP_EXPLAIN:
+        prices, baseline, contributions = utils.explain_house_prices(columns, tier)
+        return np.column_stack([prices, baseline, contributions])
+    return utils.predict_house_prices(columns, tier).reshape(-1, 1)
+
+
+# --- Client --------------------------------------------------------------------
+
+class ModelClient:
+    """Talks to a ModelServer; one connection per thread, opened on first use."""
+
+    def __init__(self, path, timeout=None):
+        self.path = str(path)
+        self.timeout = float(timeout if timeout is not None else getattr(settings, 'MODEL_SERVER_TIMEOUT_SEC', 5.0))
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+        self._info = None
+        self._info_at = 0.0
+
+    def _connection(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+
+    def close(self):
+        sock = getattr(self._local, 'sock', None)
+        self._local.sock = None
+        if sock is not None:
+            sock.close()
+
+    def _call(self, op, tier=None, matrix=None):
+        if tier not in TIER_CODES:
+            raise ValueError(f"Unknown prediction tier: {tier}")
+        request_id = next(self._ids) & 0xFFFFFFFF
+        rows = 0 if matrix is None else len(matrix)
+        payload = b'' if matrix is None else np.ascontiguousarray(matrix, dtype=_FLOAT).tobytes()
+        started = time.perf_counter()
+        frame = _REQUEST.pack(request_id, op, TIER_CODES[tier], rows) + payload
+        for attempt in range(2):
+            reused = getattr(self._local, 'sock', None) is not None
+            try:
+                sock = self._connection()
+                sock.sendall(frame)
+                reply_id, status, rows, cols, size = _RESPONSE.unpack(_recv_exact(sock, _RESPONSE.size))
+                body = _recv_exact(sock, size)
+                break
+            except OSError as e:
+                # The connection may still get a late reply, so it is never reused.
+                self.close()
+                self._info = None
+                # A kept-alive connection the server has since closed (say it
+                # restarted) gets one retry on a fresh one; timeouts do not.
+                if attempt or not reused or isinstance(e, socket.timeout):
+                    raise ModelServerUnavailable(str(e) or type(e).__name__)
+        metrics.MODEL_SERVER_LATENCY.observe(time.perf_counter() - started, OP_NAMES[op])
+        if reply_id != request_id:
+            self.close()
+            raise ModelServerUnavailable("model server reply out of sequence")
+        if status in _ERRORS:
+            metrics.MODEL_SERVER_REQUESTS.inc(OP_NAMES[op], 'error')
+            raise _ERRORS[status](body.decode())
+        if status != STATUS_OK:
+            raise ModelServerUnavailable(body.decode() or "model server error")
+        metrics.MODEL_SERVER_REQUESTS.inc(OP_NAMES[op], 'ok')
+        if op == OP_INFO:
+            return json.loads(body)
+        return np.frombuffer(body, dtype=_FLOAT).reshape(rows, cols)
+
+    def info(self):
+        """
+        The server's model description: property_types, tiers, model_version,
+        log_target. Asked again every MODEL_RELOAD_CHECK_SEC, so a model the
+        server has reloaded is seen (and cached predictions keyed anew).
+        """
+        max_age = float(getattr(settings, 'MODEL_RELOAD_CHECK_SEC', 5.0))
+        if self._info is None or (max_age >= 0 and time.monotonic() - self._info_at >= max_age):
+            self._info = self._call(OP_INFO)
+            self._info_at = time.monotonic()
+        return self._info
+
+    def _matrix(self, columns):
+        """columns as for utils.predict_house_prices → rows x INPUT_COLUMNS float64."""
+        n = utils.row_count(columns)
+        matrix = np.empty((n, len(INPUT_COLUMNS)), dtype=_FLOAT)
+        for i, name in enumerate(INPUT_COLUMNS):
+            if name == 'property_type_encoded' and name not in columns:
+                matrix[:, i] = self._encode_property_types(columns.get('property_type'), n)
+                continue
+            if name not in columns:
+                raise KeyError(f"Missing required feature: {name}")
+            try:
+                matrix[:, i] = np.broadcast_to(np.asarray(columns[name], dtype=np.float64), (n,))
+            except (ValueError, TypeError):
+                raise TypeError("All features must be numeric.")
+        return matrix
+
+    def _encode_property_types(self, values, n):
+        info = self.info()
+        if values is None or not info['encodes_property_type']:
+            return np.zeros(n)
+        values = np.broadcast_to(np.asarray(values), (n,))
+        if values.dtype.kind not in 'USO':
+            return values.astype(int)
+        names = values.astype(str)
+        classes = info['property_types']
+        unknown = set(np.unique(names)) - set(classes)
+        if unknown:
+            raise ValueError(f"Unknown property_type: {', '.join(sorted(unknown))}")
+        # LabelEncoder codes are positions in its (sorted) classes_.
+        return np.searchsorted(np.asarray(classes), names)
+
+    def predict(self, columns, tier=None):
+        return self._call(OP_PREDICT, tier, self._matrix(columns))[:, 0].copy()
+
+    def explain(self, columns, tier=None):
+        result = self._call(OP_EXPLAIN, tier, self._matrix(columns))
+        return result[:, 0].copy(), result[:, 1].copy(), result[:, 2:].copy()
+
+
+_state = {'serving': False, 'client': None, 'pid': None, 'retry_at': 0.0}
+_state_lock = threading.Lock()
+
+
+def get_client():
+    """
+    This process's ModelClient, or None when MODEL_SERVER_SOCKET is unset,
+    inside the model server itself, or while backing off after a failure.
+    """
+    path = getattr(settings, 'MODEL_SERVER_SOCKET', '') or ''
+    if not path or _state['serving'] or time.monotonic() < _state['retry_at']:
+        return None
+    client = _state['client']
+    if client is None or client.path != str(path) or _state['pid'] != os.getpid():
+        # Per process: a client made before gunicorn forked must not share its sockets.
+        with _state_lock:
+            if _state['client'] is None or _state['client'].path != str(path) or _state['pid'] != os.getpid():
+                _state['client'] = ModelClient(path)
+                _state['pid'] = os.getpid()
+            client = _state['client']
+    return client
+
+
+def mark_unavailable(error, op):
+    """Record a failed call; predictions run in-process until MODEL_SERVER_RETRY_SEC has passed."""
+    metrics.MODEL_SERVER_REQUESTS.inc(op, 'fallback')
+    retry = float(getattr(settings, 'MODEL_SERVER_RETRY_SEC', 30))
+    if time.monotonic() >= _state['retry_at']:
+        logger.warning(f"Model server unavailable, predicting in-process for {retry:g}s: {str(error)}")
+    _state['retry_at'] = time.monotonic() + retry
+
+
+def call(op, *args):
+    """
+    (True, result) from the model server for 'info', 'predict' or 'explain',
+    or (False, None) when there is no server to ask; errors in the input
+    are raised as ValueError/KeyError/TypeError like in-process inference.
+    """
+    client = get_client()
+    if client is None:
+        return False, None
+    try:
+        return True, getattr(client, op)(*args)
+    except ModelServerUnavailable as e:
+        mark_unavailable(e, op)
+        return False, None
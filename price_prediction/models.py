@@ -1,3 +1,51 @@
+import json
+
 from django.db import models
 
-# Create your models here.
+
+class RequestProfile(models.Model):
+    """
+    A profiled request. The profile itself (sampled stacks, allocations) is
+    a JSON file in PROFILING_DIR; this row indexes it for the admin.
+    """
+
+    TRIGGERS = [('sampled', 'Sampled'), ('header', 'Requested by header')]
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    file_name = models.CharField(max_length=100, unique=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    view_name = models.CharField(max_length=200, blank=True)
+    status_code = models.PositiveSmallIntegerField()
+    trigger = models.CharField(max_length=10, choices=TRIGGERS)
+    pid = models.PositiveIntegerField()
+    wall_ms = models.FloatField("wall time (ms)")
+    cpu_ms = models.FloatField("request thread CPU (ms)")
+    samples = models.PositiveIntegerField()
+    alloc_peak_kb = models.FloatField("traced peak (KiB)")
+    rss_delta_kb = models.IntegerField("RSS delta (KiB)", null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.wall_ms:.0f} ms)"
+
+    @property
+    def file_path(self):
+        from .profiling import profile_dir
+        return profile_dir() / self.file_name
+
+    def load(self):
+        """The stored profile, or None if its file is gone."""
+        try:
+            return json.loads(self.file_path.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def delete(self, *args, **kwargs):
+        try:
+            self.file_path.unlink()
+        except FileNotFoundError:
+            pass
+        return super().delete(*args, **kwargs)
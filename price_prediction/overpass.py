@@ -0,0 +1,171 @@
+"""
+Overpass query planning for the amenities lookup.
+
+Builds one query per lookup with the tag filters merged per key (regex
+value matching instead of one clause per value), limited to the amenity
+buckets that still need data, with a search radius and per-group output
+limits adapted to how dense the area around the point turned out to be on
+earlier lookups.
+
+Overpass can't sort by distance: `out ... qt N` keeps the first N elements
+in quadtile order, which in a dense area can drop the nearest places for
+farther ones. Each group is therefore output in two rings, the inner
+NEAR_RING_FRACTION of the radius first and the rest after it, each with
+its own limit, so a crowded outer ring can't push out the near places; the
+distance sort (views._finalize_buckets) then re-ranks within that set.
+"""
+
+import math
+import threading
+from collections import namedtuple
+
+# Bucket → (tag key, values, extra filter, element types). Buckets sharing a
+# key and extra filter are merged into a single regex clause.
+_BUCKET_FILTERS = {
+    "hospital": [("amenity", ("hospital", "clinic"), "", "nwr")],
+    "school": [("amenity", ("school",), "", "nwr")],
+    "bank": [("amenity", ("bank",), "", "nwr")],
+    "university": [("amenity", ("university", "college"), "", "nwr")],
+    "train_station": [("railway", ("station", "halt"), "", "nwr")],
+    "subway_station": [
+        ("railway", ("subway_entrance",), "", "node"),
+        ("station", ("subway", "metro"), "", "nwr"),
+        ("public_transport", ("station",), '["subway"="yes"]', "nwr"),
+    ],
+}
+
+DEFAULT_RADIUS_M = 1500
+MIN_RADIUS_M = 600
+MAX_RADIUS_M = 1500
+# Roughly how many raw elements a lookup needs: 6 buckets × 15 kept, plus
+# headroom for unnamed/duplicate elements that get dropped.
+_TARGET_ELEMENTS = 150
+# Per bucket and ring; more than the 15 places a bucket shows.
+_PER_BUCKET_OUTPUT = 40
+NEAR_RING_FRACTION = 1 / 3
+
+# Coarse cell (~1 km) → smoothed elements per km² from earlier responses.
+_DENSITY = {}
+_DENSITY_LOCK = threading.Lock()
+_DENSITY_MAX_CELLS = 5000
+_DENSITY_ALPHA = 0.5
+
+OverpassPlan = namedtuple("OverpassPlan", "query radius_m buckets limits center near_radius_m")
+
+
+def _density_cell(lat_f, lng_f):
+    return (round(lat_f, 2), round(lng_f, 2))
+
+
+def observed_density(lat_f, lng_f):
+    """Elements per km² seen near this point, or None when never measured."""
+    with _DENSITY_LOCK:
+        return _DENSITY.get(_density_cell(lat_f, lng_f))
+
+
+def adaptive_radius(lat_f, lng_f):
+    """Radius that should return about _TARGET_ELEMENTS at the observed density."""
+    density = observed_density(lat_f, lng_f)
+    if not density:
+        return DEFAULT_RADIUS_M
+    radius_km = math.sqrt(_TARGET_ELEMENTS / (math.pi * density))
+    return int(min(MAX_RADIUS_M, max(MIN_RADIUS_M, radius_km * 1000)))
+
+
+def record_density(lat_f, lng_f, plan, group_counts):
+    """
+    Update the density estimate from a completed query. Groups that hit their
+    output limit were truncated, so their count only bounds the real density
+    from below; they are doubled to let the radius shrink on the next lookup.
+    """
+    total = 0
+    for group, count in group_counts.items():
+        total += count * 2 if count >= plan.limits.get(group, 0) > 0 else count
+    area_km2 = math.pi * (plan.radius_m / 1000.0) ** 2
+    # Density was measured for the requested buckets only; scale to all of them.
+    sample = total / area_km2 * len(_BUCKET_FILTERS) / max(1, len(plan.buckets))
+    cell = _density_cell(lat_f, lng_f)
+    with _DENSITY_LOCK:
+        prev = _DENSITY.get(cell)
+        _DENSITY[cell] = sample if prev is None else prev + _DENSITY_ALPHA * (sample - prev)
+        if len(_DENSITY) > _DENSITY_MAX_CELLS:
+            for old in list(_DENSITY)[: _DENSITY_MAX_CELLS // 4]:
+                _DENSITY.pop(old, None)
+
+
+def _merged_groups(buckets):
+    """Group the wanted filters by (key, extra, element type) → values, bucket count."""
+    groups = {}
+    for bucket in buckets:
+        for key, values, extra, types in _BUCKET_FILTERS.get(bucket, ()):
+            group = groups.setdefault((key, extra, types), {"values": [], "buckets": set()})
+            for value in values:
+                if value not in group["values"]:
+                    group["values"].append(value)
+            group["buckets"].add(bucket)
+    return groups
+
+
+def build_overpass_query(lat_f, lng_f, buckets, timeout_sec, radius_m=None):
+    """Plan a single Overpass query for the given buckets; None when nothing is needed."""
+    buckets = [b for b in buckets if b in _BUCKET_FILTERS]
+    if not buckets:
+        return None
+    radius_m = radius_m or adaptive_radius(lat_f, lng_f)
+    near_radius_m = max(1, int(radius_m * NEAR_RING_FRACTION))
+    around = f"(around:{radius_m},{lat_f},{lng_f})"
+    near = f"(around:{near_radius_m},{lat_f},{lng_f})"
+
+    statements = []
+    limits = {}
+    for idx, ((key, extra, types), group) in enumerate(sorted(_merged_groups(buckets).items())):
+        values = group["values"]
+        if len(values) == 1:
+            tag = f'["{key}"="{values[0]}"]'
+        else:
+            tag = f'["{key}"~"^({"|".join(values)})$"]'
+        limit = _PER_BUCKET_OUTPUT * len(group["buckets"])
+        name = f"g{idx}"
+        limits[f"{name}n"] = limits[name] = limit
+        # Near ring first, then the rest of the radius; qt order skips the
+        # server-side sort by id, and each ring has its own limit.
+        statements.append(
+            f"{types}{tag}{extra}{around}->.{name}a;\n"
+            f"{types}.{name}a{near}->.{name}n;\n"
+            f"(.{name}a; - .{name}n;)->.{name};\n"
+            f".{name}n out center tags qt {limit};\n"
+            f".{name} out center tags qt {limit};"
+        )
+
+    query = f"[out:json][timeout:{max(1, int(timeout_sec))}];\n" + "\n".join(statements)
+    return OverpassPlan(query=query, radius_m=radius_m, buckets=tuple(buckets), limits=limits,
+                        center=(lat_f, lng_f), near_radius_m=near_radius_m)
+
+
+def _distance_m(lat1, lng1, lat2, lng2):
+    # Equirectangular approximation; plenty at the scale of a search radius.
+    x = math.radians(lng2 - lng1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return 6371000.0 * math.hypot(x, y)
+
+
+def group_counts(plan, elements):
+    """
+    Count returned elements per output (group and ring). Each element is
+    matched back to the first group whose filter it satisfies, and to the
+    near ring when its position is within near_radius_m of the point.
+    """
+    counts = {name: 0 for name in plan.limits}
+    order = sorted(_merged_groups(plan.buckets).items())
+    for el in elements:
+        tags = el.get("tags") or {}
+        position = el if el.get("lat") is not None else el.get("center") or {}
+        near = (
+            position.get("lat") is not None
+            and _distance_m(*plan.center, float(position["lat"]), float(position["lon"])) <= plan.near_radius_m
+        )
+        for idx, ((key, extra, _types), group) in enumerate(order):
+            if tags.get(key) in group["values"]:
+                counts[f"g{idx}n" if near else f"g{idx}"] += 1
+                break
+    return counts
@@ -0,0 +1,142 @@
+"""
+Rendered-page cache for the pages every visitor gets the same copy of (the
+portfolio home page and the empty prediction form).
+
+A page is keyed on its template chain (each file's mtime, so an edited
+template or a deploy that ships new ones renders afresh) and a context
+version supplied by the view, e.g. the model version for the prediction
+form. A miss builds the context, renders once and stores the body with
+gzip and, when the brotli package is installed, brotli variants, plus an
+ETag (content hash, one per encoding) and Last-Modified (newest source
+mtime). A hit skips context building, rendering and compression, and a
+conditional GET that still matches gets a 304.
+
+The cache is per process; gunicorn workers each render a page once per
+version. Pages must not contain per-request data such as CSRF tokens.
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.template import Context
+from django.template.loader import get_template, render_to_string
+from django.template.loader_tags import ExtendsNode
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from . import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content-Encoding → ETag suffix (identity has none).
+_ENCODINGS = {'br': '-br', 'gzip': '-gz'}
+
+_pages = OrderedDict()
+_pages_lock = threading.Lock()
+_chains = {}
+
+
+def enabled():
+    return bool(getattr(settings, 'PAGE_CACHE_ENABLED', True))
+
+
+def _template_files(template_name):
+    """Files of the template and everything it extends, child first."""
+    chain = _chains.get(template_name)
+    if chain is None:
+        chain = []
+        name = template_name
+        while name:
+            template = get_template(name).template
+            chain.append(template.origin.name)
+            extends = template.nodelist.get_nodes_by_type(ExtendsNode)
+            name = extends[0].parent_name.resolve(Context()) if extends else None
+        _chains[template_name] = chain
+    return chain
+
+
+def _compress(body):
+    bodies = {'identity': body, 'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        bodies['br'] = brotli.compress(body, quality=11, mode=brotli.MODE_TEXT)
+    return bodies
+
+
+def _build(request, template_name, build_context, stamps):
+    body = render_to_string(template_name, build_context(), request=request).encode()
+    return {
+        'bodies': _compress(body),
+        'etag': hashlib.sha1(body).hexdigest()[:20],
+        'last_modified': max(stamps) / 1e9,
+    }
+
+
+def negotiate_encoding(request, bodies):
+    """Best encoding we hold that the client accepts (br, then gzip, else identity)."""
+    accepted = {}
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = part.strip().partition(';')
+        q = 1.0
+        if params.strip().startswith('q='):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    for coding in ('br', 'gzip'):
+        if coding in bodies and accepted.get(coding, accepted.get('*', 0.0)) > 0:
+            return coding
+    return 'identity'
+
+
+def render_page(request, template_name, build_context, version=(), sources=()):
+    """
+    Response for a shared page. build_context() is only called on a miss;
+    version is any hashable that changes with the context; sources are
+    extra files whose mtimes count like the template's (e.g. model files).
+    """
+    if not enabled():
+        return HttpResponse(render_to_string(template_name, build_context(), request=request))
+
+    files = list(_template_files(template_name)) + [str(p) for p in sources]
+    stamps = tuple(os.stat(f).st_mtime_ns for f in files)
+    key = (template_name, stamps, version)
+    with _pages_lock:
+        entry = _pages.get(key)
+        if entry is not None:
+            _pages.move_to_end(key)
+    metrics.cache_lookup('page', entry is not None)
+    if entry is None:
+        entry = _build(request, template_name, build_context, stamps)
+        with _pages_lock:
+            _pages[key] = entry
+            while len(_pages) > int(getattr(settings, 'PAGE_CACHE_MAX_ENTRIES', 16)):
+                _pages.popitem(last=False)
+
+    coding = negotiate_encoding(request, entry['bodies'])
+    etag = f'"{entry["etag"]}{_ENCODINGS.get(coding, "")}"'
+    response = HttpResponse(entry['bodies'][coding], content_type='text/html; charset=utf-8')
+    if coding != 'identity':
+        response['Content-Encoding'] = coding
+    response['Content-Length'] = str(len(entry['bodies'][coding]))
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(entry['last_modified'])
+    response['Vary'] = 'Accept-Encoding'
+    response['Cache-Control'] = getattr(settings, 'PAGE_CACHE_CONTROL', 'no-cache')
+    return get_conditional_response(
+        request, etag=etag, last_modified=int(entry['last_modified']), response=response,
+    )
+
+
+def clear():
+    with _pages_lock:
+        _pages.clear()
+    _chains.clear()
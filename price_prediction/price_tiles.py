@@ -0,0 +1,435 @@
+"""
+Precomputed price-surface tiles for the Leaflet map overlay.
+
+The served model is evaluated on a TILE_CELLS × TILE_CELLS grid of cell
+centres for every Web-Mercator tile (z/x/y, as Leaflet addresses them) over
+the cities in the training data, once per layer. A layer is one property
+type combined with one reference configuration from PROFILES. Predictions
+are quantised to uint8 on a log-price scale shared by all tiles, so one
+tile is TILE_CELLS² bytes on disk:
+
+    ML_Files/price_tiles/<tileset>/<layer>/<z>/<x>_<y>.u8
+
+<tileset> combines the model version with the grid settings. Generation runs
+in a process pool, each task scoring all layers of a group of tiles in one
+model call, and skips tiles already on disk: an interrupted build resumes,
+and a new model version builds into a fresh tileset while the previous one
+keeps being served until current.json is switched over.
+"""
+
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import pickle
+import shutil
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from .dataset import load_dataset
+from .utils import get_ml_files_path
+
+TILE_CELLS = 32
+DEFAULT_ZOOMS = (9, 12)
+COVERAGE_PAD_DEG = 0.05
+PROFILES = {
+    'compact': {'number of bedrooms': 2, 'number of bathrooms': 1, 'living area': 900,
+                'lot area': 1500, 'floor': 2},
+    'standard': {'number of bedrooms': 3, 'number of bathrooms': 2, 'living area': 1900,
+                 'lot area': 7500, 'floor': 4},
+    'large': {'number of bedrooms': 4, 'number of bathrooms': 3, 'living area': 3200,
+              'lot area': 12000, 'floor': 2},
+}
+_FORMAT_VERSION = 1
+_POINTER_CHECK_SEC = 30.0
+_PNG_CACHE_MAX = 2048
+# RdYlBu reversed: cheap = blue, expensive = red.
+_PALETTE_ANCHORS = [
+    (49, 54, 149), (69, 117, 180), (116, 173, 209), (171, 217, 233), (254, 224, 144),
+    (253, 174, 97), (244, 109, 67), (215, 48, 39), (165, 0, 38),
+]
+_PALETTE_ALPHA = 170
+
+_state = {'tileset': None, 'checked_at': 0.0}
+_state_lock = threading.Lock()
+_png_cache = OrderedDict()
+_png_lock = threading.Lock()
+_worker = {}
+
+
+def get_tiles_root():
+    return get_ml_files_path() / 'price_tiles'
+
+
+# Tile geometry ------------------------------------------------------------
+
+def lat_to_tile_y(lat, z):
+    lat_r = math.radians(max(min(lat, 85.0511), -85.0511))
+    return (1 - math.asinh(math.tan(lat_r)) / math.pi) / 2 * (1 << z)
+
+
+def lon_to_tile_x(lon, z):
+    return (lon + 180.0) / 360.0 * (1 << z)
+
+
+def tiles_for_bbox(z, south, west, north, east):
+    x0, x1 = int(lon_to_tile_x(west, z)), int(lon_to_tile_x(east, z))
+    y0, y1 = int(lat_to_tile_y(north, z)), int(lat_to_tile_y(south, z))
+    return [(z, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def cell_centres(z, x, y, cells=TILE_CELLS):
+    """Latitude and longitude of each cell centre, row-major from the tile's top-left."""
+    n = float(1 << z)
+    offsets = (np.arange(cells) + 0.5) / cells
+    lons = (x + offsets) / n * 360.0 - 180.0
+    lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + offsets) / n))))
+    lat_grid, lon_grid = np.meshgrid(lats, lons, indexing='ij')
+    return lat_grid.ravel(), lon_grid.ravel()
+
+
+# Planning -----------------------------------------------------------------
+
+def _load_artifacts(model_dir):
+    artifacts = {}
+    for key, filename in (
+        ('model', 'best_house_price_model.pkl'),
+        ('features', 'model_features.pkl'),
+        ('config', 'model_config.pkl'),
+        ('property_type_encoder', 'property_type_encoder.pkl'),
+    ):
+        with open(model_dir / filename, 'rb') as f:
+            artifacts[key] = pickle.load(f)
+    return artifacts
+
+
+def _model_version(model_dir, config):
+    if config.get('model_version'):
+        return config['model_version']
+    digest = hashlib.sha1()
+    with open(model_dir / 'best_house_price_model.pkl', 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def coverage_regions(dataset=None):
+    """Padded bounding box of each city's sales: {city: [south, west, north, east]}."""
+    dataset = dataset or load_dataset()
+    frame = dataset.frame(['city', 'Lattitude', 'Longitude'])
+    grouped = frame.groupby('city', observed=True).agg(
+        south=('Lattitude', 'min'), north=('Lattitude', 'max'),
+        west=('Longitude', 'min'), east=('Longitude', 'max'),
+    )
+    return {
+        str(city): [float(row.south) - COVERAGE_PAD_DEG, float(row.west) - COVERAGE_PAD_DEG,
+                    float(row.north) + COVERAGE_PAD_DEG, float(row.east) + COVERAGE_PAD_DEG]
+        for city, row in grouped.iterrows()
+    }
+
+
+def price_scale(dataset=None):
+    """log-price range mapped onto 0..255: 1st to 99th percentile of sale prices."""
+    dataset = dataset or load_dataset()
+    lo, hi = np.percentile(np.asarray(dataset.column('Price'), dtype=np.float64), [1, 99])
+    return [float(np.log(lo)), float(np.log(hi))]
+
+
+def plan_tileset(model_dir=None, zooms=DEFAULT_ZOOMS, cells=TILE_CELLS, profiles=None):
+    """Manifest describing the tileset for the served model and these settings."""
+    model_dir = model_dir or get_ml_files_path()
+    artifacts = _load_artifacts(model_dir)
+    dataset = load_dataset()
+    profiles = profiles or list(PROFILES)
+    layers = [
+        {'name': f"{ptype}-{profile}", 'property_type': str(ptype), 'profile': profile}
+        for ptype in artifacts['property_type_encoder'].classes_
+        for profile in profiles
+    ]
+    manifest = {
+        'format': _FORMAT_VERSION,
+        'model_version': _model_version(model_dir, artifacts['config']),
+        'cells': cells,
+        'zooms': [int(zooms[0]), int(zooms[1])],
+        'scale': price_scale(dataset),
+        'profiles': {name: PROFILES[name] for name in profiles},
+        'layers': layers,
+        'regions': coverage_regions(dataset),
+    }
+    settings_key = json.dumps(
+        {k: manifest[k] for k in ('format', 'cells', 'scale', 'profiles')}, sort_keys=True,
+    )
+    manifest['tileset'] = f"{manifest['model_version']}-{hashlib.sha1(settings_key.encode()).hexdigest()[:8]}"
+    return manifest
+
+
+def tile_keys(manifest):
+    keys = set()
+    for z in range(manifest['zooms'][0], manifest['zooms'][1] + 1):
+        for bbox in manifest['regions'].values():
+            keys.update(tiles_for_bbox(z, *bbox))
+    return sorted(keys)
+
+
+def _tile_path(directory, layer, z, x, y):
+    return directory / layer / str(z) / f"{x}_{y}.u8"
+
+
+# Generation ---------------------------------------------------------------
+
+def _init_worker(model_dir, manifest, directory):
+    artifacts = _load_artifacts(model_dir)
+    model = artifacts['model']
+    if hasattr(model, 'set_params'):
+        model.set_params(n_jobs=1)
+    encoder = artifacts['property_type_encoder']
+    _worker.update(
+        model=model,
+        features=artifacts['features'],
+        log_target=artifacts['config'].get('log_target', False),
+        codes={str(c): int(i) for c, i in zip(encoder.classes_, encoder.transform(encoder.classes_))},
+        manifest=manifest,
+        directory=directory,
+    )
+
+
+def _layer_columns(layer, lats, lons, manifest, codes):
+    # Imported here: training pulls in XGBoost and scikit-learn, which the
+    # web workers serving tiles (and predicting via the model server) don't need.
+    from .training import engineer_features
+
+    n = len(lats)
+    profile = manifest['profiles'][layer['profile']]
+    columns = {name: np.full(n, float(value)) for name, value in profile.items()}
+    columns['property_type_encoded'] = np.full(n, float(codes[layer['property_type']]))
+    columns['Lattitude'] = lats
+    columns['Longitude'] = lons
+    return engineer_features(columns)
+
+
+def quantize(prices, scale):
+    lo, hi = scale
+    levels = (np.log(np.maximum(prices, 1.0)) - lo) / (hi - lo) * 255.0
+    return np.clip(np.rint(levels), 0, 255).astype(np.uint8)
+
+
+def dequantize(levels, scale):
+    lo, hi = scale
+    return np.exp(lo + np.asarray(levels, dtype=np.float64) / 255.0 * (hi - lo))
+
+
+def _build_tiles(tiles):
+    """Score every layer of the given tiles in one model call and write them."""
+    w = _worker
+    manifest, features = w['manifest'], w['features']
+    cells2 = manifest['cells'] ** 2
+    blocks = []
+    for z, x, y in tiles:
+        lats, lons = cell_centres(z, x, y, manifest['cells'])
+        for layer in manifest['layers']:
+            columns = _layer_columns(layer, lats, lons, manifest, w['codes'])
+            blocks.append(np.column_stack([columns[f] for f in features]))
+    X = pd.DataFrame(np.vstack(blocks), columns=features)
+    pred = np.asarray(w['model'].predict(X), dtype=np.float64)
+    if w['log_target']:
+        pred = np.expm1(pred)
+    levels = quantize(pred, manifest['scale'])
+    i = 0
+    for z, x, y in tiles:
+        for layer in manifest['layers']:
+            path = _tile_path(w['directory'], layer['name'], z, x, y)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".tmp{os.getpid()}")
+            tmp.write_bytes(levels[i:i + cells2].tobytes())
+            os.replace(tmp, path)
+            i += cells2
+    return len(X)
+
+
+def _missing_tiles(directory, manifest, keys):
+    return [
+        key for key in keys
+        if not all(_tile_path(directory, layer['name'], *key).exists() for layer in manifest['layers'])
+    ]
+
+
+def build_tileset(model_dir=None, zooms=DEFAULT_ZOOMS, cells=TILE_CELLS, profiles=None, workers=None,
+                  tiles_per_task=16, force=False, keep_previous=1):
+    """Generate (or finish) the tileset for the served model and make it current."""
+    from .training import StageTimer
+
+    timer = StageTimer()
+    model_dir = model_dir or get_ml_files_path()
+    root = get_tiles_root()
+    with timer.stage('plan'):
+        manifest = plan_tileset(model_dir, zooms, cells, profiles)
+        directory = root / manifest['tileset']
+        if force:
+            shutil.rmtree(directory, ignore_errors=True)
+        directory.mkdir(parents=True, exist_ok=True)
+        keys = tile_keys(manifest)
+        todo = _missing_tiles(directory, manifest, keys)
+
+    rows = 0
+    workers = max(1, workers or os.cpu_count() or 1)
+    with timer.stage('generate'):
+        if todo:
+            tasks = [todo[i:i + tiles_per_task] for i in range(0, len(todo), tiles_per_task)]
+            # spawn: XGBoost's OpenMP runtime is not fork-safe once initialised.
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(tasks)),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(model_dir, manifest, directory),
+            ) as pool:
+                for future in as_completed([pool.submit(_build_tiles, task) for task in tasks]):
+                    rows += future.result()
+
+    with timer.stage('finalize'):
+        manifest['tiles'] = len(keys)
+        manifest['built_at'] = time.time()
+        _write_json(directory / 'manifest.json', manifest)
+        _write_json(root / 'current.json', {'tileset': manifest['tileset']})
+        _prune(root, keep=manifest['tileset'], keep_previous=keep_previous)
+
+    return {
+        'tileset': manifest['tileset'],
+        'model_version': manifest['model_version'],
+        'layers': len(manifest['layers']),
+        'tiles': len(keys),
+        'built': len(todo),
+        'skipped': len(keys) - len(todo),
+        'rows': rows,
+        'rows_per_sec': rows / timer.stages['generate'] if rows else 0.0,
+        'workers': workers,
+        'stages': timer.stages,
+        'total_sec': timer.total,
+        'directory': str(directory),
+    }
+
+
+def _write_json(path, payload):
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, 'w') as f:
+        json.dump(payload, f)
+    os.replace(tmp, path)
+
+
+def _prune(root, keep, keep_previous):
+    """Remove finished tilesets other than keep and the newest keep_previous others."""
+    others = []
+    for entry in root.iterdir():
+        if entry.is_dir() and entry.name != keep and (entry / 'manifest.json').exists():
+            others.append((entry.stat().st_mtime, entry))
+    for _mtime, entry in sorted(others, reverse=True)[keep_previous:]:
+        shutil.rmtree(entry, ignore_errors=True)
+
+
+# Serving ------------------------------------------------------------------
+
+def current_tileset():
+    """Manifest of the tileset named by current.json, re-read at most every 30 s."""
+    now = time.monotonic()
+    if now - _state['checked_at'] < _POINTER_CHECK_SEC:
+        return _state['tileset']
+    with _state_lock:
+        if now - _state['checked_at'] < _POINTER_CHECK_SEC:
+            return _state['tileset']
+        root = get_tiles_root()
+        tileset = None
+        try:
+            with open(root / 'current.json') as f:
+                name = json.load(f)['tileset']
+            current = _state['tileset']
+            if current is not None and current['tileset'] == name:
+                tileset = current
+            else:
+                with open(root / name / 'manifest.json') as f:
+                    tileset = json.load(f)
+                tileset['layer_names'] = {layer['name'] for layer in tileset['layers']}
+        except (FileNotFoundError, KeyError, ValueError):
+            tileset = None
+        _state['tileset'] = tileset
+        _state['checked_at'] = now
+        return tileset
+
+
+def read_tile(tileset, layer, z, x, y):
+    """Quantised tile bytes, or None outside the covered area."""
+    if layer not in tileset['layer_names']:
+        return None
+    try:
+        return _tile_path(get_tiles_root() / tileset['tileset'], layer, z, x, y).read_bytes()
+    except FileNotFoundError:
+        return None
+
+
+def _palette():
+    anchors = np.array(_PALETTE_ANCHORS, dtype=np.float64)
+    positions = np.linspace(0, 255, len(anchors))
+    levels = np.arange(256)
+    rgb = np.column_stack([np.interp(levels, positions, anchors[:, c]) for c in range(3)])
+    return rgb.round().astype(np.uint8).tobytes()
+
+
+_PLTE = _palette()
+
+
+def _png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+
+def render_png(data, cells):
+    """Palette PNG of a quantised tile; cached per tile since tilesets are immutable."""
+    rows = b''.join(b'\x00' + data[r * cells:(r + 1) * cells] for r in range(cells))
+    return b''.join((
+        b'\x89PNG\r\n\x1a\n',
+        _png_chunk(b'IHDR', struct.pack('>IIBBBBB', cells, cells, 8, 3, 0, 0, 0)),
+        _png_chunk(b'PLTE', _PLTE),
+        _png_chunk(b'tRNS', bytes([_PALETTE_ALPHA]) * 256),
+        _png_chunk(b'IDAT', zlib.compress(rows, 6)),
+        _png_chunk(b'IEND', b''),
+    ))
+
+
+def tile_png(tileset, layer, z, x, y):
+    key = (tileset['tileset'], layer, z, x, y)
+    with _png_lock:
+        png = _png_cache.get(key)
+        if png is not None:
+            _png_cache.move_to_end(key)
+            return png
+    data = read_tile(tileset, layer, z, x, y)
+    if data is None:
+        return None
+    png = render_png(data, tileset['cells'])
+    with _png_lock:
+        _png_cache[key] = png
+        while len(_png_cache) > _PNG_CACHE_MAX:
+            _png_cache.popitem(last=False)
+    return png
+
+
+def public_manifest(tileset):
+    """Manifest fields the map needs (no filesystem details)."""
+    lo, hi = tileset['scale']
+    return {
+        'tileset': tileset['tileset'],
+        'model_version': tileset['model_version'],
+        'cells': tileset['cells'],
+        'min_zoom': tileset['zooms'][0],
+        'max_zoom': tileset['zooms'][1],
+        'layers': tileset['layers'],
+        'profiles': tileset['profiles'],
+        'regions': tileset['regions'],
+        'price_range': [round(float(np.exp(lo))), round(float(np.exp(hi)))],
+        'legend': [round(float(p)) for p in dequantize([0, 64, 128, 192, 255], tileset['scale'])],
+    }
@@ -0,0 +1,251 @@
+"""
+On-demand profiling of live requests (see ProfilingMiddleware).
+
+A profiled request gets three measurements:
+
+- a statistical CPU profile: a background thread samples the Python stacks
+  of the request thread and of any busy helper thread (amenity fan-out
+  pools, prefetchers) every PROFILING_INTERVAL_MS via sys._current_frames(),
+  so the request itself runs uninstrumented;
+- an allocation snapshot from tracemalloc (traced only while the request
+  runs): peak traced memory and the lines holding the most memory at the end;
+- the worker's resident set size before and after.
+
+Results are written as JSON to PROFILING_DIR and indexed by the
+RequestProfile model for the admin. Only one request per process is
+profiled at a time, since tracemalloc and the sampler are process-wide.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+# Threads parked in these modules are idle pool workers or server loops;
+# their samples are dropped unless it is the request thread itself.
+_IDLE_MODULES = ('threading.py', 'queue.py', 'selectors.py', 'socketserver.py')
+# Housekeeping threads that sleep outside those modules.
+_BACKGROUND_THREADS = ('metrics-flush',)
+_POOL_SUFFIX = re.compile(r'_\d+$')
+_MAX_DEPTH = 96
+
+_active = threading.Lock()
+
+
+def profile_dir():
+    return Path(getattr(settings, 'PROFILING_DIR', None) or Path(settings.BASE_DIR) / 'request_profiles')
+
+
+def _rss_kb():
+    """Current resident set size of this process in KiB, or None off Linux."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StackSampler(threading.Thread):
+    """Counts collapsed stacks ("thread;module:func;...") at a fixed interval."""
+
+    def __init__(self, request_ident, interval_sec):
+        super().__init__(name='request-profiler', daemon=True)
+        self.request_ident = request_ident
+        self.interval_sec = interval_sec
+        self.counts = {}
+        self.samples = 0
+        self._done = threading.Event()
+        self._labels = {}
+        self._root = str(settings.BASE_DIR) + os.sep
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            if filename.startswith(self._root):
+                filename = filename[len(self._root):]
+            elif 'site-packages' + os.sep in filename:
+                filename = filename.split('site-packages' + os.sep, 1)[1]
+            else:
+                filename = os.path.basename(filename)
+            label = self._labels[code] = f'{filename}:{code.co_name}'
+        return label
+
+    def run(self):
+        own = threading.get_ident()
+        while not self._done.wait(self.interval_sec):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if ident == self.request_ident:
+                    thread = 'request'
+                elif frame.f_code.co_filename.endswith(_IDLE_MODULES):
+                    continue
+                else:
+                    thread = _POOL_SUFFIX.sub('', names.get(ident, 'thread'))
+                    if thread in _BACKGROUND_THREADS:
+                        continue
+                stack = []
+                while frame is not None and len(stack) < _MAX_DEPTH:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(thread)
+                key = ';'.join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+            self.samples += 1
+
+
+def _top_functions(counts, limit):
+    """Functions by self and total samples from the collapsed stacks."""
+    own, total = {}, {}
+    for key, count in counts.items():
+        frames = key.split(';')[1:]
+        if not frames:
+            continue
+        own[frames[-1]] = own.get(frames[-1], 0) + count
+        for name in set(frames):
+            total[name] = total.get(name, 0) + count
+    rows = [{'function': name, 'self': own.get(name, 0), 'total': count} for name, count in total.items()]
+    rows.sort(key=lambda r: (-r['self'], -r['total']))
+    return rows[:limit]
+
+
+class RequestProfiler:
+    """Profiles the calling thread between start() and finish()."""
+
+    def __init__(self, interval_ms=None, trace_frames=None):
+        self.interval_sec = float(interval_ms or getattr(settings, 'PROFILING_INTERVAL_MS', 5)) / 1000
+        self.trace_frames = int(trace_frames or getattr(settings, 'PROFILING_TRACEMALLOC_FRAMES', 1))
+        self._sampler = None
+        self._owns_tracing = False
+
+    def start(self):
+        self.started_at = timezone.now()
+        self._rss_before = _rss_kb()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.trace_frames)
+            self._owns_tracing = True
+        tracemalloc.reset_peak()
+        self._sampler = StackSampler(threading.get_ident(), self.interval_sec)
+        self._sampler.start()
+        self._cpu_start = time.thread_time()
+        self._process_cpu_start = time.process_time()
+        self._wall_start = time.perf_counter()
+
+    def finish(self):
+        """Stop measuring and return the profile as a dict."""
+        wall_ms = (time.perf_counter() - self._wall_start) * 1000
+        cpu_ms = (time.thread_time() - self._cpu_start) * 1000
+        process_cpu_ms = (time.process_time() - self._process_cpu_start) * 1000
+        self._sampler.stop()
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+        ))
+        if self._owns_tracing:
+            tracemalloc.stop()
+        rss_after = _rss_kb()
+        limit = int(getattr(settings, 'PROFILING_TOP_N', 30))
+        counts = self._sampler.counts
+        return {
+            'pid': os.getpid(),
+            'started_at': self.started_at.isoformat(),
+            'wall_ms': round(wall_ms, 3),
+            'cpu_ms': round(cpu_ms, 3),
+            'process_cpu_ms': round(process_cpu_ms, 3),
+            'sampler': {
+                'interval_ms': self.interval_sec * 1000,
+                'samples': self._sampler.samples,
+                'top_functions': _top_functions(counts, limit),
+                'stacks': dict(sorted(counts.items(), key=lambda kv: -kv[1])),
+            },
+            'allocations': {
+                'current_kb': round(current / 1024, 1),
+                'peak_kb': round(peak / 1024, 1),
+                'top': [
+                    {'where': str(stat.traceback[0]), 'size_kb': round(stat.size / 1024, 1), 'count': stat.count}
+                    for stat in snapshot.statistics('lineno')[:limit]
+                ],
+            },
+            'rss': {
+                'before_kb': self._rss_before,
+                'after_kb': rss_after,
+                'delta_kb': rss_after - self._rss_before if rss_after is not None and self._rss_before else None,
+            },
+        }
+
+
+def try_start():
+    """A started RequestProfiler, or None if another request in this process is being profiled."""
+    if not _active.acquire(blocking=False):
+        return None
+    try:
+        profiler = RequestProfiler()
+        profiler.start()
+    except Exception:
+        _active.release()
+        raise
+    return profiler
+
+
+def finish(profiler):
+    try:
+        return profiler.finish()
+    finally:
+        _active.release()
+
+
+def save_profile(data, request, response, trigger):
+    """Write the profile JSON, index it for the admin and apply retention; returns the record."""
+    from .models import RequestProfile
+
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    file_name = f"{timezone.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}.json"
+    data = dict(data, method=request.method, path=request.get_full_path()[:500],
+                view=getattr(request, '_profiling_view', ''), status=response.status_code, trigger=trigger)
+    (directory / file_name).write_text(json.dumps(data))
+    record = RequestProfile.objects.create(
+        file_name=file_name,
+        method=request.method,
+        path=data['path'],
+        view_name=data['view'],
+        status_code=response.status_code,
+        trigger=trigger,
+        pid=data['pid'],
+        wall_ms=data['wall_ms'],
+        cpu_ms=data['cpu_ms'],
+        samples=data['sampler']['samples'],
+        alloc_peak_kb=data['allocations']['peak_kb'],
+        rss_delta_kb=data['rss']['delta_kb'],
+    )
+    prune()
+    return record
+
+
+def prune():
+    """Drop profiles beyond PROFILING_MAX_PROFILES or older than PROFILING_RETENTION_DAYS."""
+    from .models import RequestProfile
+
+    keep = int(getattr(settings, 'PROFILING_MAX_PROFILES', 200))
+    days = float(getattr(settings, 'PROFILING_RETENTION_DAYS', 7))
+    expired = RequestProfile.objects.filter(created_at__lt=timezone.now() - timedelta(days=days))
+    overflow = RequestProfile.objects.order_by('-created_at')[keep:]
+    for record in list(expired) + list(overflow):
+        record.delete()
@@ -0,0 +1,44 @@
+"""
+JSON renderer and parser for the DRF API (REST_FRAMEWORK settings), using
+orjson like the other /api/ views (see api_response).
+"""
+
+import json
+import time
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+
+from .api_response import dumps, orjson
+
+
+class FastJSONRenderer(BaseRenderer):
+    """JSON with the API's encoder; the encode time is kept on the response for ApiCompressionMiddleware."""
+
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        start = time.perf_counter()
+        body = dumps(data)
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response.json_encode_seconds = time.perf_counter() - start
+        return body
+
+
+class FastJSONParser(BaseParser):
+    media_type = 'application/json'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        body = stream.read() if stream is not None else b''
+        try:
+            if orjson is not None:
+                return orjson.loads(body)
+            return json.loads(body)
+        except ValueError as e:
+            raise ParseError(f"JSON parse error - {str(e)}")
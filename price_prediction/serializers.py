@@ -0,0 +1,201 @@
+"""
+Serializers for the JSON prediction API (see api.py).
+
+PropertySerializer applies the same rules, with the same messages, as
+extract_form_data/validate_form_data do for the HTML form. Lists go
+through PropertyListSerializer, which converts each field to a numpy
+column and checks every rule against the whole column at once instead of
+running the field validators item by item, and reports errors in DRF's
+many=True shape: one dict of field → messages per item, empty for valid
+items. Both paths convert values with as_number(), so they accept and
+reject the same inputs with the same messages.
+"""
+
+import math
+
+import numpy as np
+from rest_framework import serializers
+
+from .utils import get_property_types
+
+# field → (integer?, required?, lower bound, upper bound, range message).
+# Bounds are (op, limit): 'gt' where the form says "greater than 0",
+# inclusive for coordinates.
+FIELD_RULES = {
+    'bedrooms': (True, True, ('gt', 0), None, "Number of bedrooms must be greater than 0"),
+    'bathrooms': (False, True, ('gt', 0), None, "Number of bathrooms must be greater than 0"),
+    'living_area': (True, True, ('gt', 0), None, "Living area must be greater than 0"),
+    'lot_area': (True, True, ('gt', 0), None, "Lot area must be greater than 0"),
+    'floor': (True, False, None, None, None),
+    'latitude': (False, True, ('ge', -90), ('le', 90), "Latitude must be between -90 and 90"),
+    'longitude': (False, True, ('ge', -180), ('le', 180), "Longitude must be between -180 and 180"),
+}
+PROPERTY_TYPE_REQUIRED = "Property type is required"
+MAX_ITEMS = 1000
+_MAX_STRING_LENGTH = 1000
+
+_MESSAGES = {key: str(message) for key, message in serializers.Field.default_error_messages.items()}
+_INVALID_INTEGER = str(serializers.IntegerField.default_error_messages['invalid'])
+_INVALID_NUMBER = str(serializers.FloatField.default_error_messages['invalid'])
+_INVALID_STRING = str(serializers.CharField.default_error_messages['invalid'])
+_MISSING = object()
+
+
+def as_number(value):
+    """Finite float for a JSON number or numeric string, else NaN (booleans are not numbers)."""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        return math.nan
+    if isinstance(value, str) and len(value) > _MAX_STRING_LENGTH:
+        return math.nan
+    try:
+        number = float(value)
+    except (ValueError, OverflowError):
+        return math.nan
+    return number if math.isfinite(number) else math.nan
+
+
+def _unknown_type(value):
+    return f"Unknown property_type: {value}"
+
+
+def _within(values, bound):
+    op, limit = bound
+    if op == 'gt':
+        return values > limit
+    return values >= limit if op == 'ge' else values <= limit
+
+
+class WholeNumberField(serializers.IntegerField):
+    """Integer from a number or numeric string with no fractional part (3, 3.0, "3")."""
+
+    def to_internal_value(self, data):
+        number = as_number(data)
+        if math.isnan(number) or number != round(number):
+            self.fail('invalid')
+        return int(number)
+
+
+class FiniteFloatField(serializers.FloatField):
+    """Float from a number or numeric string; NaN and infinities are rejected."""
+
+    def to_internal_value(self, data):
+        number = as_number(data)
+        if math.isnan(number):
+            self.fail('invalid')
+        return number
+
+
+class PropertyListSerializer(serializers.ListSerializer):
+
+    def validate_items(self, items):
+        """
+        (validated, errors) for a list of items: index → cleaned values
+        for the valid ones, index → {field: [message]} for the rest.
+        """
+        errors = {}
+        for i, item in enumerate(items):
+            if not isinstance(item, dict):
+                errors[i] = self._object_errors(item)
+        objects = [item if isinstance(item, dict) else {} for item in items]
+
+        def add(i, field, message):
+            item_errors = errors.setdefault(int(i), {})
+            if 'non_field_errors' not in item_errors:
+                item_errors.setdefault(field, [message])
+
+        def flag(mask, field, message):
+            for i in np.flatnonzero(mask):
+                add(i, field, message)
+
+        cleaned = {}
+        for field, (integer, required, low, high, message) in FIELD_RULES.items():
+            raw = [item.get(field, _MISSING) for item in objects]
+            missing = np.fromiter((v is _MISSING for v in raw), dtype=bool, count=len(raw))
+            null = np.fromiter((v is None for v in raw), dtype=bool, count=len(raw))
+            values = np.fromiter(map(as_number, raw), dtype=float, count=len(raw))
+            invalid = ~missing & ~null & np.isnan(values)
+            if integer:
+                invalid |= ~missing & ~null & ~invalid & (values != np.round(values))
+            if required:
+                flag(missing, field, _MESSAGES['required'])
+            flag(null, field, _MESSAGES['null'])
+            flag(invalid, field, _INVALID_INTEGER if integer else _INVALID_NUMBER)
+            ok = ~missing & ~null & ~invalid
+            checked = np.where(ok, values, 0.0)
+            for bound in (low, high):
+                if bound is not None:
+                    flag(ok & ~_within(checked, bound), field, message)
+            cleaned[field] = checked
+
+        known = set(get_property_types())
+        types = []
+        for i, item in enumerate(objects):
+            value = item.get('property_type', _MISSING)
+            if value is _MISSING:
+                add(i, 'property_type', _MESSAGES['required'])
+            elif value is None:
+                add(i, 'property_type', _MESSAGES['null'])
+            elif isinstance(value, bool) or not isinstance(value, (str, int, float)):
+                add(i, 'property_type', _INVALID_STRING)
+            elif not str(value).strip():
+                add(i, 'property_type', PROPERTY_TYPE_REQUIRED)
+            elif str(value).strip() not in known:
+                add(i, 'property_type', _unknown_type(str(value).strip()))
+            types.append(str(value).strip())
+
+        validated = {}
+        for i in range(len(items)):
+            if i in errors:
+                continue
+            row = {field: int(cleaned[field][i]) if FIELD_RULES[field][0] else float(cleaned[field][i])
+                   for field in FIELD_RULES}
+            row['property_type'] = types[i]
+            validated[i] = row
+        return validated, errors
+
+    def _object_errors(self, item):
+        # Rare, so let the single-object serializer word it (it varies with the type).
+        serializer = type(self.child)(data=item)
+        serializer.is_valid()
+        return {field: [str(message) for message in messages] for field, messages in serializer.errors.items()}
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            raise serializers.ValidationError({'non_field_errors': ["Expected a list of properties"]})
+        if len(data) > MAX_ITEMS:
+            raise serializers.ValidationError({'non_field_errors': [f"At most {MAX_ITEMS} properties per request"]})
+        validated, errors = self.validate_items(data)
+        if errors:
+            raise serializers.ValidationError([errors.get(i, {}) for i in range(len(data))])
+        return [validated[i] for i in range(len(data))]
+
+
+def _range_messages(field):
+    message = FIELD_RULES[field][4]
+    return {'min_value': message, 'max_value': message}
+
+
+class PropertySerializer(serializers.Serializer):
+    """One property, as the prediction form takes it."""
+
+    bedrooms = WholeNumberField(min_value=1, error_messages=_range_messages('bedrooms'))
+    bathrooms = FiniteFloatField()
+    living_area = WholeNumberField(min_value=1, error_messages=_range_messages('living_area'))
+    lot_area = WholeNumberField(min_value=1, error_messages=_range_messages('lot_area'))
+    floor = WholeNumberField(required=False, default=0)
+    property_type = serializers.CharField(error_messages={'blank': PROPERTY_TYPE_REQUIRED})
+    latitude = FiniteFloatField(min_value=-90, max_value=90, error_messages=_range_messages('latitude'))
+    longitude = FiniteFloatField(min_value=-180, max_value=180, error_messages=_range_messages('longitude'))
+
+    class Meta:
+        list_serializer_class = PropertyListSerializer
+
+    def validate_bathrooms(self, value):
+        if value <= 0:
+            raise serializers.ValidationError(FIELD_RULES['bathrooms'][4])
+        return value
+
+    def validate_property_type(self, value):
+        if value not in set(get_property_types()):
+            raise serializers.ValidationError(_unknown_type(value))
+        return value
@@ -0,0 +1,134 @@
+"""
+Fingerprinted, pre-compressed static files served by the app.
+
+`collectstatic` with CompressedManifestStaticFilesStorage copies every
+asset under a content-hashed name (style.3f2a9c1e0b7d.css, recorded in
+staticfiles.json so {% static %} resolves it) and writes .gz and, with the
+brotli package, .br siblings next to each compressible file.
+
+StaticFilesMiddleware then answers STATIC_URL requests from an index of
+STATIC_ROOT built at startup: hashed names get a one-year immutable
+Cache-Control, so repeat visits don't ask for them again, the best
+pre-compressed variant the client accepts is sent as is, and unhashed
+names are revalidated with an ETag.
+"""
+
+import gzip
+import json
+import logging
+import mimetypes
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE = ('.css', '.js', '.mjs', '.map', '.svg', '.json', '.txt', '.html', '.xml', '.ico', '.ttf', '.otf')
+# Only keep a compressed copy that saves at least this share of the bytes.
+_MIN_SAVING = 0.05
+_MIN_SIZE = 256
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def compress_file(path):
+    """Write path.gz and path.br next to path where that saves space; returns the encodings written."""
+    path = Path(path)
+    data = path.read_bytes()
+    if len(data) < _MIN_SIZE:
+        return []
+    variants = [('gzip', '.gz', lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('br', '.br', lambda d: brotli.compress(d, quality=11)))
+    written = []
+    for encoding, suffix, compress in variants:
+        compressed = compress(data)
+        target = path.with_name(path.name + suffix)
+        if len(compressed) <= len(data) * (1 - _MIN_SAVING):
+            target.write_bytes(compressed)
+            written.append(encoding)
+        elif target.exists():
+            target.unlink()
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that also writes .gz/.br siblings of compressible files."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE) and self.exists(name):
+                compress_file(self.path(name))
+
+    def stored_name(self, name):
+        # Without a collected manifest entry, fall back to the plain name
+        # (served with revalidation) rather than failing the page.
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            logger.warning(f"No hashed static file for {name}; run collectstatic")
+            return name
+
+
+class StaticIndex:
+    """url path → file details for everything under STATIC_ROOT."""
+
+    def __init__(self, root, url_prefix):
+        self.root = Path(root)
+        self.url_prefix = url_prefix
+        self.files = {}
+        if not self.root.is_dir():
+            return
+        hashed = set()
+        manifest = self.root / ManifestStaticFilesStorage.manifest_name
+        try:
+            hashed = set(json.loads(manifest.read_text()).get('paths', {}).values())
+        except (OSError, ValueError):
+            pass
+        for dirpath, _dirnames, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith(('.gz', '.br')):
+                    continue
+                path = Path(dirpath) / filename
+                name = path.relative_to(self.root).as_posix()
+                self.files[url_prefix + name] = self._entry(path, name in hashed)
+
+    @staticmethod
+    def _entry(path, immutable):
+        stat = path.stat()
+        content_type, _ = mimetypes.guess_type(path.name)
+        if content_type and (content_type.startswith('text/') or content_type.endswith('javascript')):
+            content_type += '; charset=utf-8'
+        variants = {'identity': (str(path), stat.st_size)}
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            sibling = path.with_name(path.name + suffix)
+            if sibling.exists():
+                variants[encoding] = (str(sibling), sibling.stat().st_size)
+        return {
+            'variants': variants,
+            'content_type': content_type or 'application/octet-stream',
+            'etag': f'{stat.st_mtime_ns:x}-{stat.st_size:x}',
+            'last_modified': int(stat.st_mtime),
+            'immutable': immutable,
+        }
+
+    def get(self, path):
+        return self.files.get(path)
+
+
+def static_url_prefix():
+    """STATIC_URL as a request path prefix ('/static/'), or None for an absolute (CDN) URL."""
+    url = settings.STATIC_URL or ''
+    if '://' in url or url.startswith('//'):
+        return None
+    return '/' + url.strip('/') + '/'
@@ -0,0 +1,354 @@
+"""
+Out-of-core variant of the training pipeline (training.py) for CSV feeds
+too large to load at once.
+
+Two passes over the file, each reading pandas chunks:
+  1. capping bounds - engineered features go into a fixed-size uniform
+     sample per column, whose quartiles give the IQR clip bounds; the
+     category values for the LabelEncoders are collected along the way.
+     Bounds are saved next to the feature cache and reused while the file
+     is unchanged.
+  2. training - an xgboost.DataIter yields encoded, engineered and capped
+     chunks into an ExtMemQuantileDMatrix, which keeps its pages in an
+     on-disk cache. The held-out rows are scored chunk by chunk.
+
+Memory is bounded by the chunk size, the quantile sample and XGBoost's
+quantised pages, not by the row count. On files smaller than the sample the
+bounds are exact, so the 30k-row CSV is capped exactly as the notebook does.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import resource
+import tempfile
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.preprocessing import LabelEncoder
+
+from . import training
+from .dataset import get_dataset_path
+from .utils import get_ml_files_path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNKSIZE = 100_000
+QUANTILE_SAMPLE_ROWS = 200_000
+_RAW_COLUMNS = [
+    'number of bedrooms', 'number of bathrooms', 'living area', 'lot area', 'floor',
+    'Lattitude', 'Longitude', 'property_type', training.TARGET_COL,
+]
+_CATEGORICAL = ('property_type', 'city')
+# Salts for the per-row hashes deciding the test split and the quantile sample.
+_SPLIT_SALT = 0x5EED
+_SAMPLE_SALT = 0x51A7
+_BOUNDS_VERSION = 1
+
+
+def _row_hash(rows, salt):
+    """Deterministic uniform [0, 1) value per global row number (splitmix64)."""
+    x = rows.astype(np.uint64) + np.uint64(salt * 0x9E3779B97F4A7C15 & 0xFFFFFFFFFFFFFFFF)
+    with np.errstate(over='ignore'):
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        x = x ^ (x >> np.uint64(31))
+    return (x >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _read_chunks(path, chunksize, with_city=False):
+    """(global row numbers, chunk) pairs with rows missing required values dropped."""
+    usecols = _RAW_COLUMNS + (['city'] if with_city else [])
+    start = 0
+    for chunk in pd.read_csv(path, usecols=usecols, chunksize=chunksize):
+        rows = np.arange(start, start + len(chunk))
+        start += len(chunk)
+        keep = chunk[_RAW_COLUMNS].notna().all(axis=1).to_numpy()
+        if not keep.all():
+            chunk, rows = chunk[keep], rows[keep]
+        yield rows, chunk
+
+
+def _engineered(chunk, property_classes):
+    """Chunk → dict of FINAL_FEATURES arrays (uncapped), as in predict_house_price."""
+    columns = {
+        name: chunk[name].to_numpy(dtype=np.float64)
+        for name in _RAW_COLUMNS if name not in ('property_type', training.TARGET_COL)
+    }
+    columns['property_type_encoded'] = np.searchsorted(
+        property_classes, chunk['property_type'].astype(str).to_numpy()
+    ).astype(np.float64)
+    return training.engineer_features(columns)
+
+
+def _bounds_path(path):
+    st = os.stat(path)
+    key = f"{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}:{_BOUNDS_VERSION}"
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    return get_ml_files_path() / 'training_cache' / f'stream_bounds_{digest}.json'
+
+
+def compute_bounds(path, chunksize=DEFAULT_CHUNKSIZE, sample_rows=QUANTILE_SAMPLE_ROWS):
+    """
+    First pass: IQR clip bounds per feature and the category values.
+    The sample keeps the rows with the smallest row hashes, which is a
+    uniform sample that can be merged chunk by chunk.
+    """
+    # city is optional: without it no city encoder is saved (the model doesn't use it).
+    has_city = 'city' in pd.read_csv(path, nrows=0).columns
+    categories = {name: set() for name in _CATEGORICAL}
+    # Property types are needed for property_type_encoded before the sample
+    # can be built, so the first pass samples raw columns only.
+    sample_keys = np.empty(0)
+    sample = None
+    rows_seen = 0
+    for rows, chunk in _read_chunks(path, chunksize, with_city=has_city):
+        rows_seen += len(rows)
+        for name in _CATEGORICAL:
+            if name not in chunk:
+                continue
+            categories[name].update(chunk[name].dropna().astype(str).unique())
+        keys = _row_hash(rows, _SAMPLE_SALT)
+        part = chunk[_RAW_COLUMNS]
+        if sample is not None:
+            keys = np.concatenate((sample_keys, keys))
+            part = pd.concat((sample, part), ignore_index=True)
+        if len(keys) > sample_rows:
+            keep = np.argpartition(keys, sample_rows)[:sample_rows]
+            keys, part = keys[keep], part.iloc[keep].reset_index(drop=True)
+        sample_keys, sample = keys, part
+
+    if sample is None:
+        raise ValueError(f"No usable rows in {path}")
+    classes = {name: sorted(values) for name, values in categories.items()}
+    features = _engineered(sample, np.asarray(classes['property_type']))
+    bounds = {name: list(training.iqr_bounds(features[name])) for name in training.FINAL_FEATURES}
+    return {
+        'version': _BOUNDS_VERSION,
+        'rows': rows_seen,
+        'sampled_rows': len(sample),
+        'exact': rows_seen <= sample_rows,
+        'bounds': bounds,
+        'classes': classes,
+    }
+
+
+def load_or_compute_bounds(path, chunksize=DEFAULT_CHUNKSIZE, use_cache=True):
+    cache_path = _bounds_path(path)
+    if use_cache:
+        try:
+            with open(cache_path) as f:
+                stored = json.load(f)
+            if stored.get('version') == _BOUNDS_VERSION:
+                return stored, True
+        except (FileNotFoundError, ValueError):
+            pass
+    stats = compute_bounds(path, chunksize)
+    if use_cache:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = f"{cache_path}.tmp{os.getpid()}"
+        with open(tmp, 'w') as f:
+            json.dump(stats, f)
+        os.replace(tmp, cache_path)
+    return stats, False
+
+
+def _prepared_chunks(path, stats, chunksize, subset, test_size):
+    """Second pass: (X, y) per chunk for the 'train' or 'test' rows."""
+    classes = np.asarray(stats['classes']['property_type'])
+    lower = np.array([stats['bounds'][f][0] for f in training.FINAL_FEATURES])
+    upper = np.array([stats['bounds'][f][1] for f in training.FINAL_FEATURES])
+    for rows, chunk in _read_chunks(path, chunksize):
+        is_test = _row_hash(rows, _SPLIT_SALT) < test_size
+        mask = is_test if subset == 'test' else ~is_test
+        if not mask.any():
+            continue
+        chunk = chunk[mask]
+        features = _engineered(chunk, classes)
+        X = np.column_stack([features[f] for f in training.FINAL_FEATURES])
+        np.clip(X, lower, upper, out=X)
+        yield X.astype(np.float32), chunk[training.TARGET_COL].to_numpy(dtype=np.float64)
+
+
+class ChunkIter(xgb.DataIter):
+    """Feeds the training rows to XGBoost one CSV chunk at a time."""
+
+    def __init__(self, path, stats, chunksize, test_size, cache_prefix):
+        super().__init__(cache_prefix=cache_prefix)
+        self.path = path
+        self.stats = stats
+        self.chunksize = chunksize
+        self.test_size = test_size
+        self.rows = 0
+        self._chunks = None
+
+    def reset(self):
+        self._chunks = None
+
+    def next(self, input_data):
+        if self._chunks is None:
+            self.rows = 0
+            self._chunks = _prepared_chunks(self.path, self.stats, self.chunksize, 'train', self.test_size)
+        try:
+            X, y = next(self._chunks)
+        except StopIteration:
+            return False
+        self.rows += len(y)
+        input_data(data=X, label=np.log1p(y), feature_names=list(training.FINAL_FEATURES))
+        return True
+
+
+def _native_params(params, n_jobs):
+    p = dict(training.DEFAULT_PARAMS, **(params or {}))
+    return {
+        'objective': 'reg:squarederror',
+        'tree_method': 'hist',
+        'max_depth': p['max_depth'],
+        'eta': p['learning_rate'],
+        'subsample': p['subsample'],
+        'colsample_bytree': p['colsample_bytree'],
+        'min_child_weight': p['min_child_weight'],
+        'lambda': p['reg_lambda'],
+        'seed': p['random_state'],
+        'nthread': n_jobs or os.cpu_count() or 1,
+    }, p['n_estimators']
+
+
+def stream_evaluate(booster, path, stats, chunksize, test_size, holdout=None):
+    """
+    MAE, MAPE (%) and R² on the price scale, accumulated over test chunks.
+    When holdout is a list, up to training.HOLDOUT_ROWS test rows are
+    appended to it as (X, y) pairs.
+    """
+    n = abs_err = pct_err = sum_y = sum_y2 = sse = 0.0
+    kept = 0
+    for X, y in _prepared_chunks(path, stats, chunksize, 'test', test_size):
+        if holdout is not None and kept < training.HOLDOUT_ROWS:
+            take = training.HOLDOUT_ROWS - kept
+            holdout.append((X[:take], y[:take]))
+            kept += len(y[:take])
+        pred = np.expm1(booster.inplace_predict(X))
+        err = y - pred
+        n += len(y)
+        abs_err += np.abs(err).sum()
+        pct_err += (np.abs(err) / np.maximum(np.abs(y), np.finfo(np.float64).eps)).sum()
+        sum_y += y.sum()
+        sum_y2 += (y * y).sum()
+        sse += (err * err).sum()
+    if not n:
+        return {'mae': None, 'mape': None, 'r2': None, 'rows': 0}
+    sst = sum_y2 - sum_y * sum_y / n
+    return {
+        'mae': float(abs_err / n),
+        'mape': float(pct_err / n * 100),
+        'r2': float(1 - sse / sst) if sst > 0 else None,
+        'rows': int(n),
+    }
+
+
+def to_regressor(booster, n_jobs=None):
+    """Wrap a native Booster so predict_house_price can use it like the notebook model."""
+    model = xgb.XGBRegressor(n_jobs=n_jobs)
+    model.load_model(bytearray(booster.save_raw(raw_format='ubj')))
+    return model
+
+
+def stream_train(csv_path=None, chunksize=DEFAULT_CHUNKSIZE, params=None, n_jobs=None,
+                 output_dir=None, use_cache=True, save=True, test_size=training.TEST_SIZE):
+    """
+    Train from csv_path without loading it whole. Returns a report like
+    training.train(), plus the peak RSS of the process.
+    """
+    csv_path = str(csv_path or get_dataset_path())
+    timer = training.StageTimer()
+    with timer.stage('bounds'):
+        stats, cached = load_or_compute_bounds(csv_path, chunksize, use_cache=use_cache)
+    native, rounds = _native_params(params, n_jobs)
+    with tempfile.TemporaryDirectory(prefix='xgb-extmem-') as cache_dir:
+        it = ChunkIter(csv_path, stats, chunksize, test_size, os.path.join(cache_dir, 'train'))
+        with timer.stage('build_dmatrix'):
+            dtrain = xgb.ExtMemQuantileDMatrix(it, nthread=native['nthread'])
+        with timer.stage('fit'):
+            booster = xgb.train(native, dtrain, num_boost_round=rounds)
+        train_rows = dtrain.num_row()
+        del dtrain
+    holdout = []
+    with timer.stage('evaluate'):
+        metrics = stream_evaluate(booster, csv_path, stats, chunksize, test_size, holdout)
+    model = to_regressor(booster, n_jobs)
+    holdout_X = np.concatenate([X for X, _ in holdout]) if holdout else np.empty((0, len(training.FINAL_FEATURES)))
+    holdout_y = np.concatenate([y for _, y in holdout]) if holdout else np.empty(0)
+    tiers = None
+    if len(holdout_y):
+        with timer.stage('tiers'):
+            tiers = training.measure_tiers(
+                model, pd.DataFrame(holdout_X, columns=training.FINAL_FEATURES), holdout_y,
+            )
+    output_dir = output_dir or get_ml_files_path()
+    if save:
+        property_encoder = LabelEncoder().fit(stats['classes']['property_type'])
+        city_encoder = LabelEncoder().fit(stats['classes']['city']) if stats['classes']['city'] else None
+        prepared = {
+            'features': list(training.FINAL_FEATURES),
+            'capping_bounds': stats['bounds'],
+            'property_type_encoder': property_encoder,
+            'city_encoder': city_encoder,
+        }
+        with timer.stage('save'):
+            training.save_artifacts(model, prepared, output_dir, extra_config={
+                'metrics': {k: metrics[k] for k in ('mae', 'mape', 'r2')},
+                'streamed_from': csv_path,
+                'prediction_tiers': tiers,
+            }, holdout=(holdout_X, holdout_y))
+    return {
+        'rows': stats['rows'],
+        'train_rows': int(train_rows),
+        'test_rows': metrics['rows'],
+        'bounds_cache_hit': cached,
+        'bounds_exact': stats['exact'],
+        'chunksize': chunksize,
+        'metrics': metrics,
+        'tiers': tiers,
+        'stages': timer.stages,
+        'total_sec': timer.total,
+        'peak_rss_mb': peak_rss_mb(),
+        'output_dir': str(output_dir) if save else None,
+        'model': model,
+    }
+
+
+def write_synthetic_csv(path, rows, seed=0, chunksize=DEFAULT_CHUNKSIZE, source=None):
+    """
+    Scale the sample CSV up to `rows` rows with the same schema: rows are
+    drawn with replacement and their continuous columns jittered, so the
+    feature distribution stays realistic without repeating rows verbatim.
+    """
+    source = pd.read_csv(source or get_dataset_path())
+    rng = np.random.default_rng(seed)
+    jitter = {
+        'living area': 0.08, 'lot area': 0.08, training.TARGET_COL: 0.06,
+        'Area of the house(excluding basement)': 0.08, 'Area of the basement': 0.08,
+        'living_area_renov': 0.08, 'lot_area_renov': 0.08,
+    }
+    written = 0
+    header = True
+    with open(path, 'w', newline='') as f:
+        while written < rows:
+            n = min(chunksize, rows - written)
+            chunk = source.iloc[rng.integers(0, len(source), n)].reset_index(drop=True)
+            for col, scale in jitter.items():
+                if col in chunk:
+                    values = chunk[col].to_numpy(dtype=np.float64) * rng.normal(1.0, scale, n)
+                    chunk[col] = np.maximum(values, 0).round().astype(np.int64)
+            for col in ('Lattitude', 'Longitude'):
+                chunk[col] = chunk[col] + rng.normal(0, 0.01, n)
+            chunk.to_csv(f, header=header, index=False)
+            header = False
+            written += n
+    return path
@@ -1,3 +1,579 @@
-from django.test import TestCase
+import math
+import os
+import signal
+import socket
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from . import deadline, incremental_training, metrics, model_server, overpass, training, upstream_cache, utils
+from .serializers import FIELD_RULES, PropertySerializer
+
+PROPERTY_TYPES = ['Apartment', 'House', 'Villa']
+
+VALID = {
+    'bedrooms': 3,
+    'bathrooms': 2.5,
+    'living_area': 1500,
+    'lot_area': 3000,
+    'floor': 2,
+    'property_type': 'Apartment',
+    'latitude': 12.97,
+    'longitude': 77.59,
+}
+
+_DROP = object()
+
+
+def _with(**changes):
+    item = dict(VALID)
+    for field, value in changes.items():
+        if value is _DROP:
+            item.pop(field)
+        else:
+            item[field] = value
+    return item
+
+
+# Valid and invalid items, covering each rule and the conversions both paths share.
+ITEMS = [
+    VALID,
+    _with(floor=_DROP),
+    _with(bedrooms='3', living_area='1500.0', latitude='12.5'),
+    _with(bedrooms=3.0, lot_area=' 3000 '),
+    _with(property_type='  House  '),
+    _with(latitude=-90, longitude=180),
+    _with(bedrooms=_DROP),
+    _with(bathrooms=None),
+    _with(bedrooms=0),
+    _with(bedrooms=-2),
+    _with(bedrooms=2.5),
+    _with(bedrooms=True),
+    _with(bathrooms=False),
+    _with(bathrooms='abc'),
+    _with(bathrooms=0),
+    _with(living_area='inf'),
+    _with(lot_area=float('nan')),
+    _with(lot_area='1e400'),
+    _with(floor=None),
+    _with(floor=1.5),
+    _with(floor=-1),
+    _with(latitude=90.5),
+    _with(longitude=-180.01),
+    _with(latitude=[12.97]),
+    _with(longitude={'value': 1}),
+    _with(property_type=''),
+    _with(property_type='   '),
+    _with(property_type=None),
+    _with(property_type=_DROP),
+    _with(property_type='Castle'),
+    _with(property_type=7),
+    _with(property_type=True),
+    _with(property_type=['House']),
+    _with(bedrooms='1' * 2000),
+    _with(bedrooms=0, bathrooms=-1, latitude=100, property_type='Castle'),
+    {},
+]
+
+
+def _messages(errors):
+    return {field: [str(message) for message in messages] for field, messages in errors.items()}
+
+
+@mock.patch('price_prediction.serializers.get_property_types', lambda: PROPERTY_TYPES)
+class PropertySerializerParityTests(SimpleTestCase):
+    """The vectorized list path accepts, rejects and cleans items exactly like the single-object serializer."""
+
+    def single(self, item):
+        serializer = PropertySerializer(data=item)
+        if serializer.is_valid():
+            return dict(serializer.validated_data), None
+        return None, _messages(serializer.errors)
+
+    def test_list_matches_single_item_by_item(self):
+        validated, errors = PropertySerializer(many=True).validate_items(ITEMS)
+        self.assertEqual(set(validated) | set(errors), set(range(len(ITEMS))))
+        for i, item in enumerate(ITEMS):
+            with self.subTest(item=item):
+                expected, expected_errors = self.single(item)
+                if expected_errors is None:
+                    self.assertNotIn(i, errors)
+                    self.assertEqual(validated[i], expected)
+                    for field, (integer, *_rest) in FIELD_RULES.items():
+                        self.assertIs(type(validated[i][field]), int if integer else float)
+                else:
+                    self.assertNotIn(i, validated)
+                    self.assertEqual(errors[i], expected_errors)
+
+    def test_non_object_items(self):
+        items = [VALID, 'House', 3, None, [VALID]]
+        _, errors = PropertySerializer(many=True).validate_items(items)
+        for i, item in enumerate(items[1:], start=1):
+            with self.subTest(item=item):
+                self.assertEqual(errors[i], self.single(item)[1])
+
+    def test_many_true_reports_errors_per_item(self):
+        serializer = PropertySerializer(data=[VALID, _with(bedrooms=0), _with(floor=_DROP)], many=True)
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors[0], {})
+        self.assertEqual(_messages(serializer.errors[1]), {'bedrooms': ["Number of bedrooms must be greater than 0"]})
+        self.assertEqual(serializer.errors[2], {})
+
+    def test_many_true_valid_list(self):
+        serializer = PropertySerializer(data=[VALID, _with(floor=_DROP)], many=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual([row['floor'] for row in serializer.validated_data], [2, 0])
+
+
+@mock.patch('price_prediction.serializers.get_property_types', lambda: PROPERTY_TYPES)
+@mock.patch('price_prediction.api.get_prediction_tier', lambda params, default: (default, {'rounds': 10}))
+@mock.patch('price_prediction.api.estimate_prices',
+            lambda rows, tier=None, explain=False: [{'price': 1000.0 * row['living area']} for row in rows])
+class PredictionAPITests(SimpleTestCase):
+    url = '/house-price-prediction/api/v1/predict/'
+
+    def post(self, data):
+        return self.client.post(self.url, data, content_type='application/json')
+
+    def test_list_prices_valid_items_and_reports_invalid_ones_in_place(self):
+        response = self.post([VALID, _with(bedrooms=0), _with(living_area=2000)])
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body['valid'], body['invalid']), (2, 1))
+        self.assertEqual(body['results'][0]['price'], 1500000.0)
+        self.assertEqual(body['results'][1], {'errors': {'bedrooms': ["Number of bedrooms must be greater than 0"]}})
+        self.assertEqual(body['results'][2]['price'], 2000000.0)
+
+    def test_all_invalid_list_is_a_bad_request(self):
+        response = self.post([_with(bedrooms=0), 'House'])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['invalid'], 2)
+
+    def test_single_object_errors_match_the_serializer(self):
+        response = self.post(_with(latitude=91))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'errors': {'latitude': ["Latitude must be between -90 and 90"]}})
+
+
+def _start_model_server(path):
+    """Fork a ModelServer on path; returns its pid once it accepts connections."""
+    pid = os.fork()
+    if pid == 0:
+        try:
+            model_server.ModelServer(path, batch_wait_ms=5).serve_forever()
+        finally:
+            os._exit(0)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+            return pid
+        except OSError:
+            time.sleep(0.05)
+        finally:
+            probe.close()
+    os.kill(pid, signal.SIGKILL)
+    raise RuntimeError("Model server did not start")
+
+
+def _stop_model_server(pid):
+    os.kill(pid, signal.SIGKILL)
+    os.waitpid(pid, 0)
+
+
+class ModelServerTests(SimpleTestCase):
+    """The model server's frame protocol round-trips, and workers fall back to in-process inference."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp = tempfile.TemporaryDirectory(prefix='model-server-test-')
+        model_dir = Path(cls.tmp.name) / 'ML_Files'
+        training.train(params={'n_estimators': 30}, n_jobs=1, output_dir=model_dir, use_cache=False)
+        cls.model_dir = model_dir
+        cls.enterClassContext(mock.patch.object(utils, 'get_ml_files_path', lambda: model_dir))
+        # Check for a newly published model on every call (the forked server inherits this).
+        cls.enterClassContext(override_settings(MODEL_RELOAD_CHECK_SEC=0))
+        saved_cache = dict(utils._model_cache)
+        utils._model_cache.update(dict.fromkeys(utils._model_cache))
+        cls.addClassCleanup(utils._model_cache.update, saved_cache)
+        utils.load_model_artifacts()
+
+        cls.socket_path = str(Path(cls.tmp.name) / 'model.sock')
+        cls.server_pid = _start_model_server(cls.socket_path)
+        cls.addClassCleanup(lambda: _stop_model_server(cls.server_pid))
+        cls.addClassCleanup(cls.tmp.cleanup)
+
+    def setUp(self):
+        self.enterContext(override_settings(MODEL_SERVER_SOCKET=self.socket_path, MODEL_SERVER_RETRY_SEC=30))
+        model_server._state.update(serving=False, client=None, pid=None, retry_at=0.0)
+        self.addCleanup(model_server._state.update, client=None, pid=None, retry_at=0.0)
+
+    def columns(self, rows=40):
+        rng = np.random.default_rng(rows)
+        return {
+            'number of bedrooms': rng.integers(1, 6, rows),
+            'number of bathrooms': rng.integers(1, 8, rows) / 2,
+            'living area': rng.uniform(400, 6000, rows),
+            'lot area': rng.uniform(1000, 20000, rows),
+            'floor': rng.integers(0, 4, rows),
+            'property_type': rng.choice(sorted(utils.get_property_types()), rows),
+            'Lattitude': rng.uniform(52, 53.5, rows),
+            'Longitude': rng.uniform(-115, -113, rows),
+        }
+
+    def in_process(self, function, *args):
+        with override_settings(MODEL_SERVER_SOCKET=''):
+            return function(*args)
+
+    def fallbacks(self, op):
+        return metrics.MODEL_SERVER_REQUESTS._values.get((op, 'fallback'), 0)
+
+    def test_predictions_match_in_process(self):
+        columns = self.columns()
+        for tier in (None, 'fast', 'full'):
+            with self.subTest(tier=tier):
+                served, prices = model_server.call('predict', columns, tier)
+                self.assertTrue(served)
+                np.testing.assert_array_equal(prices, self.in_process(utils.predict_house_prices, columns, tier))
+
+    def test_explanations_match_in_process(self):
+        columns = self.columns(7)
+        served, result = model_server.call('explain', columns, 'balanced')
+        self.assertTrue(served)
+        expected = self.in_process(utils.explain_house_prices, columns, 'balanced')
+        for got, want in zip(result, expected):
+            np.testing.assert_array_equal(got, want)
+
+    def test_single_prediction_and_metadata_match_in_process(self):
+        row = {name: values[0] for name, values in self.columns(1).items()}
+        self.assertEqual(utils.predict_house_price(row), self.in_process(utils.predict_house_price, row))
+        served, info = model_server.call('info')
+        self.assertTrue(served)
+        self.assertEqual(info['model_version'], str(self.in_process(utils.get_model_version)))
+        self.assertEqual(info['property_types'], [str(t) for t in self.in_process(utils.get_property_types)])
+        self.assertEqual(info['tiers'], self.in_process(utils.get_prediction_tiers))
+
+    def test_input_errors_are_raised_like_in_process(self):
+        unknown = dict(self.columns(3), property_type=np.array(['Castle', 'Castle', 'Castle']))
+        ragged = dict(self.columns(3), floor=np.array([0, 1]))
+        missing = {k: v for k, v in self.columns(3).items() if k != 'lot area'}
+        for columns, error in ((unknown, ValueError), (ragged, ValueError), (missing, KeyError)):
+            with self.subTest(error=error):
+                with self.assertRaises(error) as served:
+                    model_server.call('predict', columns, None)
+                with self.assertRaises(error) as in_process:
+                    self.in_process(utils.predict_house_prices, columns)
+                if error is ValueError:
+                    self.assertEqual(str(served.exception), str(in_process.exception))
+        self.assertEqual(model_server._state['retry_at'], 0.0)
+
+    def test_published_model_is_reloaded(self):
+        columns = self.columns(10)
+        before = utils.get_model_version()
+        training.train(params={'n_estimators': 12}, n_jobs=1, output_dir=self.model_dir, use_cache=False)
+        served, info = model_server.call('info')
+        self.assertTrue(served)
+        self.assertNotEqual(info['model_version'], before)
+        self.assertEqual(info['model_version'], str(self.in_process(utils.get_model_version)))
+        served, prices = model_server.call('predict', columns, None)
+        self.assertTrue(served)
+        np.testing.assert_array_equal(prices, self.in_process(utils.predict_house_prices, columns))
+
+    def test_server_error_statuses_map_to_exceptions(self):
+        client = model_server.get_client()
+        with self.assertRaisesRegex(ValueError, 'Malformed request'):
+            client._call(model_server.OP_PREDICT)
+
+        def fail(op, tier, matrix):
+            if (matrix[:, 2] < 0).any():
+                raise ValueError("Living area must be greater than 0")
+            if (matrix[:, 3] < 0).any():
+                raise KeyError("lot area")
+            return np.zeros((len(matrix), 1))
+
+        server = model_server.ModelServer(self.socket_path + '.unused')
+        ends = [socket.socketpair() for _ in range(3)]
+        matrix = np.ones((2, len(model_server.INPUT_COLUMNS)))
+        bad_area, bad_lot = matrix.copy(), matrix.copy()
+        bad_area[1, 2] = -1
+        bad_lot[0, 3] = -1
+        jobs = [model_server._Job(ours, mock.MagicMock(), i, model_server.OP_PREDICT, None, m)
+                for i, ((ours, _), m) in enumerate(zip(ends, (matrix, bad_area, bad_lot)))]
+        with mock.patch.object(model_server, 'score', fail):
+            server._score_group(model_server.OP_PREDICT, None, jobs)
+        replies = []
+        for ours, theirs in ends:
+            request_id, status, rows, cols, size = model_server._RESPONSE.unpack(
+                model_server._recv_exact(theirs, model_server._RESPONSE.size))
+            replies.append((request_id, status, rows, model_server._recv_exact(theirs, size)))
+            ours.close()
+            theirs.close()
+        # One caller's bad input fails only that caller, with its error type.
+        self.assertEqual(replies[0][:3], (0, model_server.STATUS_OK, 2))
+        self.assertEqual(replies[1], (1, model_server.STATUS_VALUE_ERROR, 0, b"Living area must be greater than 0"))
+        self.assertEqual(replies[2], (2, model_server.STATUS_KEY_ERROR, 0, b"lot area"))
+
+    def test_timeout_falls_back_to_in_process(self):
+        columns = self.columns(5)
+        expected = self.in_process(utils.predict_house_prices, columns)
+        silent = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        silent_path = str(Path(self.tmp.name) / 'silent.sock')
+        silent.bind(silent_path)
+        silent.listen(1)
+        self.addCleanup(os.unlink, silent_path)
+        self.addCleanup(silent.close)
+        before = self.fallbacks('predict')
+        with override_settings(MODEL_SERVER_SOCKET=silent_path, MODEL_SERVER_TIMEOUT_SEC=0.2), \
+                self.assertLogs('price_prediction.model_server', 'WARNING'):
+            np.testing.assert_array_equal(utils.predict_house_prices(columns), expected)
+            self.assertEqual(self.fallbacks('predict'), before + 1)
+            # Backing off: the next call doesn't wait for the server again.
+            self.assertIsNone(model_server.get_client())
+            started = time.monotonic()
+            np.testing.assert_array_equal(utils.predict_house_prices(columns), expected)
+            self.assertLess(time.monotonic() - started, 0.2)
+
+    def test_missing_server_falls_back_to_in_process(self):
+        columns = self.columns(5)
+        with override_settings(MODEL_SERVER_SOCKET=str(Path(self.tmp.name) / 'absent.sock')), \
+                self.assertLogs('price_prediction.model_server', 'WARNING'):
+            served, _ = model_server.call('predict', columns, None)
+            self.assertFalse(served)
+            np.testing.assert_array_equal(utils.predict_house_prices(columns),
+                                          self.in_process(utils.predict_house_prices, columns))
+
+    def test_reconnects_after_server_restart(self):
+        columns = self.columns(5)
+        self.assertTrue(model_server.call('predict', columns, None)[0])
+        _stop_model_server(self.server_pid)
+        type(self).server_pid = _start_model_server(self.socket_path)
+        before = self.fallbacks('predict')
+        # The kept-alive connection is stale; the client retries once on a new one.
+        served, prices = model_server.call('predict', columns, None)
+        self.assertTrue(served)
+        np.testing.assert_array_equal(prices, self.in_process(utils.predict_house_prices, columns))
+        self.assertEqual(self.fallbacks('predict'), before)
+
+
+class TieredCacheTests(SimpleTestCase):
+    """peek answers from memory or disk without counting a lookup or a hit."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory(prefix='upstream-cache-test-')
+        self.addCleanup(tmp.cleanup)
+        self.store = upstream_cache.PersistentStore(Path(tmp.name) / 'cache.sqlite3')
+        # Commit queued writes now, not at exit after the directory is gone.
+        self.addCleanup(self.store.drain)
+        self.cache = upstream_cache.TieredCache('test_peek', 60, store=self.store)
+
+    def lookups(self):
+        return sum(metrics.CACHE_REQUESTS._values.get(('test_peek', result), 0) for result in ('hit', 'miss'))
+
+    def test_peek_records_nothing(self):
+        self.store._conn().execute(
+            "INSERT INTO upstream_cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            ('test_peek', '"on-disk"', '1', time.time() + 60),
+        )
+        self.cache.set('in-memory', 1)
+        with self.store._hits_lock:
+            self.store._hits.clear()
+        before = self.lookups()
+        self.assertTrue(self.cache.peek('in-memory'))
+        self.assertTrue(self.cache.peek('on-disk'))
+        self.assertFalse(self.cache.peek('missing'))
+        self.assertEqual(self.lookups(), before)
+        self.assertEqual(self.store._hits, {})
+        self.assertEqual(len(self.cache), 1)
+
+
+class OverpassPlanTests(SimpleTestCase):
+    """Query merging, ring limits and the density-driven radius."""
+
+    def setUp(self):
+        self.enterContext(mock.patch.dict(overpass._DENSITY, clear=True))
+
+    def test_buckets_sharing_a_key_are_merged_into_one_regex_clause(self):
+        plan = overpass.build_overpass_query(19.07, 72.88, ['hospital', 'school', 'nowhere'], 5, radius_m=900)
+        self.assertEqual(plan.buckets, ('hospital', 'school'))
+        self.assertEqual(plan.query.count('nwr["amenity"~"^(hospital|clinic|school)$"](around:900,19.07,72.88)'), 1)
+        self.assertNotIn('"amenity"="school"', plan.query)
+        single = overpass.build_overpass_query(19.07, 72.88, ['bank'], 5, radius_m=900)
+        self.assertIn('nwr["amenity"="bank"](around:900,19.07,72.88)', single.query)
+        self.assertIsNone(overpass.build_overpass_query(19.07, 72.88, ['nowhere'], 5))
+
+    def test_near_and_outer_rings_each_have_the_group_limit(self):
+        plan = overpass.build_overpass_query(19.07, 72.88, ['hospital', 'school'], 5, radius_m=900)
+        self.assertEqual(plan.near_radius_m, 300)
+        self.assertIn('nwr.g0a(around:300,19.07,72.88)->.g0n;', plan.query)
+        self.assertIn('(.g0a; - .g0n;)->.g0;', plan.query)
+        # Two buckets in the group: twice the per-bucket output, per ring.
+        self.assertEqual(plan.limits, {'g0': 80, 'g0n': 80})
+        self.assertLess(plan.query.index('.g0n out center tags qt 80;'), plan.query.index('.g0 out center tags qt 80;'))
+
+    def test_group_counts_split_elements_by_group_and_ring(self):
+        plan = overpass.build_overpass_query(19.0, 72.0, ['hospital', 'train_station'], 5, radius_m=900)
+        amenity, railway = 'g0', 'g1'
+        elements = [
+            {'lat': 19.001, 'lon': 72.0, 'tags': {'amenity': 'clinic'}},            # ~111 m
+            {'center': {'lat': 19.0, 'lon': 72.005}, 'tags': {'amenity': 'hospital'}},  # ~525 m
+            {'lat': 19.0, 'lon': 72.001, 'tags': {'railway': 'halt'}},
+            {'lat': 19.0, 'lon': 72.001, 'tags': {'amenity': 'pharmacy'}},
+        ]
+        self.assertEqual(overpass.group_counts(plan, elements),
+                         {f'{amenity}n': 1, amenity: 1, f'{railway}n': 1, railway: 0})
+
+    def test_adaptive_radius_is_clamped_to_the_allowed_range(self):
+        self.assertEqual(overpass.adaptive_radius(10.0, 10.0), overpass.DEFAULT_RADIUS_M)
+        cells = {(10.0, 10.0): 1e6, (11.0, 11.0): 0.01, (12.0, 12.0): 150 / math.pi}
+        overpass._DENSITY.update(cells)
+        self.assertEqual(overpass.adaptive_radius(10.0, 10.0), overpass.MIN_RADIUS_M)
+        self.assertEqual(overpass.adaptive_radius(11.0, 11.0), overpass.MAX_RADIUS_M)
+        # 150 elements at 150/pi per km² fill exactly 1 km.
+        self.assertAlmostEqual(overpass.adaptive_radius(12.0, 12.0), 1000, delta=1)
+
+    def test_truncated_groups_count_double(self):
+        buckets = list(overpass._BUCKET_FILTERS)
+        plan = overpass.build_overpass_query(20.0, 70.0, buckets, 5, radius_m=1000)
+        limit = plan.limits['g0']
+        counts = dict.fromkeys(plan.limits, 0)
+        counts.update(g0=limit, g0n=10)
+        overpass.record_density(20.0, 70.0, plan, counts)
+        self.assertAlmostEqual(overpass.observed_density(20.0, 70.0), (2 * limit + 10) / math.pi)
+        # Later samples are smoothed into the estimate.
+        overpass.record_density(20.0, 70.0, plan, dict.fromkeys(plan.limits, 0))
+        self.assertAlmostEqual(overpass.observed_density(20.0, 70.0), (2 * limit + 10) / math.pi / 2)
+        # Half the buckets asked for: the sample is scaled up to all of them.
+        half = overpass.build_overpass_query(21.0, 71.0, buckets[:3], 5, radius_m=1000)
+        overpass.record_density(21.0, 71.0, half, {'g0': 5})
+        self.assertAlmostEqual(overpass.observed_density(21.0, 71.0), 5 / math.pi * 2)
+
+
+@override_settings(UPSTREAM_BUDGET_SEC=5.0, UPSTREAM_BUDGET_MAX_SEC=10.0)
+class DeadlineTests(SimpleTestCase):
+    """Request budgets, derived timeouts and the timing headers."""
+
+    def request(self, budget_ms=None):
+        headers = {} if budget_ms is None else {'HTTP_X_REQUEST_BUDGET_MS': budget_ms}
+        return RequestFactory().get('/', **headers)
+
+    def test_client_budget_is_capped_by_settings(self):
+        for header, budget in ((None, 5.0), ('2500', 2.5), ('60000', 10.0), ('abc', 5.0), ('-5', 5.0)):
+            with self.subTest(header=header):
+                self.assertEqual(deadline.Deadline.from_request(self.request(header)).budget_sec, budget)
+
+    def test_child_reserves_time_and_shares_spans(self):
+        parent = deadline.Deadline(2.0)
+        child = parent.child(0.5)
+        self.assertAlmostEqual(parent.expires_at - child.expires_at, 0.5)
+        # Never earlier than the start, however much is reserved.
+        self.assertEqual(parent.child(10).expires_at, parent.started_at)
+        child.skip('photon')
+        self.assertEqual(parent.report()['spans'], {'photon_skipped': {'ms': 0.0, 'count': 1}})
+
+    def test_timeout_follows_the_time_left(self):
+        budget = deadline.Deadline(2.0)
+        connect, read = budget.timeout()
+        self.assertEqual(connect, 1.2)
+        self.assertAlmostEqual(read, 2.0, delta=0.05)
+        self.assertEqual(budget.timeout(read_cap=0.5)[1], 0.5)
+        short = deadline.Deadline(0.5)
+        self.assertAlmostEqual(short.timeout()[0], 0.5, delta=0.05)
+        with self.assertRaises(deadline.DeadlineExceeded):
+            deadline.Deadline(0.1).timeout()
+
+    def test_with_deadline_reports_spend_in_headers(self):
+        @deadline.with_deadline
+        def view(request):
+            with request.deadline.span('overpass'):
+                pass
+            request.deadline.skip('photon')
+            return HttpResponse()
+
+        response = view(self.request('3000'))
+        timing = response['Server-Timing'].split(', ')
+        self.assertEqual(timing[0], 'budget;dur=3000.0')
+        self.assertTrue(timing[1].startswith('total;dur='))
+        self.assertTrue(timing[2].startswith('overpass;dur=') and timing[2].endswith(';desc="x1"'))
+        self.assertEqual(timing[3], 'photon_skipped;dur=0.0;desc="x1"')
+        self.assertLessEqual(float(response['X-Request-Budget-Remaining-Ms']), 3000.0)
+        self.assertGreater(float(response['X-Request-Budget-Remaining-Ms']), 2900.0)
+
+
+class IncrementalUpdateTests(SimpleTestCase):
+    """The reservoir-sampled reference holdout and the publish gate of update_price_model."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp = tempfile.TemporaryDirectory(prefix='incremental-test-')
+        cls.addClassCleanup(cls.tmp.cleanup)
+        cls.model_dir = Path(cls.tmp.name) / 'ML_Files'
+        training.train(params={'n_estimators': 30}, n_jobs=1, output_dir=cls.model_dir, use_cache=False)
+        cls.sales = pd.read_csv(utils.get_ml_files_path() / 'House_Price_India.csv', nrows=2000)
+
+    def merge(self, batches, size, seed):
+        holdout, seen = None, 0
+        for X, y in batches:
+            with mock.patch.object(training, 'HOLDOUT_ROWS', size):
+                X_ref, y_ref, seen = incremental_training.merge_holdout(holdout, seen, X, y, seed)
+            holdout = (X_ref, y_ref)
+        return holdout, seen
+
+    def test_merge_holdout_fills_then_caps_and_counts_seen_rows(self):
+        ids = np.arange(140, dtype=np.float64)
+        batches = [(ids[:60, None], ids[:60]), (ids[60:, None], ids[60:])]
+        (X, y), seen = self.merge(batches, 100, seed=1)
+        self.assertEqual((len(y), seen), (100, 140))
+        self.assertEqual(len(set(y)), 100)
+        np.testing.assert_array_equal(X[:, 0], y)
+        self.assertTrue(set(y) <= set(ids))
+
+    def test_merge_holdout_is_a_uniform_sample_of_every_row_seen(self):
+        ids = np.arange(200, dtype=np.float64)
+        batches = [(ids[:50, None], ids[:50]), (ids[50:, None], ids[50:])]
+        first_batch = [np.sum(self.merge(batches, 50, seed)[0][1] < 50) for seed in range(400)]
+        # Each of the 200 rows is kept with probability 50/200.
+        self.assertAlmostEqual(np.mean(first_batch) / 50, 0.25, delta=0.02)
+
+    def update(self, frame, model_dir=None, **options):
+        output_dir = Path(tempfile.mkdtemp(dir=self.tmp.name))
+        return incremental_training.incremental_update(
+            frame, rounds=5, n_jobs=1, model_dir=model_dir or self.model_dir, output_dir=output_dir, **options,
+        )
+
+    def test_update_is_published_when_it_does_not_regress(self):
+        report = self.update(self.sales, max_regression=10)
+        self.assertTrue(report['passed'] and report['published'])
+        self.assertEqual(set(report['checks']), {'new_rows', 'reference'})
+        with np.load(Path(report['output_dir']) / 'model_holdout.npz') as stored:
+            served = incremental_training.load_served(self.model_dir)
+            self.assertEqual(int(stored['seen']), served['holdout_seen'] + report['holdout_rows'])
+
+    def test_regression_blocks_publishing_unless_forced(self):
+        report = self.update(self.sales, max_regression=-1)
+        self.assertFalse(report['passed'] or report['published'])
+        self.assertTrue(self.update(self.sales, max_regression=-1, force=True)['published'])
+
+    def test_too_few_holdout_rows_never_pass(self):
+        bare = Path(tempfile.mkdtemp(dir=self.tmp.name))
+        for path in self.model_dir.iterdir():
+            if path.name != 'model_holdout.npz':
+                (bare / path.name).write_bytes(path.read_bytes())
+        report = self.update(self.sales[:20], model_dir=bare, max_regression=10)
+        self.assertLess(report['holdout_rows'], incremental_training.MIN_CHECK_ROWS)
+        self.assertFalse(report['enough_rows'] or report['passed'] or report['published'])
+        empty = self.update(self.sales[:3], model_dir=bare, max_regression=10, holdout_fraction=0.01)
+        self.assertEqual((empty['checks'], empty['passed']), ({}, False))
+
+    def test_holdout_fraction_must_be_a_proper_fraction(self):
+        for fraction in (0, 1, 1.5):
+            with self.subTest(fraction=fraction), self.assertRaises(ValueError):
+                self.update(self.sales, holdout_fraction=fraction)
@@ -0,0 +1,209 @@
+"""
+CPU thread budget for native inference threads (XGBoost's OpenMP pool and
+BLAS), so that several gunicorn workers on one box don't each start a
+thread per core on every model call.
+
+Each process works out its budget once (again after a fork):
+
+    cpus               CPUs this process may run on (affinity), capped by
+                       the cgroup CPU quota (containers, systemd CPUQuota)
+    web_workers        THREAD_BUDGET_WEB_WORKERS, else WEB_CONCURRENCY
+                       (what start.sh passes to gunicorn --workers), else 1
+    inference_threads  THREAD_BUDGET_INFERENCE_THREADS if set; otherwise
+                       cpus / web_workers in a web worker, and all cpus in
+                       the model server, which does every worker's inference
+
+BLAS is capped at inference_threads for the whole process. Model calls go
+through inference_threads(rows): a call gets one thread per
+THREAD_BUDGET_ROWS_PER_THREAD rows, so a single-row prediction runs
+single-threaded and a large batch gets the full budget, never more than
+the budget still free in the process (request threads share it). The limit
+is applied to the calling thread's OpenMP pool with threadpoolctl, and
+XGBoost models are set to use whatever OpenMP allows (nthread -1) when
+they are loaded. Without threadpoolctl, calls still count against the
+budget but native thread pools are left alone.
+
+/metrics exports the budget per process (thread_budget) and the threads
+granted per model call (model_inference_threads).
+"""
+
+import logging
+import math
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+from . import metrics
+
+try:
+    from threadpoolctl import ThreadpoolController
+except ImportError:
+    ThreadpoolController = None
+
+logger = logging.getLogger(__name__)
+
+_CGROUP_V2 = Path('/sys/fs/cgroup/cpu.max')
+_CGROUP_V1 = Path('/sys/fs/cgroup/cpu')
+
+
+def cgroup_cpu_limit():
+    """CPUs allowed by the cgroup quota (may be fractional), or None when unlimited."""
+    try:
+        quota, period = _CGROUP_V2.read_text().split()[:2]
+        if quota != 'max':
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        quota = int((_CGROUP_V1 / 'cpu.cfs_quota_us').read_text())
+        period = int((_CGROUP_V1 / 'cpu.cfs_period_us').read_text())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def online_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def available_cpus():
+    """Whole CPUs this process can use: affinity, capped by the cgroup quota (at least 1)."""
+    cpus = online_cpus()
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        # Round down: a thread per fractional CPU would just be throttled.
+        cpus = min(cpus, int(limit))
+    return max(1, cpus)
+
+
+def web_workers():
+    configured = getattr(settings, 'THREAD_BUDGET_WEB_WORKERS', 0) or os.environ.get('WEB_CONCURRENCY') or 1
+    try:
+        return max(1, int(configured))
+    except ValueError:
+        return 1
+
+
+class ThreadBudget:
+    """One process's budget and the share of it in use by running model calls."""
+
+    def __init__(self, role, cpus, workers, inference_threads):
+        self.role = role
+        self.cpus = cpus
+        self.web_workers = workers
+        self.inference_threads = inference_threads
+        self.in_use = 0
+        self._lock = threading.Lock()
+
+    def threads_for(self, rows):
+        per_thread = max(1, int(getattr(settings, 'THREAD_BUDGET_ROWS_PER_THREAD', 256)))
+        return max(1, min(self.inference_threads, math.ceil(rows / per_thread)))
+
+    def acquire(self, wanted):
+        """Threads for one call: what it wants, as far as the budget has them free (always at least 1)."""
+        with self._lock:
+            granted = max(1, min(wanted, self.inference_threads - self.in_use))
+            self.in_use += granted
+        return granted
+
+    def release(self, granted):
+        with self._lock:
+            self.in_use -= granted
+
+
+_state = {'pid': None, 'role': 'web', 'budget': None, 'controller': None}
+_state_lock = threading.Lock()
+
+
+def _controller():
+    # Built on the first model call, once XGBoost (and its OpenMP runtime) is loaded.
+    if ThreadpoolController is None:
+        return None
+    if _state['controller'] is None:
+        _state['controller'] = ThreadpoolController()
+    return _state['controller']
+
+
+def configure(role=None):
+    """
+    Work out this process's budget now, cap BLAS and publish it; returns
+    the budget. role is 'web' (the default) or 'model_server'.
+    """
+    role = role or _state['role']
+    cpus = available_cpus()
+    workers = web_workers()
+    configured = int(getattr(settings, 'THREAD_BUDGET_INFERENCE_THREADS', 0) or 0)
+    if configured > 0:
+        threads = configured
+    elif role == 'model_server':
+        threads = cpus
+    else:
+        threads = max(1, cpus // workers)
+    budget = ThreadBudget(role, cpus, workers, threads)
+    with _state_lock:
+        _state.update(budget=budget, pid=os.getpid(), role=role, controller=None)
+
+    if enabled() and ThreadpoolController is not None:
+        ThreadpoolController().limit(limits=threads, user_api='blas')
+    pid = str(os.getpid())
+    limit = cgroup_cpu_limit()
+    # A forked worker starts with its parent's values; only its own belong in its snapshot.
+    metrics.THREAD_BUDGET.clear()
+    for kind, value in (('online_cpus', online_cpus()), ('cgroup_cpus', limit or 0), ('cpus', cpus),
+                        ('web_workers', workers), ('inference_threads', threads)):
+        metrics.THREAD_BUDGET.set(value, pid, role, kind)
+    logger.info(f"Thread budget ({role}): {threads} inference threads of {cpus} CPUs for {workers} web workers")
+    return budget
+
+
+def enabled():
+    return bool(getattr(settings, 'THREAD_BUDGET_ENABLED', True))
+
+
+def get_budget():
+    budget = _state['budget']
+    if budget is None or _state['pid'] != os.getpid():
+        # Per process: a budget (and BLAS limit) set before gunicorn forked is redone in the worker.
+        budget = configure()
+    return budget
+
+
+def release_model_threads(model):
+    """Let an XGBoost model use as many threads as OpenMP allows the calling thread (see inference_threads)."""
+    if not enabled() or not hasattr(model, 'get_booster'):
+        return
+    try:
+        model.get_booster().set_param({'nthread': -1})
+        if hasattr(model, 'n_jobs'):
+            model.n_jobs = None
+    except Exception as e:
+        logger.warning(f"Could not reset the model's thread count: {str(e)}")
+
+
+@contextmanager
+def inference_threads(rows, kind):
+    """Run a model call over rows inputs within the budget; yields the threads granted."""
+    if not enabled():
+        yield None
+        return
+    budget = get_budget()
+    granted = budget.acquire(budget.threads_for(rows))
+    metrics.INFERENCE_THREADS.observe(granted, kind)
+    try:
+        controller = _controller()
+        if controller is None:
+            yield granted
+        else:
+            with controller.limit(limits=granted, user_api='openmp'):
+                yield granted
+    finally:
+        budget.release(granted)
@@ -0,0 +1,539 @@
+"""
+Headless version of the training pipeline in
+ML_Files/House Price Prediction Final.ipynb.
+
+Steps match the notebook: LabelEncoders for property_type and city, the
+engineered ratio/interaction features, IQR capping of every numeric
+non-target column, an 80/20 split with random_state=42, an XGBRegressor on
+the log1p target, and pickled artifacts in ML_Files. Only the columns the
+final model uses are capped and kept; capping is per column, so the result
+is identical.
+
+The preprocessed feature matrix is cached per dataset hash, so retraining
+on unchanged data skips straight to fitting. search() tunes the model in a
+process pool and picks by validation error under a serving latency budget.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import mean_absolute_error, mean_absolute_percentage_error, r2_score
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
+
+from .dataset import load_dataset
+from .utils import PREDICTION_TIERS, TIER_FRACTIONS, get_ml_files_path, model_rounds
+
+logger = logging.getLogger(__name__)
+
+TARGET_COL = 'Price'
+FINAL_FEATURES = [
+    'living area',
+    'lot area',
+    'number of bedrooms',
+    'number of bathrooms',
+    'floor',
+    'property_type_encoded',
+    'Lattitude',
+    'Longitude',
+    'lat_x_lon',
+    'Living_vs_Lot_Ratio',
+    'area_per_bedroom',
+    'lot_per_living',
+    'bedrooms_x_bathrooms',
+]
+DEFAULT_PARAMS = {
+    'n_estimators': 500,
+    'max_depth': 8,
+    'learning_rate': 0.05,
+    'subsample': 0.8,
+    'colsample_bytree': 0.8,
+    'min_child_weight': 5,
+    'reg_lambda': 1.0,
+    'random_state': 42,
+}
+TEST_SIZE = 0.2
+SPLIT_SEED = 42
+# Bump when preprocessing changes so stale feature caches are ignored.
+_PREPROCESS_VERSION = 2
+# Test rows saved next to the model as the reference set for later
+# incremental updates (incremental_training.py).
+HOLDOUT_ROWS = 5000
+
+
+class StageTimer:
+    """Wall time per named pipeline stage, in insertion order."""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    @property
+    def total(self):
+        return sum(self.stages.values())
+
+
+def iqr_bounds(values):
+    """[Q1 - 1.5·IQR, Q3 + 1.5·IQR], the range the notebook's cap_iqr clips to."""
+    q1, q3 = np.quantile(values, [0.25, 0.75])
+    iqr = q3 - q1
+    return float(q1 - 1.5 * iqr), float(q3 + 1.5 * iqr)
+
+
+def cap_iqr(values):
+    return np.clip(values, *iqr_bounds(values))
+
+
+def engineer_features(columns):
+    """
+    Add the engineered features to a dict of column arrays (raw inputs plus
+    property_type_encoded). Mirrors predict_house_price, vectorised.
+    """
+    bedrooms = columns['number of bedrooms'].astype(np.float64)
+    bathrooms = columns['number of bathrooms'].astype(np.float64)
+    living = columns['living area'].astype(np.float64)
+    lot = columns['lot area'].astype(np.float64)
+    columns['bedrooms_x_bathrooms'] = bedrooms * bathrooms
+    columns['Living_vs_Lot_Ratio'] = living / np.where(lot == 0, 1, lot)
+    columns['area_per_bedroom'] = living / (bedrooms + 1)
+    columns['lot_per_living'] = lot / (living + 1)
+    columns['lat_x_lon'] = columns['Lattitude'].astype(np.float64) * columns['Longitude'].astype(np.float64)
+    return columns
+
+
+def _fit_label_encoder(dataset, name):
+    """LabelEncoder fitted on a dictionary-encoded column, plus encoded values."""
+    categories = dataset.categories(name)
+    encoder = LabelEncoder()
+    encoder.fit(categories)
+    # LabelEncoder sorts its classes; the dataset's categories are sorted too,
+    # but map through the encoder so this never silently depends on that.
+    lookup = encoder.transform(categories)
+    return encoder, lookup[np.asarray(dataset.column(name))]
+
+
+def preprocess(dataset):
+    """
+    Feature matrix, target and encoders from the columnar dataset.
+    Returns dict(X, y, features, capping_bounds, property_type_encoder,
+    city_encoder).
+    """
+    columns = {
+        name: np.asarray(dataset.column(name))
+        for name in ('number of bedrooms', 'number of bathrooms', 'living area', 'lot area',
+                     'floor', 'Lattitude', 'Longitude')
+    }
+    property_type_encoder, columns['property_type_encoded'] = _fit_label_encoder(dataset, 'property_type')
+    city_encoder = None
+    if 'city' in dataset.columns:
+        city_encoder, _ = _fit_label_encoder(dataset, 'city')
+    engineer_features(columns)
+    bounds = {f: iqr_bounds(columns[f].astype(np.float64)) for f in FINAL_FEATURES}
+    X = np.column_stack([np.clip(columns[f].astype(np.float64), *bounds[f]) for f in FINAL_FEATURES])
+    y = np.asarray(dataset.column(TARGET_COL), dtype=np.float64)
+    return {
+        'X': X,
+        'y': y,
+        'features': list(FINAL_FEATURES),
+        'capping_bounds': bounds,
+        'property_type_encoder': property_type_encoder,
+        'city_encoder': city_encoder,
+    }
+
+
+def _feature_cache_path(dataset):
+    key = hashlib.sha1(f"{dataset.sha1}:{_PREPROCESS_VERSION}".encode()).hexdigest()[:16]
+    return get_ml_files_path() / 'training_cache' / f'features_{key}.pkl'
+
+
+def load_or_preprocess(dataset, use_cache=True):
+    """Preprocessed features for dataset, from the on-disk cache when possible."""
+    path = _feature_cache_path(dataset)
+    if use_cache:
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f), True
+        except (FileNotFoundError, pickle.UnpicklingError, EOFError):
+            pass
+    prepared = preprocess(dataset)
+    if use_cache:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_pickle(prepared, path)
+    return prepared, False
+
+
+def split(prepared):
+    """
+    The notebook's 80/20 split (random_state=42). X parts are DataFrames so
+    the booster records feature names, as predict_house_price passes them.
+    """
+    X = pd.DataFrame(prepared['X'], columns=prepared['features'], copy=False)
+    return train_test_split(X, prepared['y'], test_size=TEST_SIZE, random_state=SPLIT_SEED)
+
+
+def build_model(params=None, n_jobs=None):
+    settings = dict(DEFAULT_PARAMS, **(params or {}))
+    settings.setdefault('tree_method', 'hist')
+    return xgb.XGBRegressor(n_jobs=n_jobs or os.cpu_count() or 1, **settings)
+
+
+def evaluate(model, X_test, y_test, log_target=True):
+    """MAE, MAPE (%) and R² on the original price scale."""
+    pred = model.predict(X_test)
+    if log_target:
+        pred = np.expm1(pred)
+    return {
+        'mae': float(mean_absolute_error(y_test, pred)),
+        'mape': float(mean_absolute_percentage_error(y_test, pred) * 100),
+        'r2': float(r2_score(y_test, pred)),
+    }
+
+
+def measure_tiers(model, X, y, log_target=True):
+    """
+    Error on (X, y) and single-row latency of each prediction tier, i.e. of
+    predicting with only the first TIER_FRACTIONS share of boosting rounds.
+    """
+    full = model_rounds(model)
+    tiers = {}
+    for name in PREDICTION_TIERS:
+        rounds = max(1, int(round(full * TIER_FRACTIONS[name])))
+        pred = model.predict(X, iteration_range=(0, rounds))
+        if log_target:
+            pred = np.expm1(pred)
+        tiers[name] = {
+            'rounds': rounds,
+            'mae': float(mean_absolute_error(y, pred)),
+            'mape': float(mean_absolute_percentage_error(y, pred) * 100),
+            'r2': float(r2_score(y, pred)),
+        }
+        tiers[name].update(measure_latency(model, X, iteration_range=(0, rounds)))
+    return tiers
+
+
+def _atomic_pickle(obj, path):
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, 'wb') as f:
+        pickle.dump(obj, f)
+    os.replace(tmp, path)
+
+
+def model_version(model):
+    """Short content hash of the booster, recorded in model_config.pkl."""
+    raw = model.get_booster().save_raw(raw_format='ubj')
+    return hashlib.sha1(raw).hexdigest()[:12]
+
+
+def save_holdout(X, y, path, seen=None):
+    """
+    Keep at most HOLDOUT_ROWS rows of (X, y) as the reference set for
+    updates, with seen: how many held-back rows they are a uniform sample
+    of (default: the rows given), for incremental_training's reservoir.
+    """
+    X, y = np.asarray(X, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    seen = len(y) if seen is None else seen
+    if len(y) > HOLDOUT_ROWS:
+        keep = np.random.default_rng(SPLIT_SEED).choice(len(y), HOLDOUT_ROWS, replace=False)
+        X, y = X[keep], y[keep]
+    tmp = f"{path}.tmp{os.getpid()}.npz"
+    np.savez(tmp, X=X, y=y, seen=np.int64(seen))
+    os.replace(tmp, path)
+
+
+def save_artifacts(model, prepared, output_dir, log_target=True, extra_config=None, holdout=None,
+                   holdout_seen=None):
+    """
+    Write the artifact set load_model_artifacts() reads, plus the optional
+    (X, y) holdout reference set as model_holdout.npz (see save_holdout).
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    config = {
+        'log_target': log_target,
+        'model_type': 'xgboost',
+        'model_version': model_version(model),
+        'trained_at': time.time(),
+    }
+    if prepared.get('capping_bounds'):
+        config['capping_bounds'] = {f: list(b) for f, b in prepared['capping_bounds'].items()}
+    config.update(extra_config or {})
+    if holdout is not None:
+        save_holdout(*holdout, output_dir / 'model_holdout.npz', seen=holdout_seen)
+    _atomic_pickle(model, output_dir / 'best_house_price_model.pkl')
+    _atomic_pickle(prepared['features'], output_dir / 'model_features.pkl')
+    if prepared['property_type_encoder'] is not None:
+        _atomic_pickle(prepared['property_type_encoder'], output_dir / 'property_type_encoder.pkl')
+    if prepared['city_encoder'] is not None:
+        _atomic_pickle(prepared['city_encoder'], output_dir / 'city_encoder.pkl')
+    # Last: running processes reload the artifacts when this file changes.
+    _atomic_pickle(config, output_dir / 'model_config.pkl')
+
+
+def train(params=None, n_jobs=None, output_dir=None, use_cache=True, save=True):
+    """
+    Run the full pipeline. Returns a report with per-stage wall time,
+    test-set metrics and where the artifacts went.
+    """
+    timer = StageTimer()
+    with timer.stage('load_dataset'):
+        dataset = load_dataset()
+    with timer.stage('preprocess'):
+        prepared, cached = load_or_preprocess(dataset, use_cache=use_cache)
+    with timer.stage('split'):
+        X_train, X_test, y_train, y_test = split(prepared)
+    model = build_model(params, n_jobs)
+    with timer.stage('fit'):
+        model.fit(X_train, np.log1p(y_train))
+    with timer.stage('evaluate'):
+        metrics = evaluate(model, X_test, y_test)
+    with timer.stage('tiers'):
+        tiers = measure_tiers(model, X_test, y_test)
+    output_dir = output_dir or get_ml_files_path()
+    if save:
+        with timer.stage('save'):
+            save_artifacts(model, prepared, output_dir, extra_config={
+                'dataset_sha1': dataset.sha1,
+                'metrics': metrics,
+                'prediction_tiers': tiers,
+            }, holdout=(X_test, y_test))
+    return {
+        'rows': len(dataset),
+        'train_rows': len(y_train),
+        'test_rows': len(y_test),
+        'feature_cache_hit': cached,
+        'params': model.get_params(),
+        'metrics': metrics,
+        'tiers': tiers,
+        'stages': timer.stages,
+        'total_sec': timer.total,
+        'output_dir': str(output_dir) if save else None,
+        'model': model,
+    }
+
+
+# Hyperparameter search ---------------------------------------------------
+
+SEARCH_SPACE = {
+    'max_depth': [4, 5, 6, 7, 8, 10],
+    'learning_rate': [0.03, 0.05, 0.08, 0.12],
+    'min_child_weight': [1, 3, 5, 10],
+    'subsample': [0.7, 0.8, 0.9, 1.0],
+    'colsample_bytree': [0.6, 0.8, 1.0],
+    'reg_lambda': [0.5, 1.0, 3.0],
+}
+SEARCH_MAX_ESTIMATORS = 2000
+EARLY_STOPPING_ROUNDS = 50
+VALIDATION_SIZE = 0.15
+_LATENCY_REPEATS = 50
+_LATENCY_BATCH_ROWS = 1000
+
+_worker_data = {}
+
+
+class _DeadlineCallback(xgb.callback.TrainingCallback):
+    """Stop boosting once the search's wall-clock deadline has passed."""
+
+    def __init__(self, deadline):
+        super().__init__()
+        self.deadline = deadline
+        self.hit = False
+
+    def after_iteration(self, model, epoch, evals_log):
+        self.hit = time.time() >= self.deadline
+        return self.hit
+
+
+def sample_candidates(count, seed=SPLIT_SEED):
+    """The notebook configuration first, then distinct random draws from SEARCH_SPACE."""
+    rng = np.random.default_rng(seed)
+    base = {key: DEFAULT_PARAMS[key] for key in SEARCH_SPACE}
+    candidates = [base]
+    seen = {tuple(sorted(base.items()))}
+    space_size = 1
+    for values in SEARCH_SPACE.values():
+        space_size *= len(values)
+    while len(candidates) < min(count, space_size):
+        candidate = {key: values[rng.integers(len(values))] for key, values in SEARCH_SPACE.items()}
+        key = tuple(sorted(candidate.items()))
+        if key not in seen:
+            seen.add(key)
+            candidates.append(candidate)
+    return candidates
+
+
+def _init_search_worker(X_fit, y_fit, X_val, y_val):
+    _worker_data.update(X_fit=X_fit, y_fit=y_fit, X_val=X_val, y_val=y_val)
+
+
+def _fit_candidate(index, params, deadline, n_jobs):
+    """
+    Fit one candidate on the log1p target with early stopping on the
+    validation split. Runs in a pool worker; candidates that only get to
+    start after the deadline are skipped.
+    """
+    result = {'index': index, 'params': params}
+    if time.time() >= deadline:
+        result['status'] = 'skipped'
+        return result
+    data = _worker_data
+    stop = _DeadlineCallback(deadline)
+    model = build_model(dict(
+        params,
+        n_estimators=SEARCH_MAX_ESTIMATORS,
+        early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+        eval_metric='mae',
+        callbacks=[stop],
+    ), n_jobs)
+    start = time.perf_counter()
+    model.fit(data['X_fit'], data['y_fit'], eval_set=[(data['X_val'], data['y_val'])], verbose=False)
+    result['fit_sec'] = time.perf_counter() - start
+    # Training-only settings are dropped so the pickled model is a plain
+    # regressor; predict() keeps using best_iteration from the booster.
+    model.set_params(early_stopping_rounds=None, callbacks=None, eval_metric=None)
+    pred = model.predict(data['X_val'])
+    result.update(
+        status='truncated' if stop.hit else 'ok',
+        best_iteration=int(model.best_iteration),
+        mae=float(mean_absolute_error(data['y_val'], pred)),
+        mape=float(mean_absolute_percentage_error(data['y_val'], pred) * 100),
+        model=model,
+    )
+    return result
+
+
+def measure_latency(model, X, repeats=_LATENCY_REPEATS, iteration_range=None):
+    """
+    Median wall time of single-row predict() calls, as the web views make
+    them, plus the amortised per-row cost of one batched call.
+    """
+    kwargs = {'iteration_range': iteration_range} if iteration_range else {}
+    rows = [X.iloc[[i % len(X)]] for i in range(repeats)]
+    model.predict(rows[0], **kwargs)
+    samples = []
+    for row in rows:
+        start = time.perf_counter()
+        model.predict(row, **kwargs)
+        samples.append(time.perf_counter() - start)
+    batch = X.iloc[:_LATENCY_BATCH_ROWS]
+    start = time.perf_counter()
+    model.predict(batch, **kwargs)
+    batch_sec = time.perf_counter() - start
+    return {
+        'latency_ms': float(np.median(samples) * 1000),
+        'batch_us_per_row': batch_sec / len(batch) * 1e6,
+    }
+
+
+def select_candidate(results, latency_budget_ms=None):
+    """
+    Lowest validation MAE among candidates within the latency budget. When
+    none fits, the fastest candidate is returned and within_budget is False.
+    """
+    fitted = [r for r in results if r['status'] in ('ok', 'truncated')]
+    if not fitted:
+        return None, False
+    within = [r for r in fitted if latency_budget_ms is None or r['latency_ms'] <= latency_budget_ms]
+    if within:
+        return min(within, key=lambda r: r['mae']), True
+    return min(fitted, key=lambda r: r['latency_ms']), False
+
+
+def search(candidates=24, budget_sec=600, latency_budget_ms=None, workers=None, seed=SPLIT_SEED,
+           output_dir=None, use_cache=True, save=True):
+    """
+    Evaluate sampled XGBRegressor configurations in a process pool within a
+    wall-clock budget, then keep the most accurate one that meets the
+    latency budget. The held-out test split is only used for the final
+    report, never for selection.
+    """
+    timer = StageTimer()
+    deadline = time.time() + budget_sec
+    with timer.stage('load_dataset'):
+        dataset = load_dataset()
+    with timer.stage('preprocess'):
+        prepared, cached = load_or_preprocess(dataset, use_cache=use_cache)
+    with timer.stage('split'):
+        X_train, X_test, y_train, y_test = split(prepared)
+        X_fit, X_val, y_fit, y_val = train_test_split(
+            X_train, y_train, test_size=VALIDATION_SIZE, random_state=SPLIT_SEED,
+        )
+
+    configs = sample_candidates(candidates, seed)
+    cpus = os.cpu_count() or 1
+    workers = max(1, min(workers or cpus, len(configs)))
+    n_jobs = max(1, cpus // workers)
+    results = []
+    with timer.stage('search'):
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_search_worker,
+            initargs=(X_fit, np.log1p(y_fit), X_val, np.log1p(y_val)),
+        ) as pool:
+            futures = [pool.submit(_fit_candidate, i, params, deadline, n_jobs) for i, params in enumerate(configs)]
+            for future in as_completed(futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    logger.warning(f"Search candidate failed: {str(e)}")
+    results.sort(key=lambda r: r['index'])
+
+    with timer.stage('latency'):
+        for result in results:
+            if 'model' in result:
+                result.update(measure_latency(result['model'], X_test))
+
+    best, within_budget = select_candidate(results, latency_budget_ms)
+    if best is None:
+        raise RuntimeError("No search candidate finished within the time budget")
+    model = best['model']
+    with timer.stage('evaluate'):
+        metrics = evaluate(model, X_test, y_test)
+    with timer.stage('tiers'):
+        tiers = measure_tiers(model, X_test, y_test)
+    output_dir = output_dir or get_ml_files_path()
+    if save:
+        with timer.stage('save'):
+            save_artifacts(model, prepared, output_dir, extra_config={
+                'dataset_sha1': dataset.sha1,
+                'metrics': metrics,
+                'prediction_tiers': tiers,
+                'search': {
+                    'params': best['params'],
+                    'best_iteration': best['best_iteration'],
+                    'latency_ms': best['latency_ms'],
+                    'latency_budget_ms': latency_budget_ms,
+                },
+            }, holdout=(X_test, y_test))
+    return {
+        'rows': len(dataset),
+        'train_rows': len(y_fit),
+        'validation_rows': len(y_val),
+        'test_rows': len(y_test),
+        'feature_cache_hit': cached,
+        'workers': workers,
+        'n_jobs_per_worker': n_jobs,
+        'candidates': [{k: v for k, v in r.items() if k != 'model'} for r in results],
+        'selected': best['index'],
+        'within_latency_budget': within_budget,
+        'latency_budget_ms': latency_budget_ms,
+        'metrics': metrics,
+        'tiers': tiers,
+        'stages': timer.stages,
+        'total_sec': timer.total,
+        'output_dir': str(output_dir) if save else None,
+        'model': model,
+    }
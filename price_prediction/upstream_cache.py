@@ -0,0 +1,339 @@
+"""
+Persistent cache tier for upstream responses (Overpass/Photon amenities,
+Nominatim geocoding, Google Distance Matrix).
+
+A SQLite file in WAL mode sits under the per-process in-memory caches so a
+deploy or gunicorn worker recycle does not start cold. Writes are queued and
+committed in batches by a background thread, which also compacts expired
+rows; at exit the queue is drained so a worker recycle doesn't lose the
+last second of writes and hit counts. At startup each namespace bulk-loads its most-used keys into memory.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS upstream_cache (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS upstream_cache_hot ON upstream_cache (namespace, hits DESC);
+CREATE INDEX IF NOT EXISTS upstream_cache_expiry ON upstream_cache (expires_at);
+"""
+
+_DEFAULT_TTLS = {
+    "amenities": 6 * 3600,
+    "amenity_buckets": 24 * 3600,
+    "reverse_geocode": 7 * 24 * 3600,
+    "location_search": 24 * 3600,
+    "distance": 3600,
+}
+_WRITE_BATCH = 200
+_FLUSH_INTERVAL_SEC = 1.0
+_COMPACT_INTERVAL_SEC = 600
+
+
+class PersistentStore:
+    """SQLite-backed namespaced key/value store with TTLs and hit counts."""
+
+    def __init__(self, path, ttls=None):
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.ttls = dict(_DEFAULT_TTLS, **(ttls or {}))
+        self._local = threading.local()
+        self._writes = queue.Queue()
+        self._hits = {}
+        self._hits_lock = threading.Lock()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._last_compact = time.monotonic()
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=2.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _ensure_writer(self):
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                if self._writer is None:
+                    atexit.register(self.drain)
+                self._writer = threading.Thread(
+                    target=self._write_loop, name="upstream-cache-writer", daemon=True
+                )
+                self._writer.start()
+
+    def ttl(self, namespace):
+        return self.ttls.get(namespace, 3600)
+
+    def get(self, namespace, key):
+        """(value, expires_at) for key, or None when missing or expired."""
+        try:
+            row = self._conn().execute(
+                "SELECT value, expires_at FROM upstream_cache WHERE namespace=? AND key=?",
+                (namespace, key),
+            ).fetchone()
+        except sqlite3.Error as exc:
+            logger.warning(f"Upstream cache read failed: {exc}")
+            return None
+        if row is None or row[1] < time.time():
+            return None
+        self.note_hit(namespace, key)
+        return json.loads(row[0]), row[1]
+
+    def contains(self, namespace, key):
+        """Whether a live entry exists; unlike get it is not counted as a read."""
+        try:
+            row = self._conn().execute(
+                "SELECT 1 FROM upstream_cache WHERE namespace=? AND key=? AND expires_at>=?",
+                (namespace, key, time.time()),
+            ).fetchone()
+        except sqlite3.Error as exc:
+            logger.warning(f"Upstream cache read failed: {exc}")
+            return False
+        return row is not None
+
+    def note_hit(self, namespace, key):
+        """Count a read; counts are folded into the table with the next write batch."""
+        with self._hits_lock:
+            self._hits[(namespace, key)] = self._hits.get((namespace, key), 0) + 1
+        self._ensure_writer()
+
+    def set(self, namespace, key, value, ttl=None):
+        """Queue a write; the background writer commits it with the next batch."""
+        expires_at = time.time() + (ttl if ttl is not None else self.ttl(namespace))
+        self._writes.put((namespace, key, json.dumps(value, separators=(",", ":")), expires_at))
+        self._ensure_writer()
+        return expires_at
+
+    def hottest(self, namespace, limit):
+        """Most-read live entries of a namespace: [(key, value, expires_at), ...]."""
+        try:
+            rows = self._conn().execute(
+                "SELECT key, value, expires_at FROM upstream_cache "
+                "WHERE namespace=? AND expires_at>? ORDER BY hits DESC LIMIT ?",
+                (namespace, time.time(), limit),
+            ).fetchall()
+        except sqlite3.Error as exc:
+            logger.warning(f"Upstream cache warm-load failed: {exc}")
+            return []
+        return [(key, json.loads(value), expires_at) for key, value, expires_at in rows]
+
+    def compact(self):
+        """Drop expired rows and fold the WAL back into the main file."""
+        conn = self._conn()
+        conn.execute("DELETE FROM upstream_cache WHERE expires_at<?", (time.time(),))
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def _flush(self, batch):
+        with self._hits_lock:
+            hits, self._hits = self._hits, {}
+        if not batch and not hits:
+            return
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                "INSERT INTO upstream_cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(namespace, key) DO UPDATE SET "
+                "value=excluded.value, expires_at=excluded.expires_at",
+                batch,
+            )
+            conn.executemany(
+                "UPDATE upstream_cache SET hits=hits+? WHERE namespace=? AND key=?",
+                [(count, ns, key) for (ns, key), count in hits.items()],
+            )
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+
+    def drain(self, timeout=5.0):
+        """Commit every queued write and hit count now (run at exit)."""
+        if self._writer is not None and self._writer.is_alive():
+            # Queued behind everything written so far, including a batch the
+            # writer has already taken off the queue; it is set once flushed.
+            done = threading.Event()
+            self._writes.put(done)
+            done.wait(timeout)
+            return
+        if self._writes.empty() and not self._hits:
+            return
+        batch = []
+        while True:
+            try:
+                item = self._writes.get_nowait()
+            except queue.Empty:
+                break
+            if not isinstance(item, threading.Event):
+                batch.append(item)
+        try:
+            self._flush(batch)
+        except sqlite3.Error as exc:
+            logger.warning(f"Upstream cache write failed: {exc}")
+
+    def _write_loop(self):
+        while True:
+            batch, drained = [], None
+            try:
+                item = self._writes.get(timeout=_FLUSH_INTERVAL_SEC)
+                while True:
+                    if isinstance(item, threading.Event):
+                        drained = item
+                        break
+                    batch.append(item)
+                    if len(batch) >= _WRITE_BATCH:
+                        break
+                    item = self._writes.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self._flush(batch)
+                if time.monotonic() - self._last_compact > _COMPACT_INTERVAL_SEC:
+                    self._last_compact = time.monotonic()
+                    self.compact()
+            except sqlite3.Error as exc:
+                logger.warning(f"Upstream cache write failed: {exc}")
+            if drained is not None:
+                drained.set()
+
+
+class TieredCache:
+    """
+    In-memory TTL cache for one namespace, backed by the persistent store.
+    Keys are tuples/strings; values must be JSON-serialisable.
+    """
+
+    def __init__(self, namespace, memory_ttl_sec, max_entries=200, store=None):
+        self.namespace = namespace
+        self.memory_ttl_sec = memory_ttl_sec
+        self.max_entries = max_entries
+        self.store = store
+        self._data = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _disk_key(key):
+        return json.dumps(key, separators=(",", ":"))
+
+    def _put_memory(self, key, value, expires_at):
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            if len(self._data) > self.max_entries:
+                oldest = sorted(self._data.items(), key=lambda kv: kv[1][1])[: self.max_entries // 4]
+                for old_key, _ in oldest:
+                    self._data.pop(old_key, None)
+
+    def get(self, key):
+        value = self._get(key)
+        metrics.cache_lookup(self.namespace, value is not None)
+        return value
+
+    def peek(self, key):
+        """
+        Whether key is cached, without counting a lookup or a hit, so
+        speculative checks (prefetch) don't skew metrics or warm-load order.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry and entry[1] >= time.time():
+                return True
+        return self.store is not None and self.store.contains(self.namespace, self._disk_key(key))
+
+    def _get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry:
+                value, expires_at = entry
+                if expires_at >= now:
+                    if self.store is not None:
+                        self.store.note_hit(self.namespace, self._disk_key(key))
+                    return value
+                self._data.pop(key, None)
+        if self.store is None:
+            return None
+        found = self.store.get(self.namespace, self._disk_key(key))
+        if found is None:
+            return None
+        value, disk_expires_at = found
+        self._put_memory(key, value, min(disk_expires_at, now + self.memory_ttl_sec))
+        return value
+
+    def set(self, key, value):
+        now = time.time()
+        self._put_memory(key, value, now + self.memory_ttl_sec)
+        if self.store is not None:
+            self.store.set(self.namespace, self._disk_key(key), value)
+
+    def warm(self, limit):
+        """Bulk-load the namespace's most-used persistent entries into memory."""
+        if self.store is None:
+            return 0
+        rows = self.store.hottest(self.namespace, limit)
+        now = time.time()
+        for disk_key, value, expires_at in rows:
+            key = json.loads(disk_key)
+            if isinstance(key, list):
+                key = tuple(key)
+            self._put_memory(key, value, min(expires_at, now + self.memory_ttl_sec))
+        return len(rows)
+
+    def __len__(self):
+        return len(self._data)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Process-wide persistent store, or None when disabled or unavailable."""
+    global _store
+    if not getattr(settings, 'UPSTREAM_CACHE_ENABLED', True):
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                try:
+                    _store = PersistentStore(
+                        settings.UPSTREAM_CACHE_PATH,
+                        getattr(settings, 'UPSTREAM_CACHE_TTLS', None),
+                    )
+                except sqlite3.Error as exc:
+                    logger.warning(f"Upstream cache disabled: {exc}")
+                    return None
+    return _store
+
+
+def tiered_cache(namespace, memory_ttl_sec, max_entries=200):
+    """Build a namespace cache on the shared store and warm it from disk."""
+    cache = TieredCache(namespace, memory_ttl_sec, max_entries, store=get_store())
+    warm_limit = int(getattr(settings, 'UPSTREAM_CACHE_WARM_KEYS', 100))
+    if warm_limit > 0:
+        cache.warm(min(warm_limit, max_entries))
+    return cache
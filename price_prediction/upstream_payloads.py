@@ -0,0 +1,161 @@
+"""
+Canned upstream responses (Overpass, Photon, Nominatim, Distance Matrix)
+shaped like the real providers' answers, for benchmarks and local stand-ins.
+
+Payloads are generated around the requested point from a fixed seed, so
+the same point always yields the same places and a fresh point yields a
+realistic mix: several places per amenity bucket, unnamed elements, ways
+with a center instead of coordinates, duplicates and unrelated tags.
+"""
+
+import math
+import random
+import zlib
+
+# (tags, element type, share of elements). Mirrors what the amenities query
+# brings back in a dense Indian city centre.
+_OVERPASS_KINDS = (
+    ({"amenity": "hospital"}, "way", 6),
+    ({"amenity": "clinic"}, "node", 10),
+    ({"amenity": "school"}, "way", 14),
+    ({"amenity": "bank"}, "node", 14),
+    ({"amenity": "university"}, "way", 3),
+    ({"amenity": "college"}, "way", 5),
+    ({"railway": "station", "public_transport": "station"}, "node", 3),
+    ({"railway": "halt"}, "node", 2),
+    ({"railway": "subway_entrance"}, "node", 6),
+    ({"public_transport": "station", "station": "subway"}, "node", 2),
+    ({"public_transport": "station", "subway": "yes"}, "way", 1),
+    ({"railway": "tram_stop", "public_transport": "station"}, "node", 2),
+    ({"amenity": "pharmacy"}, "node", 6),
+    ({"amenity": "cafe"}, "node", 6),
+)
+_NAMES = (
+    "City", "Central", "Sri Sai", "Apollo", "Green Park", "Lakeview", "St. Mary's",
+    "Government", "National", "Metro", "Jubilee", "Rajiv Gandhi", "Indira Nagar",
+)
+_PHOTON_LABELS = {
+    "hospital": "Hospital", "clinic": "Clinic", "school": "School", "bank": "Bank",
+    "university": "University", "college": "College", "metro": "Metro Station",
+    "subway": "Metro Station", "railway station": "Railway Station",
+    "train station": "Railway Station",
+}
+
+
+def _rng(*key):
+    # crc32 rather than hash(): string hashing is salted per process.
+    return random.Random(zlib.crc32(repr(key).encode()))
+
+
+def _offset(rng, lat_f, lng_f, radius_m):
+    distance = radius_m * math.sqrt(rng.random())
+    bearing = rng.random() * 2 * math.pi
+    dlat = distance * math.cos(bearing) / 111_000.0
+    dlng = distance * math.sin(bearing) / (111_000.0 * max(0.2, math.cos(math.radians(lat_f))))
+    return round(lat_f + dlat, 7), round(lng_f + dlng, 7)
+
+
+def overpass_payload(lat_f, lng_f, elements=160, radius_m=1500, duplicate_share=0.1):
+    """Overpass `out center` JSON with about `elements` elements around the point."""
+    rng = _rng("overpass", round(lat_f, 4), round(lng_f, 4))
+    kinds = [kind for kind in _OVERPASS_KINDS for _ in range(kind[2])]
+    out = []
+    for i in range(elements):
+        tags, el_type, _share = rng.choice(kinds)
+        tags = dict(tags)
+        roll = rng.random()
+        if roll < 0.7:
+            tags["name"] = f"{rng.choice(_NAMES)} {next(iter(tags.values())).replace('_', ' ').title()}"
+        elif roll < 0.8:
+            tags["ref"] = f"R{i}"
+        elif roll < 0.85:
+            tags["operator"] = rng.choice(_NAMES)
+        lat, lon = _offset(rng, lat_f, lng_f, radius_m)
+        element = {"type": el_type, "id": 10_000_000 + i, "tags": tags}
+        if el_type == "node":
+            element.update(lat=lat, lon=lon)
+        else:
+            element["center"] = {"lat": lat, "lon": lon}
+        out.append(element)
+        if rng.random() < duplicate_share:
+            # The same place mapped twice (node and building outline).
+            twin = dict(element, id=element["id"] + 5_000_000, type="way")
+            twin.pop("lat", None)
+            twin.pop("lon", None)
+            twin["center"] = {"lat": lat, "lon": lon}
+            out.append(twin)
+    return {
+        "version": 0.6,
+        "generator": "Overpass API (stand-in)",
+        "osm3s": {"timestamp_osm_base": "2026-01-01T00:00:00Z"},
+        "elements": out,
+    }
+
+
+def photon_payload(query, lat_f, lng_f, limit=8, radius_m=1400):
+    """Photon /api/ GeoJSON with up to `limit` features for the query near the point."""
+    rng = _rng("photon", query, round(lat_f, 4), round(lng_f, 4))
+    label = _PHOTON_LABELS.get(query, query.title())
+    features = []
+    for _ in range(rng.randint(max(0, limit // 2), limit)):
+        lat, lon = _offset(rng, lat_f, lng_f, radius_m)
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [lon, lat]},
+            "properties": {
+                "name": f"{rng.choice(_NAMES)} {label}",
+                "osm_key": "amenity",
+                "osm_value": query,
+                "country": "India",
+            },
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def nominatim_reverse_payload(lat_f, lon_f):
+    """Nominatim /reverse jsonv2 answer for the point."""
+    rng = _rng("reverse", round(lat_f, 5), round(lon_f, 5))
+    road = f"{rng.choice(_NAMES)} Road"
+    return {
+        "place_id": rng.randint(1, 10 ** 9),
+        "lat": f"{lat_f:.7f}",
+        "lon": f"{lon_f:.7f}",
+        "display_name": f"{rng.randint(1, 200)}, {road}, Bengaluru, Karnataka, 560001, India",
+        "address": {"road": road, "city": "Bengaluru", "state": "Karnataka", "country": "India"},
+    }
+
+
+def nominatim_search_payload(query, limit=5):
+    """Nominatim /search jsonv2 answer: up to `limit` matches for the query."""
+    rng = _rng("search", " ".join(query.lower().split()))
+    lat0, lon0 = 12.97 + rng.uniform(-0.1, 0.1), 77.59 + rng.uniform(-0.1, 0.1)
+    return [
+        {
+            "place_id": rng.randint(1, 10 ** 9),
+            "lat": f"{lat0 + rng.uniform(-0.05, 0.05):.7f}",
+            "lon": f"{lon0 + rng.uniform(-0.05, 0.05):.7f}",
+            "display_name": f"{query.title()}, {rng.choice(_NAMES)}, Bengaluru, Karnataka, India",
+        }
+        for _ in range(rng.randint(1, limit))
+    ]
+
+
+def distance_matrix_payload(origins, destinations, mode):
+    """Distance Matrix JSON for one origin and '|'-separated destinations."""
+    rng = _rng("distance", origins, destinations, mode)
+    speed_mps = 1.3 if mode == "walking" else 8.0
+    elements = []
+    for _ in destinations.split("|"):
+        metres = rng.randint(200, 6000)
+        seconds = int(metres / speed_mps)
+        elements.append({
+            "status": "OK",
+            "distance": {"text": f"{metres / 1000:.1f} km", "value": metres},
+            "duration": {"text": f"{max(1, seconds // 60)} mins", "value": seconds},
+        })
+    return {
+        "status": "OK",
+        "origin_addresses": [origins],
+        "destination_addresses": destinations.split("|"),
+        "rows": [{"elements": elements}],
+    }
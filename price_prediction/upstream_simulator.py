@@ -0,0 +1,243 @@
+"""
+Local stand-ins for the upstream providers (Overpass mirrors, Photon,
+Nominatim, Google Distance Matrix), for load tests that must not touch the
+public OSM servers or Google quota.
+
+One threaded HTTP server answers every provider under its own prefix:
+
+    /overpass/<mirror>/api/interpreter          POST  (one path per mirror)
+    /photon/api/                                GET
+    /nominatim/reverse, /nominatim/search       GET
+    /google/maps/api/distancematrix/json        GET
+    /_stats                                     GET   counters per provider
+
+Set UPSTREAM_SIMULATOR_URL to the server's base URL and settings.py points
+all the endpoints in views.py at it. Answers come from upstream_payloads.
+Each provider draws its latency from a log-normal distribution given by its
+median and p95, fails with error_status at error_rate, and at timeout_rate
+hangs for timeout_sec before dropping the connection without an answer.
+"""
+
+import json
+import math
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from . import upstream_payloads
+
+PROVIDERS = ('overpass', 'photon', 'nominatim', 'google')
+
+# Provider → behaviour. Overpass may also list per-mirror overrides under
+# 'mirrors' (index → partial settings).
+PROFILES = {
+    # No latency or failures: measures the Django side only.
+    'instant': {
+        name: {'median_ms': 0, 'p95_ms': 0, 'error_rate': 0.0, 'timeout_rate': 0.0}
+        for name in PROVIDERS
+    },
+    # Roughly what the public services do on a normal day.
+    'realistic': {
+        'overpass': {
+            'median_ms': 1200, 'p95_ms': 3500, 'error_rate': 0.05, 'error_status': 504,
+            'timeout_rate': 0.02,
+            'mirrors': {'0': {'median_ms': 900, 'p95_ms': 2500}, '3': {'error_rate': 0.15}},
+        },
+        'photon': {'median_ms': 250, 'p95_ms': 700, 'error_rate': 0.02, 'timeout_rate': 0.005},
+        'nominatim': {'median_ms': 400, 'p95_ms': 1200, 'error_rate': 0.01, 'error_status': 429,
+                      'timeout_rate': 0.005},
+        'google': {'median_ms': 150, 'p95_ms': 400, 'error_rate': 0.002, 'timeout_rate': 0.0},
+    },
+    # Busy day: half the Overpass mirrors down or crawling, slow Photon.
+    'degraded': {
+        'overpass': {
+            'median_ms': 3000, 'p95_ms': 9000, 'error_rate': 0.2, 'error_status': 429,
+            'timeout_rate': 0.1,
+            'mirrors': {'1': {'error_rate': 1.0, 'error_status': 503}, '2': {'timeout_rate': 0.8}},
+        },
+        'photon': {'median_ms': 800, 'p95_ms': 2500, 'error_rate': 0.05, 'timeout_rate': 0.03},
+        'nominatim': {'median_ms': 900, 'p95_ms': 3000, 'error_rate': 0.08, 'error_status': 429,
+                      'timeout_rate': 0.02},
+        'google': {'median_ms': 200, 'p95_ms': 600, 'error_rate': 0.01, 'timeout_rate': 0.005},
+    },
+}
+_DEFAULTS = {
+    'median_ms': 0, 'p95_ms': 0, 'error_rate': 0.0, 'error_status': 503,
+    'timeout_rate': 0.0, 'timeout_sec': 30.0,
+}
+
+
+def resolve_profile(profile='realistic', overrides=None):
+    """Profile by name (or dict) with per-provider overrides merged in."""
+    base = PROFILES[profile] if isinstance(profile, str) else profile
+    resolved = {}
+    for name in PROVIDERS:
+        settings = dict(_DEFAULTS, **base.get(name, {}), **(overrides or {}).get(name, {}))
+        settings['mirrors'] = {
+            str(k): dict(v)
+            for k, v in dict(base.get(name, {}).get('mirrors', {}),
+                             **(overrides or {}).get(name, {}).get('mirrors', {})).items()
+        }
+        resolved[name] = settings
+    return resolved
+
+
+class Behaviour:
+    """Draws one request's outcome ('ok', 'error' or 'timeout') and latency."""
+
+    def __init__(self, settings, seed=None):
+        self.settings = settings
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _for(self, provider, mirror):
+        settings = self.settings[provider]
+        if mirror is not None and str(mirror) in settings['mirrors']:
+            settings = dict(settings, **settings['mirrors'][str(mirror)])
+        return settings
+
+    def draw(self, provider, mirror=None):
+        settings = self._for(provider, mirror)
+        with self._lock:
+            roll = self._rng.random()
+            normal = self._rng.gauss(0.0, 1.0)
+        if roll < settings['timeout_rate']:
+            return 'timeout', settings['timeout_sec'], settings
+        median = settings['median_ms'] / 1000.0
+        latency = 0.0
+        if median > 0:
+            # Log-normal with the given median and 95th percentile.
+            spread = max(settings['p95_ms'], settings['median_ms']) / settings['median_ms']
+            sigma = math.log(spread) / 1.645
+            latency = median * math.exp(sigma * normal)
+        outcome = 'error' if roll < settings['timeout_rate'] + settings['error_rate'] else 'ok'
+        return outcome, latency, settings
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'UpstreamSimulator/1.0'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self, method):
+        parsed = urlparse(self.path)
+        parts = [p for p in parsed.path.split('/') if p]
+        query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        if method == 'POST':
+            length = int(self.headers.get('Content-Length') or 0)
+            query.update({k: v[-1] for k, v in parse_qs(self.rfile.read(length).decode()).items()})
+        if parts == ['_stats']:
+            return None, None, lambda: self.server.stats_snapshot()
+        if parts[:1] == ['overpass'] and len(parts) >= 2 and method == 'POST':
+            return 'overpass', parts[1], lambda: _overpass(query)
+        if parts[:2] == ['photon', 'api']:
+            return 'photon', None, lambda: upstream_payloads.photon_payload(
+                query.get('q', ''), *_bbox_center(query.get('bbox')), limit=int(query.get('limit', 8))
+            )
+        if parts == ['nominatim', 'reverse']:
+            return 'nominatim', None, lambda: upstream_payloads.nominatim_reverse_payload(
+                float(query['lat']), float(query['lon'])
+            )
+        if parts == ['nominatim', 'search']:
+            return 'nominatim', None, lambda: upstream_payloads.nominatim_search_payload(
+                query.get('q', ''), int(query.get('limit', 5))
+            )
+        if parts[:1] == ['google'] and parts[-1] == 'json':
+            return 'google', None, lambda: upstream_payloads.distance_matrix_payload(
+                query['origins'], query['destinations'], query.get('mode', 'driving')
+            )
+        return None, None, None
+
+    def _handle(self, method):
+        provider, mirror, build = self._route(method)
+        if build is None:
+            self._send_json(404, {'error': f'No simulated provider at {self.path}'})
+            return
+        if provider is None:
+            self._send_json(200, build())
+            return
+        outcome, latency, settings = self.server.behaviour.draw(provider, mirror)
+        self.server.count(provider, mirror, outcome)
+        time.sleep(latency)
+        if outcome == 'timeout':
+            # Hang up without answering, like an overloaded mirror.
+            self.close_connection = True
+            return
+        if outcome == 'error':
+            self._send_json(settings['error_status'], {'error': 'simulated upstream failure'})
+            return
+        try:
+            payload = build()
+        except (KeyError, ValueError, IndexError) as e:
+            self._send_json(400, {'error': f'Bad simulated request: {str(e)}'})
+            return
+        self._send_json(200, payload)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+
+def _overpass(query):
+    text = query.get('data', '')
+    # around:<radius>,<lat>,<lng> in the generated query
+    lat_f, lng_f = map(float, text.split('around:', 1)[1].split(')', 1)[0].split(',')[1:3])
+    return upstream_payloads.overpass_payload(lat_f, lng_f)
+
+
+def _bbox_center(bbox):
+    lon_min, lat_min, lon_max, lat_max = map(float, (bbox or '0,0,0,0').split(','))
+    return (lat_min + lat_max) / 2, (lon_min + lon_max) / 2
+
+
+class SimulatorServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, address, settings, seed=None):
+        super().__init__(address, _Handler)
+        self.behaviour = Behaviour(settings, seed)
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        # Clients giving up on a slow answer is expected under load.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def count(self, provider, mirror, outcome):
+        name = provider if mirror is None else f'{provider}/{mirror}'
+        with self._stats_lock:
+            counts = self._stats.setdefault(name, {'ok': 0, 'error': 0, 'timeout': 0})
+            counts[outcome] += 1
+
+    def stats_snapshot(self):
+        with self._stats_lock:
+            return {name: dict(counts) for name, counts in self._stats.items()}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+
+def start_simulator(host='127.0.0.1', port=0, profile='realistic', overrides=None, seed=None):
+    """Run a simulator on a background thread; returns the server (see .url, .shutdown())."""
+    server = SimulatorServer((host, port), resolve_profile(profile, overrides), seed)
+    threading.Thread(target=server.serve_forever, name='upstream-simulator', daemon=True).start()
+    return server
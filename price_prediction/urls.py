@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = 'price_prediction'
 
@@ -10,4 +10,13 @@ urlpatterns = [
     path('api/batch-distance/', views.calculate_batch_distances, name='calculate_batch_distances'),
     path('api/batch-distance-both/', views.calculate_batch_distances_both_modes, name='calculate_batch_distances_both'),
     path('api/all-amenities/', views.fetch_all_amenities, name='fetch_all_amenities'),
+    path('api/comparables/', views.comparable_sales, name='comparable_sales'),
+    path('api/amenity-prefetch-stats/', views.amenity_prefetch_stats, name='amenity_prefetch_stats'),
+    path('api/estimate/', views.quick_estimate, name='quick_estimate'),
+    path('api/<str:version>/predict/', api.PredictionView.as_view(), name='api_predict'),
+    path('api/<str:version>/options/', api.PredictionOptionsView.as_view(), name='api_options'),
+    path('api/what-if/', views.what_if, name='what_if'),
+    path('api/price-tiles/manifest/', views.price_tile_manifest, name='price_tile_manifest'),
+    path('api/price-tiles/<str:layer>/<int:z>/<int:x>/<int:y>.png', views.price_tile, {'fmt': 'png'}, name='price_tile'),
+    path('api/price-tiles/<str:layer>/<int:z>/<int:x>/<int:y>.bin', views.price_tile, {'fmt': 'bin'}, name='price_tile_raw'),
 ]
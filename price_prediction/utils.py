@@ -1,12 +1,16 @@
 import pickle
 import os
 import sys
+import threading
+import time
 import warnings
 import numpy as np
 import pandas as pd
 from pathlib import Path
 from django.conf import settings
 
+from . import metrics, model_server, thread_budget
+
 # Suppress XGBoost cleanup warnings (harmless but annoying)
 warnings.filterwarnings('ignore', category=UserWarning)
 
@@ -38,8 +42,20 @@ _model_cache = {
     'features': None,
     'config': None,
     'property_type_encoder': None,
-    'city_encoder': None
+    'city_encoder': None,
+    'tiers': None,
+    'stamp': None
 }
+# A published model is picked up without a restart: model_config.pkl is
+# written last, so a change in its mtime/size means a complete new set.
+_model_load_lock = threading.Lock()
+_reload_state = {'checked_at': 0.0}
+
+# Prediction tiers: share of the model's boosting rounds each one evaluates.
+# Training measures their error and latency (model_config['prediction_tiers']);
+# these fractions are the fallback for models trained without that.
+PREDICTION_TIERS = ('fast', 'balanced', 'full')
+TIER_FRACTIONS = {'fast': 0.2, 'balanced': 0.5, 'full': 1.0}
 
 
 def get_ml_files_path():
@@ -49,61 +65,156 @@ def get_ml_files_path():
     return ml_files_path
 
 
+def _artifacts_stamp(ml_path):
+    try:
+        st = os.stat(ml_path / 'model_config.pkl')
+    except FileNotFoundError:
+        return None
+    return (str(ml_path), st.st_mtime_ns, st.st_size)
+
+
+def _artifacts_changed(ml_path):
+    """Whether a new model was published since the load, checked every MODEL_RELOAD_CHECK_SEC."""
+    interval = float(getattr(settings, 'MODEL_RELOAD_CHECK_SEC', 5.0))
+    if interval < 0:
+        return False
+    now = time.monotonic()
+    if now - _reload_state['checked_at'] < interval:
+        return False
+    _reload_state['checked_at'] = now
+    return _artifacts_stamp(ml_path) != _model_cache['stamp']
+
+
 def load_model_artifacts():
-    """Load all ML model artifacts from pickle files"""
+    """Load all ML model artifacts from pickle files, again when a new model is published"""
     ml_path = get_ml_files_path()
     
     # Return cached models if already loaded
-    if _model_cache['model'] is not None:
+    if _model_cache['model'] is not None and not _artifacts_changed(ml_path):
         return _model_cache
     
+    with _model_load_lock:
+        stamp = _artifacts_stamp(ml_path)
+        if _model_cache['model'] is not None and stamp == _model_cache['stamp']:
+            return _model_cache
+        reloading = _model_cache['model'] is not None
+        loaded = _read_model_artifacts(ml_path)
+        # One update, so concurrent readers see the old set or the new one.
+        _model_cache.update(loaded, tiers=None, stamp=stamp)
+        if reloading:
+            logger.info(f"Reloaded model artifacts (model version {(loaded['config'] or {}).get('model_version')})")
+        return _model_cache
+
+
+def _read_model_artifacts(ml_path):
+    loaded = {}
+    load_started = time.perf_counter()
     try:
         # Load model with proper error handling for XGBoost cleanup warnings
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
             with open(ml_path / 'best_house_price_model.pkl', 'rb') as f:
-                _model_cache['model'] = pickle.load(f)
+                loaded['model'] = pickle.load(f)
             
             # Ensure XGBoost model is properly initialized
             # This helps prevent cleanup issues
-            if hasattr(_model_cache['model'], 'get_booster'):
+            if hasattr(loaded['model'], 'get_booster'):
                 try:
-                    _model_cache['model'].get_booster()
+                    loaded['model'].get_booster()
                 except:
                     pass
+            thread_budget.release_model_threads(loaded['model'])
         
         # Load features
         with open(ml_path / 'model_features.pkl', 'rb') as f:
-            _model_cache['features'] = pickle.load(f)
+            loaded['features'] = pickle.load(f)
         
         # Load config
         with open(ml_path / 'model_config.pkl', 'rb') as f:
-            _model_cache['config'] = pickle.load(f)
+            loaded['config'] = pickle.load(f)
         
         # Load property type encoder
         try:
             with open(ml_path / 'property_type_encoder.pkl', 'rb') as f:
-                _model_cache['property_type_encoder'] = pickle.load(f)
+                loaded['property_type_encoder'] = pickle.load(f)
         except FileNotFoundError:
-            _model_cache['property_type_encoder'] = None
+            loaded['property_type_encoder'] = None
         
         # Load city encoder (may not be used)
         try:
             with open(ml_path / 'city_encoder.pkl', 'rb') as f:
-                _model_cache['city_encoder'] = pickle.load(f)
+                loaded['city_encoder'] = pickle.load(f)
         except FileNotFoundError:
-            _model_cache['city_encoder'] = None
+            loaded['city_encoder'] = None
         
+        metrics.MODEL_LOAD.observe(time.perf_counter() - load_started)
         logger.info("Model artifacts loaded successfully")
-        return _model_cache
+        return loaded
     
     except Exception as e:
         logger.error(f"Error loading model artifacts: {str(e)}")
         raise Exception(f"Error loading model artifacts: {str(e)}")
 
 
+def model_rounds(model):
+    """Boosting rounds the model uses by default (up to best_iteration when early-stopped)."""
+    booster = model.get_booster()
+    best = booster.attr('best_iteration')
+    if best is not None:
+        return int(best) + 1
+    return booster.num_boosted_rounds()
+
+
+def get_prediction_tiers():
+    """Tier name → settings (at least 'rounds'; error and latency when measured)."""
+    served, info = model_server.call('info')
+    if served:
+        return info['tiers']
+    artifacts = load_model_artifacts()
+    if artifacts['tiers'] is None:
+        measured = (artifacts['config'] or {}).get('prediction_tiers') or {}
+        full = model_rounds(artifacts['model'])
+        tiers = {}
+        for name in PREDICTION_TIERS:
+            tier = dict(measured.get(name) or {})
+            tier.setdefault('rounds', max(1, int(round(full * TIER_FRACTIONS[name]))))
+            tier['rounds'] = min(int(tier['rounds']), full)
+            tiers[name] = tier
+        artifacts['tiers'] = tiers
+    return artifacts['tiers']
+
+
+def select_prediction_tier(tier=None, latency_budget_ms=None, default='full'):
+    """
+    Pick a tier: the one named, else the most accurate one whose measured
+    latency fits latency_budget_ms (fast when none does), else default.
+    Returns (name, settings).
+    """
+    tiers = get_prediction_tiers()
+    if tier:
+        if tier not in tiers:
+            raise ValueError(f"Unknown prediction tier: {tier}")
+        return tier, tiers[tier]
+    if latency_budget_ms is not None:
+        for name in reversed(PREDICTION_TIERS):
+            latency = tiers[name].get('latency_ms')
+            if latency is not None and latency <= latency_budget_ms:
+                return name, tiers[name]
+        return 'fast', tiers['fast']
+    return default, tiers[default]
+
+
+def _iteration_range(tier):
+    if tier is None:
+        return None
+    return (0, get_prediction_tiers()[tier]['rounds'])
+
+
 def get_property_types():
     """Get list of available property types from encoder"""
+    served, info = model_server.call('info')
+    if served:
+        return list(info['property_types'])
     artifacts = load_model_artifacts()
     encoder = artifacts['property_type_encoder']
     if encoder is not None:
@@ -111,7 +222,7 @@ def get_property_types():
     return ['Flat', 'House', 'Apartment']  # Default fallback
 
 
-def predict_house_price(input_dict):
+def predict_house_price(input_dict, tier=None):
     """
     Predict house price based on input features.
     This function matches the notebook's predict_price function exactly.
@@ -119,16 +230,22 @@ def predict_house_price(input_dict):
     
     Args:
         input_dict: Dictionary containing property features (just provide basic data)
+        tier: Optional prediction tier name; evaluates only that tier's trees
         
     Returns:
         Predicted price as float
     """
+    served, prices = model_server.call('predict', {k: [v] for k, v in input_dict.items()}, tier)
+    if served:
+        return float(prices[0])
+
     artifacts = load_model_artifacts()
     model = artifacts['model']
     features = artifacts['features']
     config = artifacts['config']
     property_type_encoder = artifacts['property_type_encoder']
     
+    build_started = time.perf_counter()
     # Create a copy of input dict
     d = input_dict.copy()
     
@@ -176,12 +293,301 @@ def predict_house_price(input_dict):
             raise TypeError(f"Feature '{col}' must be numeric, got {type(df_input[col].iloc[0])}.")
     
     # Make prediction
-    pred_log = model.predict(df_input)
+    predict_started = time.perf_counter()
+    metrics.FEATURE_BUILD.observe(predict_started - build_started, 'single')
+    iteration_range = _iteration_range(tier)
+    with thread_budget.inference_threads(1, 'single'):
+        if iteration_range:
+            pred_log = model.predict(df_input, iteration_range=iteration_range)
+        else:
+            pred_log = model.predict(df_input)
+    metrics.INFERENCE.observe(time.perf_counter() - predict_started, 'single')
+    metrics.PREDICTION_ROWS.inc('single')
     if np.isnan(pred_log).any():
         raise ValueError("Model prediction is NaN.")
     
-    # Apply inverse log transformation if needed
+    # Apply inverse log transformation if needed (in float64, as every path does)
     if config.get("log_target", False):
-        return float(np.expm1(pred_log)[0])
+        return float(np.expm1(np.float64(pred_log[0])))
     return float(pred_log[0])
 
+
+
+def predict_house_prices(columns, tier=None):
+    """
+    Vectorised predict_house_price for many rows in one model call.
+
+    Args:
+        columns: Dictionary of the same inputs predict_house_price takes, each
+            an array (all of the same length) or a scalar broadcast to every row.
+            property_type may hold names or encoded values.
+        tier: Optional prediction tier name; evaluates only that tier's trees
+
+    Returns:
+        Array of predicted prices, one per row
+    """
+    served, prices = model_server.call('predict', columns, tier)
+    if served:
+        return prices
+
+    artifacts = load_model_artifacts()
+    model = artifacts['model']
+    config = artifacts['config']
+    with metrics.FEATURE_BUILD.time('batch'):
+        df_input = _feature_frame(columns, artifacts)
+
+    iteration_range = _iteration_range(tier)
+    with metrics.INFERENCE.time('batch'), thread_budget.inference_threads(len(df_input), 'batch'):
+        if iteration_range:
+            pred = model.predict(df_input, iteration_range=iteration_range)
+        else:
+            pred = model.predict(df_input)
+    metrics.PREDICTION_ROWS.inc('batch', amount=len(df_input))
+    if np.isnan(pred).any():
+        raise ValueError("Model prediction is NaN.")
+
+    # Apply inverse log transformation if needed (in float64, as every path does)
+    pred = np.asarray(pred, dtype=np.float64)
+    if config.get("log_target", False):
+        return np.expm1(pred)
+    return pred
+
+
+def row_count(columns):
+    """
+    Rows in columns (see predict_house_prices): the length of the array
+    columns, which must all agree (scalars and length-1 arrays broadcast).
+    """
+    lengths = {name: np.size(v) for name, v in columns.items() if np.ndim(v)}
+    n = max(lengths.values(), default=1)
+    if any(length not in (1, n) for length in lengths.values()):
+        described = ', '.join(f"{name}={length}" for name, length in lengths.items())
+        raise ValueError(f"Mismatched column lengths: {described}")
+    return n
+
+
+def _feature_frame(columns, artifacts):
+    """Encode and engineer columns (see predict_house_prices) into the model's feature frame."""
+    features = artifacts['features']
+    property_type_encoder = artifacts['property_type_encoder']
+
+    n = row_count(columns)
+    d = {k: np.broadcast_to(np.asarray(v), (n,)) for k, v in columns.items()}
+
+    # Encode property type (handled automatically)
+    if "property_type_encoded" not in d:
+        if property_type_encoder is not None and "property_type" in d:
+            vals = d["property_type"]
+            if vals.dtype.kind in 'USO':
+                unknown = set(np.unique(vals.astype(str))) - set(property_type_encoder.classes_)
+                if unknown:
+                    raise ValueError(f"Unknown property_type: {', '.join(sorted(unknown))}")
+                d["property_type_encoded"] = property_type_encoder.transform(vals.astype(str))
+            else:
+                d["property_type_encoded"] = vals.astype(int)
+        else:
+            d["property_type_encoded"] = np.zeros(n, dtype=int)
+
+    # Validate basic required features
+    if "number of bedrooms" not in d or "number of bathrooms" not in d:
+        raise KeyError("number of bedrooms and number of bathrooms are required.")
+    if "living area" not in d or "lot area" not in d:
+        raise KeyError("living area and lot area are required.")
+    if "Lattitude" not in d or "Longitude" not in d:
+        raise KeyError("Lattitude and Longitude are required.")
+
+    # Same engineered features as predict_house_price, for all rows at once
+    bedrooms = d["number of bedrooms"].astype(np.float64)
+    bathrooms = d["number of bathrooms"].astype(np.float64)
+    living = d["living area"].astype(np.float64)
+    lot = d["lot area"].astype(np.float64)
+    d["bedrooms_x_bathrooms"] = bedrooms * bathrooms
+    d["Living_vs_Lot_Ratio"] = living / np.maximum(lot, 1)
+    d["area_per_bedroom"] = living / (bedrooms + 1)
+    d["lot_per_living"] = lot / (living + 1)
+    d["lat_x_lon"] = d["Lattitude"].astype(np.float64) * d["Longitude"].astype(np.float64)
+
+    for f in features:
+        if f not in d:
+            raise KeyError(f"Missing required feature: {f}")
+    try:
+        df_input = pd.DataFrame({f: d[f].astype(np.float64) for f in features})
+    except ValueError:
+        raise TypeError("All features must be numeric.")
+    return df_input
+
+
+# Raw input each model feature's contribution is credited to. Engineered
+# features built from two inputs are split equally between them.
+FEATURE_SOURCES = {
+    'number of bedrooms': ('bedrooms',),
+    'number of bathrooms': ('bathrooms',),
+    'living area': ('living_area',),
+    'lot area': ('lot_area',),
+    'floor': ('floor',),
+    'property_type_encoded': ('property_type',),
+    'Lattitude': ('location',),
+    'Longitude': ('location',),
+    'lat_x_lon': ('location',),
+    'bedrooms_x_bathrooms': ('bedrooms', 'bathrooms'),
+    'Living_vs_Lot_Ratio': ('living_area', 'lot_area'),
+    'area_per_bedroom': ('living_area', 'bedrooms'),
+    'lot_per_living': ('lot_area', 'living_area'),
+}
+EXPLANATION_INPUTS = ('location', 'living_area', 'lot_area', 'bedrooms', 'bathrooms', 'floor', 'property_type')
+
+
+def _fold_matrix(features):
+    """(features x inputs) weights mapping feature contributions onto raw inputs."""
+    fold = np.zeros((len(features), len(EXPLANATION_INPUTS)))
+    for i, f in enumerate(features):
+        sources = FEATURE_SOURCES.get(f, ())
+        for source in sources:
+            fold[i, EXPLANATION_INPUTS.index(source)] = 1.0 / len(sources)
+    return fold
+
+
+def explain_house_prices(columns, tier=None, exact=False):
+    """
+    predict_house_prices plus per-input contributions, from the booster's
+    contribution output (one model call for prediction and explanation).
+    By default these are XGBoost's approximate (per-path) contributions,
+    which cost about as much as a prediction; exact=True computes
+    TreeSHAP values, a few hundred times slower on deep trees.
+
+    Returns:
+        (prices, baseline, contributions): prices and baseline (the model's
+        output before any feature) per row, and an (n, len(EXPLANATION_INPUTS))
+        array of contributions on the model's scale (log price for log
+        targets); baseline plus the contributions sums to the prediction
+        up to float32 rounding. prices are the model's own predictions, the
+        same as predict_house_prices returns, not the contributions' sum.
+    """
+    if not exact:
+        served, result = model_server.call('explain', columns, tier)
+        if served:
+            return result
+
+    import xgboost as xgb
+
+    artifacts = load_model_artifacts()
+    model = artifacts['model']
+    config = artifacts['config']
+    with metrics.FEATURE_BUILD.time('explain'):
+        df_input = _feature_frame(columns, artifacts)
+
+    # Booster.predict ignores best_iteration, so always pass the tier's range
+    booster = model.get_booster()
+    iteration_range = (0, get_prediction_tiers()[tier or 'full']['rounds'])
+    with metrics.INFERENCE.time('explain'), thread_budget.inference_threads(len(df_input), 'explain'):
+        dmatrix = xgb.DMatrix(df_input)
+        contribs = booster.predict(
+            dmatrix, pred_contribs=True, approx_contribs=not exact, iteration_range=iteration_range,
+        ).astype(np.float64)
+        # The contributions add up in a different order than the trees do, a
+        # few float32 ulps off; price from the prediction itself so a row gets
+        # the same price whether or not it was explained.
+        pred = booster.predict(dmatrix, iteration_range=iteration_range).astype(np.float64)
+    metrics.PREDICTION_ROWS.inc('explain', amount=len(df_input))
+    if np.isnan(contribs).any() or np.isnan(pred).any():
+        raise ValueError("Model prediction is NaN.")
+
+    bias = contribs[:, -1]
+    inputs = contribs[:, :-1] @ _fold_matrix(list(df_input.columns))
+    if config.get("log_target", False):
+        return np.expm1(pred), np.expm1(bias), inputs
+    return pred, bias, inputs
+
+
+def _explanation(baseline, contributions, log_target):
+    items = []
+    for name, value in zip(EXPLANATION_INPUTS, contributions):
+        item = {'input': name, 'effect': float(value)}
+        if log_target:
+            # Multiplicative effect on the price, in percent
+            item['percent'] = float(np.expm1(value) * 100)
+        items.append(item)
+    items.sort(key=lambda item: abs(item['effect']), reverse=True)
+    return {'baseline_price': float(baseline), 'contributions': items}
+
+
+# Bounded LRU of recent predictions: key -> {'price', 'explanation'?}
+_prediction_cache = {}
+_prediction_cache_lock = threading.Lock()
+
+
+def get_model_version():
+    """Version of the loaded model: model_config's model_version, else unique per load."""
+    served, info = model_server.call('info')
+    if served:
+        return info['model_version']
+    artifacts = load_model_artifacts()
+    return (artifacts['config'] or {}).get('model_version') or id(artifacts['model'])
+
+
+def model_log_target():
+    """Whether the model predicts log prices (explanations are then multiplicative)."""
+    served, info = model_server.call('info')
+    if served:
+        return info['log_target']
+    return (load_model_artifacts()['config'] or {}).get('log_target', False)
+
+
+def _prediction_key(row, tier):
+    return (get_model_version(), tier or 'full', tuple(sorted((k, str(v)) for k, v in row.items())))
+
+
+def estimate_prices(rows, tier=None, explain=False):
+    """
+    Predict (and optionally explain) a batch of properties.
+
+    Rows are input dicts as for predict_house_price, all with the same keys.
+    Rows missing from the prediction cache are scored together in one model
+    call. Returns one dict per row with 'price' and, when explain is set,
+    'explanation' (baseline_price and contributions sorted by size). A row
+    keeps its cached price when it is explained later.
+    """
+    keys = [_prediction_key(row, tier) for row in rows]
+    results = [None] * len(rows)
+    missing = []
+    with _prediction_cache_lock:
+        for i, key in enumerate(keys):
+            cached = _prediction_cache.pop(key, None)
+            if cached is not None:
+                _prediction_cache[key] = cached
+            if cached is not None and (not explain or 'explanation' in cached):
+                results[i] = cached
+            else:
+                missing.append(i)
+    metrics.CACHE_REQUESTS.inc('prediction', 'hit', amount=len(rows) - len(missing))
+    metrics.CACHE_REQUESTS.inc('prediction', 'miss', amount=len(missing))
+
+    if missing:
+        names = list(rows[missing[0]])
+        columns = {name: np.asarray([rows[i][name] for i in missing]) for name in names}
+        if explain:
+            log_target = model_log_target()
+            prices, baseline, contributions = explain_house_prices(columns, tier)
+            computed = [
+                {'price': float(prices[j]), 'explanation': _explanation(baseline[j], contributions[j], log_target)}
+                for j in range(len(missing))
+            ]
+            with _prediction_cache_lock:
+                for i, result in zip(missing, computed):
+                    cached = _prediction_cache.get(keys[i])
+                    if cached is not None:
+                        result['price'] = cached['price']
+        else:
+            computed = [{'price': float(price)} for price in predict_house_prices(columns, tier)]
+        limit = max(0, int(getattr(settings, 'PREDICTION_CACHE_SIZE', 4096)))
+        with _prediction_cache_lock:
+            for i, result in zip(missing, computed):
+                results[i] = result
+                _prediction_cache.pop(keys[i], None)
+                _prediction_cache[keys[i]] = result
+            while len(_prediction_cache) > limit:
+                del _prediction_cache[next(iter(_prediction_cache))]
+
+    if explain:
+        return [dict(result) for result in results]
+    return [{'price': result['price']} for result in results]
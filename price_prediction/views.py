@@ -4,53 +4,118 @@ Django views for house price prediction
 
 from django.shortcuts import render
 from django.conf import settings
-from django.http import JsonResponse
+from django.http import HttpResponse
 from django.views.decorators.http import require_http_methods
-from .utils import predict_house_price, get_property_types
+from django.views.decorators.csrf import csrf_exempt
+from django.middleware.csrf import get_token
+from .utils import predict_house_prices, estimate_prices, get_property_types, select_prediction_tier
+from .utils import get_ml_files_path, get_model_version
+from .comparables import find_comparables, MAX_K as _COMPARABLES_MAX_K
+from . import metrics, page_cache, price_tiles
+from .api_response import ApiJsonResponse, wants_compact, compact_amenities, compact_distance_matrix
+from .deadline import Deadline, DeadlineExceeded, with_deadline
+from .overpass import build_overpass_query, record_density, group_counts
+from .upstream_cache import tiered_cache
 import requests
-from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import hmac
+import json
+import logging
+import numpy as np
 import time
 import threading
 
-# Short in-memory amenity cache (rounded lat/lng → response payload).
-_AMENITY_CACHE = {}
-_AMENITY_CACHE_LOCK = threading.Lock()
+logger = logging.getLogger(__name__)
+
+# Short in-memory caches over the persistent upstream cache (see upstream_cache).
+# Amenities: rounded lat/lng → response payload.
 _AMENITY_CACHE_TTL_SEC = 600  # 10 minutes
-_OVERPASS_BUDGET_SEC = 4.0
-_OVERPASS_ENDPOINTS = (
+_AMENITY_CACHE = tiered_cache("amenities", _AMENITY_CACHE_TTL_SEC, max_entries=200)
+# Per-category Overpass results (lat, lng, bucket) → places; lets a lookup
+# query only the categories it is missing. OSM amenities change slowly.
+_AMENITY_BUCKET_CACHE_TTL_SEC = 1800
+_AMENITY_BUCKET_CACHE = tiered_cache("amenity_buckets", _AMENITY_BUCKET_CACHE_TTL_SEC, max_entries=1200)
+# Nominatim: rounded lat/lon → display name, normalised query → results.
+_GEOCODE_CACHE = tiered_cache("reverse_geocode", 3600, max_entries=1000)
+_SEARCH_CACHE = tiered_cache("location_search", 3600, max_entries=500)
+# Google Distance Matrix: (origin, destinations, mode) → OK response body.
+_DISTANCE_CACHE = tiered_cache("distance", 600, max_entries=500)
+# Amenity lookups run on a slice of the request deadline: the overall wait keeps
+# a little back for merging, Overpass and Photon keep more back so their late
+# answers still land inside the overall wait.
+_AMENITY_MERGE_RESERVE_SEC = 0.5
+_OVERPASS_RESERVE_SEC = 1.0
+_PHOTON_RESERVE_SEC = 1.5
+# Upstream endpoints (overridable in settings, e.g. to point at simulate_upstreams).
+_OVERPASS_ENDPOINTS = tuple(getattr(settings, 'OVERPASS_ENDPOINTS', None) or (
     "https://overpass.kumi.systems/api/interpreter",
     "https://lz4.overpass-api.de/api/interpreter",
     "https://overpass-api.de/api/interpreter",
     "https://overpass.osm.ch/api/interpreter",
+))
+_PHOTON_URL = getattr(settings, 'PHOTON_URL', "https://photon.komoot.io/api/")
+_NOMINATIM_URL = str(getattr(settings, 'NOMINATIM_URL', "https://nominatim.openstreetmap.org")).rstrip('/')
+_DISTANCE_MATRIX_URL = getattr(
+    settings, 'GOOGLE_DISTANCE_MATRIX_URL', "https://maps.googleapis.com/maps/api/distancematrix/json"
 )
+_OSM_HEADERS = {
+    "User-Agent": "PropertyLocationPicker/1.0 (mdaliraza92@gmail.com)",
+    "Accept": "application/json",
+}
 
+# In-flight amenity lookups (cache key → Future of (payload, error)) so a live
+# request can join a prefetch for the same point instead of starting its own.
+_AMENITY_INFLIGHT = {}
+_AMENITY_INFLIGHT_LOCK = threading.Lock()
+
+# Speculative prefetch: reverse-geocode/search results warm the amenity cache.
+_PREFETCH_MAX_CONCURRENT = max(1, int(getattr(settings, 'AMENITY_PREFETCH_MAX_CONCURRENT', 2)))
+_PREFETCH_POOL = ThreadPoolExecutor(
+    max_workers=_PREFETCH_MAX_CONCURRENT, thread_name_prefix="amenity-prefetch"
+)
+_PREFETCH_LOCK = threading.Lock()
+_PREFETCH_ACTIVE = 0
+# Set on amenity payloads cached by a prefetch, cleared by the first request
+# served from them, so every worker can count that use exactly once.
+_PREFETCH_MARK = "prefetched"
+_PREFETCH_RESULTS = ("scheduled", "completed", "failed", "used", "skipped_cached", "skipped_inflight", "dropped")
 
 def predict_price(request):
     """Main view: shows form and processes predictions"""
+    if request.method != 'POST':
+        return predict_form_page(request)
     property_types = get_property_types()
     prediction = None
     error_message = None
     
-    if request.method == 'POST':
-        try:
-            form_data = extract_form_data(request.POST)
-            validate_form_data(form_data)
-            input_data = prepare_model_input(form_data)
-            predicted_price = predict_house_price(input_data)
-            
-            prediction = {
-                'price': predicted_price,
-                'formatted_price': format_price(predicted_price),
-                'latitude': form_data['latitude'],
-                'longitude': form_data['longitude']
-            }
-            
-        except ValueError as e:
-            error_message = str(e)
-        except KeyError as e:
-            error_message = f"Missing required field: {str(e)}"
-        except Exception as e:
-            error_message = f"Error making prediction: {str(e)}"
+    try:
+        form_data = extract_form_data(request.POST)
+        validate_form_data(form_data)
+        input_data = prepare_model_input(form_data)
+        tier, _ = get_prediction_tier(request.POST)
+        # Contributions cost a few times a plain prediction, so only when asked for
+        explain = _truthy(request.POST.get('explain', ''))
+        estimate = estimate_prices([input_data], tier=tier, explain=explain)[0]
+        predicted_price = estimate['price']
+        
+        prediction = {
+            'price': predicted_price,
+            'formatted_price': format_price(predicted_price),
+            'tier': tier,
+            'drivers': get_drivers_for_display(estimate['explanation']) if explain else None,
+            'latitude': form_data['latitude'],
+            'longitude': form_data['longitude'],
+            'comparables': get_comparables_for_display(form_data),
+        }
+        
+    except ValueError as e:
+        error_message = str(e)
+    except KeyError as e:
+        error_message = f"Missing required field: {str(e)}"
+    except Exception as e:
+        error_message = f"Error making prediction: {str(e)}"
     
     context = {
         'property_types': property_types,
@@ -59,7 +124,166 @@ def predict_price(request):
         'google_maps_api_key': settings.GOOGLE_MAPS_API_KEY,
     }
     
-    return render(request, 'price_prediction/predict.html', context)
+    response = render(request, 'price_prediction/predict.html', context)
+    if prediction:
+        response['X-Prediction-Tier'] = prediction['tier']
+    return response
+
+
+def predict_form_page(request):
+    """
+    The empty form, identical for every visitor, from the page cache. Its
+    CSRF field is filled in from the CSRF cookie on submit, so the cached
+    body carries no per-user token.
+    """
+    get_token(request)
+    return page_cache.render_page(
+        request,
+        'price_prediction/predict.html',
+        lambda: {
+            'property_types': get_property_types(),
+            'prediction': None,
+            'error_message': None,
+            'google_maps_api_key': settings.GOOGLE_MAPS_API_KEY,
+            'csrf_cookie_name': settings.CSRF_COOKIE_NAME,
+        },
+        version=(get_model_version(), settings.GOOGLE_MAPS_API_KEY),
+        sources=[get_ml_files_path() / 'best_house_price_model.pkl'],
+    )
+
+
+def get_prediction_tier(data, default='full'):
+    """Tier from a request's 'tier' or 'latency_budget_ms' parameter: (name, settings)."""
+    budget = data.get('latency_budget_ms')
+    budget = float(budget) if budget not in (None, '') else None
+    return select_prediction_tier(data.get('tier') or None, budget, default=default)
+
+
+_EXPLANATION_LABELS = {
+    'location': 'Location',
+    'living_area': 'Living area',
+    'lot_area': 'Lot area',
+    'bedrooms': 'Bedrooms',
+    'bathrooms': 'Bathrooms',
+    'floor': 'Floor',
+    'property_type': 'Property type',
+}
+_ESTIMATE_BATCH_MAX = 1000
+
+
+def get_drivers_for_display(explanation, top=4):
+    """Largest per-input effects for the result card."""
+    drivers = []
+    for item in explanation['contributions'][:top]:
+        if 'percent' not in item or abs(item['percent']) < 0.05:
+            continue
+        drivers.append({
+            'label': _EXPLANATION_LABELS.get(item['input'], item['input']),
+            'percent': abs(item['percent']),
+            'raises': item['percent'] > 0,
+        })
+    return drivers
+
+
+def _truthy(value):
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+def quick_estimate(request):
+    """
+    Price for interactive feedback while the form is being filled in.
+    Takes the form fields as query parameters and uses the fast tier unless
+    ?tier= or ?latency_budget_ms= asks otherwise; ?explain=1 adds the
+    per-input contributions.
+
+    POST a JSON body {"properties": [form fields, ...], "explain": true,
+    "tier": ...} to price a batch in one model call (full tier by default);
+    invalid properties get an 'error' entry instead of a price.
+    """
+    started = time.perf_counter()
+    if request.method == 'POST':
+        return _estimate_batch(request, started)
+    explain = _truthy(request.GET.get('explain', ''))
+    try:
+        form_data = extract_form_data(request.GET)
+        validate_form_data(form_data)
+        tier, tier_settings = get_prediction_tier(request.GET, default='fast')
+        estimate = estimate_prices([prepare_model_input(form_data)], tier=tier, explain=explain)[0]
+    except (ValueError, KeyError, TypeError) as e:
+        return ApiJsonResponse({'error': str(e)}, status=400)
+    payload = {
+        'price': estimate['price'],
+        'formatted_price': format_price(estimate['price']),
+        'tier': tier,
+        'rounds': tier_settings['rounds'],
+    }
+    if explain:
+        payload['explanation'] = estimate['explanation']
+    payload['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    response = ApiJsonResponse(payload)
+    response['X-Prediction-Tier'] = tier
+    return response
+
+
+def _estimate_batch(request, started):
+    try:
+        data = json.loads(request.body or b'{}')
+        properties = data['properties']
+        if not isinstance(properties, list) or not properties:
+            raise ValueError("properties must be a non-empty list")
+        if len(properties) > _ESTIMATE_BATCH_MAX:
+            raise ValueError(f"At most {_ESTIMATE_BATCH_MAX} properties per request")
+        tier, tier_settings = get_prediction_tier(data, default='full')
+    except KeyError as e:
+        return ApiJsonResponse({'error': f"Missing required field: {str(e)}"}, status=400)
+    except (ValueError, TypeError) as e:
+        return ApiJsonResponse({'error': str(e)}, status=400)
+    explain = _truthy(data.get('explain', False))
+
+    results = [None] * len(properties)
+    rows, positions = [], []
+    property_types = set(get_property_types())
+    for i, item in enumerate(properties):
+        try:
+            form_data = extract_form_data(item)
+            validate_form_data(form_data)
+            if form_data['property_type'] not in property_types:
+                raise ValueError(f"Unknown property_type: {form_data['property_type']}")
+            rows.append(prepare_model_input(form_data))
+            positions.append(i)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            results[i] = {'error': str(e)}
+    if rows:
+        try:
+            estimates = estimate_prices(rows, tier=tier, explain=explain)
+        except (ValueError, KeyError, TypeError) as e:
+            return ApiJsonResponse({'error': str(e)}, status=400)
+        for i, estimate in zip(positions, estimates):
+            estimate['formatted_price'] = format_price(estimate['price'])
+            results[i] = estimate
+
+    response = ApiJsonResponse({
+        'results': results,
+        'tier': tier,
+        'rounds': tier_settings['rounds'],
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+    })
+    response['X-Prediction-Tier'] = tier
+    return response
+
+
+def get_comparables_for_display(form_data, k=5):
+    """Comparable sales for the result card; never lets a lookup failure hide the price."""
+    try:
+        sales = find_comparables([form_data], k=k)[0]
+    except Exception as e:
+        logger.warning(f"Comparables lookup failed: {str(e)}")
+        return []
+    for sale in sales:
+        sale['formatted_price'] = format_price(sale['price'])
+    return sales
 
 
 def extract_form_data(post_data):
@@ -132,23 +356,50 @@ def get_api_key():
     """Get Google Maps API key from settings"""
     api_key = settings.GOOGLE_MAPS_API_KEY
     if not api_key:
-        return None, JsonResponse({'error': 'Google Maps API key not configured'}, status=500)
+        return None, ApiJsonResponse({'error': 'Google Maps API key not configured'}, status=500)
     return api_key, None
 
 
-def call_google_api(url, params):
+def call_google_api(url, params, deadline):
     """Make request to Google API and return response"""
     try:
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        return response.json(), None
+        with deadline.span("google"), upstream_timer("google"):
+            response = requests.get(url, params=params, timeout=deadline.timeout())
+            response.raise_for_status()
+            data = response.json()
+        return data, None
+    except DeadlineExceeded as e:
+        deadline.skip("google")
+        return None, ApiJsonResponse({'error': 'Request time budget exhausted', 'details': str(e)}, status=504)
     except requests.exceptions.RequestException as e:
-        return None, JsonResponse({'error': 'Failed to fetch from Google API', 'details': str(e)}, status=500)
+        return None, ApiJsonResponse({'error': 'Failed to fetch from Google API', 'details': str(e)}, status=500)
     except Exception as e:
-        return None, JsonResponse({'error': 'Internal server error', 'details': str(e)}, status=500)
+        return None, ApiJsonResponse({'error': 'Internal server error', 'details': str(e)}, status=500)
+
+
+def fetch_distance_matrix(origin, destinations, mode, api_key, deadline):
+    """Distance Matrix call through the distance cache; only OK bodies are cached."""
+    cache_key = (origin, destinations, mode)
+    data = _DISTANCE_CACHE.get(cache_key)
+    if data is not None:
+        return data, None
+    params = {
+        'origins': origin,
+        'destinations': destinations,
+        'mode': mode,
+        'units': 'metric',
+        'key': api_key
+    }
+    data, error_response = call_google_api(
+        _DISTANCE_MATRIX_URL, params, deadline
+    )
+    if error_response is None and data.get('status') == 'OK':
+        _DISTANCE_CACHE.set(cache_key, data)
+    return data, error_response
 
 
 @require_http_methods(["GET"])
+@with_deadline
 def reverse_geocode(request):
     """
     Free reverse-geocoding using OpenStreetMap Nominatim.
@@ -163,7 +414,13 @@ def reverse_geocode(request):
         lat_f = float(lat)
         lon_f = float(lon)
     except (TypeError, ValueError):
-        return JsonResponse({"error": "Invalid lat/lon"}, status=400)
+        return ApiJsonResponse({"error": "Invalid lat/lon"}, status=400)
+
+    geocode_key = (round(lat_f, 5), round(lon_f, 5))
+    display_name = _GEOCODE_CACHE.get(geocode_key)
+    if display_name is not None:
+        _schedule_amenity_prefetch(lat_f, lon_f)
+        return ApiJsonResponse({"display_name": display_name})
 
     headers = {
         # Nominatim asks for a real User-Agent. Browsers cannot set this reliably,
@@ -173,25 +430,32 @@ def reverse_geocode(request):
     }
 
     try:
-        resp = requests.get(
-            "https://nominatim.openstreetmap.org/reverse",
-            params={"lat": lat_f, "lon": lon_f, "format": "jsonv2"},
-            headers=headers,
-            timeout=10,
-        )
-        resp.raise_for_status()
-        data = resp.json()
+        with request.deadline.span("nominatim"), upstream_timer("nominatim"):
+            resp = requests.get(
+                f"{_NOMINATIM_URL}/reverse",
+                params={"lat": lat_f, "lon": lon_f, "format": "jsonv2"},
+                headers=headers,
+                timeout=request.deadline.timeout(),
+            )
+            resp.raise_for_status()
+            data = resp.json()
+    except DeadlineExceeded as e:
+        return ApiJsonResponse({"error": "Reverse geocoding failed", "details": str(e)}, status=504)
     except Exception as e:
-        return JsonResponse({"error": "Reverse geocoding failed", "details": str(e)}, status=502)
+        return ApiJsonResponse({"error": "Reverse geocoding failed", "details": str(e)}, status=502)
 
     display_name = (data or {}).get("display_name")
     if not display_name:
-        return JsonResponse({"error": "No address found"}, status=404)
+        return ApiJsonResponse({"error": "No address found"}, status=404)
 
-    return JsonResponse({"display_name": display_name})
+    _GEOCODE_CACHE.set(geocode_key, display_name)
+    # The amenities panel asks for this same point right after the pin drop.
+    _schedule_amenity_prefetch(lat_f, lon_f)
+    return ApiJsonResponse({"display_name": display_name})
 
 
 @require_http_methods(["GET"])
+@with_deadline
 def location_search(request):
     """
     Free forward search using OpenStreetMap Nominatim.
@@ -201,7 +465,13 @@ def location_search(request):
     """
     q = request.GET.get("q", "").strip()
     if not q:
-        return JsonResponse({"results": []})
+        return ApiJsonResponse({"results": []})
+
+    search_key = " ".join(q.lower().split())
+    results = _SEARCH_CACHE.get(search_key)
+    if results is not None:
+        _prefetch_top_result(results)
+        return ApiJsonResponse({"results": results})
 
     headers = {
         "User-Agent": "PropertyLocationPicker/1.0 (mdaliraza92@gmail.com)",
@@ -209,16 +479,19 @@ def location_search(request):
     }
 
     try:
-        resp = requests.get(
-            "https://nominatim.openstreetmap.org/search",
-            params={"q": q, "format": "jsonv2", "limit": 5},
-            headers=headers,
-            timeout=10,
-        )
-        resp.raise_for_status()
-        data = resp.json()
+        with request.deadline.span("nominatim"), upstream_timer("nominatim"):
+            resp = requests.get(
+                f"{_NOMINATIM_URL}/search",
+                params={"q": q, "format": "jsonv2", "limit": 5},
+                headers=headers,
+                timeout=request.deadline.timeout(),
+            )
+            resp.raise_for_status()
+            data = resp.json()
+    except DeadlineExceeded as e:
+        return ApiJsonResponse({"error": "Search failed", "details": str(e)}, status=504)
     except Exception as e:
-        return JsonResponse({"error": "Search failed", "details": str(e)}, status=502)
+        return ApiJsonResponse({"error": "Search failed", "details": str(e)}, status=502)
 
     results = []
     for item in data[:5]:
@@ -227,11 +500,22 @@ def location_search(request):
         lon = item.get("lon")
         if display_name and lat is not None and lon is not None:
             results.append({"display_name": display_name, "lat": lat, "lon": lon})
+    _SEARCH_CACHE.set(search_key, results)
+    _prefetch_top_result(results)
+    return ApiJsonResponse({"results": results})
 
-    return JsonResponse({"results": results})
+
+def _prefetch_top_result(results):
+    # Users nearly always pick the top suggestion; warm its amenities.
+    if results:
+        try:
+            _schedule_amenity_prefetch(float(results[0]["lat"]), float(results[0]["lon"]))
+        except (TypeError, ValueError):
+            pass
 
 
 @require_http_methods(["GET"])
+@with_deadline
 def calculate_batch_distances(request):
     """Proxy endpoint to calculate distances for multiple destinations in a single API call"""
     origin_lat = request.GET.get('origin_lat')
@@ -240,38 +524,32 @@ def calculate_batch_distances(request):
     mode = request.GET.get('mode', 'walking')
     
     if not all([origin_lat, origin_lng, destinations]):
-        return JsonResponse({'error': 'Missing required parameters'}, status=400)
+        return ApiJsonResponse({'error': 'Missing required parameters'}, status=400)
     
     api_key, error_response = get_api_key()
     if error_response:
         return error_response
     
-    url = "https://maps.googleapis.com/maps/api/distancematrix/json"
-    params = {
-        'origins': f"{origin_lat},{origin_lng}",
-        'destinations': destinations,
-        'mode': mode,
-        'units': 'metric',
-        'key': api_key
-    }
-    
-    data, error_response = call_google_api(url, params)
+    data, error_response = fetch_distance_matrix(
+        f"{origin_lat},{origin_lng}", destinations, mode, api_key, request.deadline
+    )
     if error_response:
         return error_response
     
     if data.get('status') == 'REQUEST_DENIED':
         error_msg = data.get('error_message', 'Distance Matrix API request denied')
         if 'legacy API' in error_msg.lower():
-            return JsonResponse({
+            return ApiJsonResponse({
                 'status': 'REQUEST_DENIED',
                 'error': 'Distance Matrix API (New) is not enabled. Please enable it in Google Cloud Console.',
                 'error_message': error_msg
             }, status=403)
     
-    return JsonResponse(data)
+    return ApiJsonResponse(compact_distance_matrix(data) if wants_compact(request) else data)
 
 
 @require_http_methods(["GET"])
+@with_deadline
 def calculate_batch_distances_both_modes(request):
     """Optimized endpoint to calculate both walking and driving distances in parallel"""
     origin_lat = request.GET.get('origin_lat')
@@ -279,7 +557,7 @@ def calculate_batch_distances_both_modes(request):
     destinations = request.GET.get('destinations')
     
     if not all([origin_lat, origin_lng, destinations]):
-        return JsonResponse({'error': 'Missing required parameters'}, status=400)
+        return ApiJsonResponse({'error': 'Missing required parameters'}, status=400)
     
     api_key, error_response = get_api_key()
     if error_response:
@@ -287,15 +565,9 @@ def calculate_batch_distances_both_modes(request):
     
     def fetch_distance(mode):
         """Fetch distance for a specific mode"""
-        url = "https://maps.googleapis.com/maps/api/distancematrix/json"
-        params = {
-            'origins': f"{origin_lat},{origin_lng}",
-            'destinations': destinations,
-            'mode': mode,
-            'units': 'metric',
-            'key': api_key
-        }
-        data, error_response = call_google_api(url, params)
+        data, error_response = fetch_distance_matrix(
+            f"{origin_lat},{origin_lng}", destinations, mode, api_key, request.deadline
+        )
         if error_response:
             return {'mode': mode, 'status': 'ERROR', 'data': None}
         return {'mode': mode, 'status': 'OK', 'data': data}
@@ -312,7 +584,7 @@ def calculate_batch_distances_both_modes(request):
     if walk_result.get('data') and walk_result['data'].get('status') == 'REQUEST_DENIED':
         error_msg = walk_result['data'].get('error_message', 'Distance Matrix API request denied')
         if 'legacy API' in error_msg.lower():
-            return JsonResponse({
+            return ApiJsonResponse({
                 'status': 'REQUEST_DENIED',
                 'error': 'Distance Matrix API (New) is not enabled. Please enable it in Google Cloud Console.',
                 'error_message': error_msg
@@ -321,16 +593,19 @@ def calculate_batch_distances_both_modes(request):
     if drive_result.get('data') and drive_result['data'].get('status') == 'REQUEST_DENIED':
         error_msg = drive_result['data'].get('error_message', 'Distance Matrix API request denied')
         if 'legacy API' in error_msg.lower():
-            return JsonResponse({
+            return ApiJsonResponse({
                 'status': 'REQUEST_DENIED',
                 'error': 'Distance Matrix API (New) is not enabled. Please enable it in Google Cloud Console.',
                 'error_message': error_msg
             }, status=403)
     
-    return JsonResponse({
+    walking, driving = walk_result.get('data', {}), drive_result.get('data', {})
+    if wants_compact(request):
+        walking, driving = compact_distance_matrix(walking), compact_distance_matrix(driving)
+    return ApiJsonResponse({
         'status': 'OK',
-        'walking': walk_result.get('data', {}),
-        'driving': drive_result.get('data', {})
+        'walking': walking,
+        'driving': driving
     })
 
 
@@ -349,16 +624,7 @@ def _amenity_cache_key(lat_f, lng_f):
 
 
 def _amenity_cache_get(key):
-    now = time.time()
-    with _AMENITY_CACHE_LOCK:
-        entry = _AMENITY_CACHE.get(key)
-        if not entry:
-            return None
-        payload, expires_at = entry
-        if expires_at < now:
-            _AMENITY_CACHE.pop(key, None)
-            return None
-        return payload
+    return _AMENITY_CACHE.get(key)
 
 
 def _amenity_cache_set(key, payload):
@@ -367,12 +633,26 @@ def _amenity_cache_set(key, payload):
     has_any = any((bucket.get("results") or []) for bucket in results.values())
     if not has_any:
         return
-    with _AMENITY_CACHE_LOCK:
-        _AMENITY_CACHE[key] = (payload, time.time() + _AMENITY_CACHE_TTL_SEC)
-        if len(_AMENITY_CACHE) > 200:
-            oldest = sorted(_AMENITY_CACHE.items(), key=lambda kv: kv[1][1])[:50]
-            for old_key, _ in oldest:
-                _AMENITY_CACHE.pop(old_key, None)
+    _AMENITY_CACHE.set(key, payload)
+
+
+def _amenity_bucket_cache_get(lat_f, lng_f):
+    """Per-category Overpass places still fresh for this point (bucket → places)."""
+    point = _amenity_cache_key(lat_f, lng_f)
+    found = {}
+    for bucket in _EMPTY_AMENITY_RESULTS:
+        places = _AMENITY_BUCKET_CACHE.get((*point, bucket))
+        if places is not None:
+            found[bucket] = places
+    return found
+
+
+def _amenity_bucket_cache_set(lat_f, lng_f, buckets):
+    # Only non-empty Overpass buckets: an empty one may just be a thin radius.
+    point = _amenity_cache_key(lat_f, lng_f)
+    for bucket, places in buckets.items():
+        if places:
+            _AMENITY_BUCKET_CACHE.set((*point, bucket), places)
 
 
 _EMPTY_AMENITY_RESULTS = {
@@ -408,6 +688,37 @@ _PHOTON_QUERIES = (
 )
 
 
+# Photon fallback tuning: stop once each wanted bucket holds this many places,
+# with at most this many queries in flight, and remember each query's payoff
+# ((bucket, query) → (attempts, hits)) to try the most useful ones first.
+_PHOTON_MIN_RESULTS = max(1, int(getattr(settings, 'PHOTON_MIN_RESULTS_PER_BUCKET', 3)))
+_PHOTON_MAX_PARALLEL = max(1, int(getattr(settings, 'PHOTON_MAX_PARALLEL', 5)))
+_PHOTON_POLL_SEC = 0.1
+_PHOTON_QUERY_STATS = {}
+_PHOTON_STATS_LOCK = threading.Lock()
+
+
+@contextmanager
+def upstream_timer(provider):
+    """Record an upstream call's duration and outcome (ok, timeout or error)."""
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except (requests.exceptions.Timeout, DeadlineExceeded):
+        outcome = "timeout"
+        raise
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        metrics.UPSTREAM_LATENCY.observe(time.perf_counter() - start, provider, outcome)
+
+
+def _mirror_name(url):
+    return url.split("//", 1)[-1].split("/", 1)[0]
+
+
 def _bbox_for(lat_f, lng_f, radius_m=1600):
     import math
     dlat = radius_m / 111_000.0
@@ -415,37 +726,42 @@ def _bbox_for(lat_f, lng_f, radius_m=1600):
     return f"{lng_f - dlng:.5f},{lat_f - dlat:.5f},{lng_f + dlng:.5f},{lat_f + dlat:.5f}"
 
 
-def _fetch_overpass(endpoint, query, headers, timeout_sec):
-    resp = requests.post(
-        endpoint,
-        data={"data": query},
-        headers=headers,
-        timeout=(1.2, max(1.0, timeout_sec)),
-    )
-    resp.raise_for_status()
-    payload = resp.json()
-    if not isinstance(payload, dict) or "elements" not in payload:
-        raise ValueError("Unexpected Overpass response shape")
-    remark = str(payload.get("remark") or "")
-    if remark and "error" in remark.lower():
-        raise ValueError(remark)
+def _fetch_overpass(endpoint, query, headers, deadline):
+    with upstream_timer("overpass"):
+        resp = requests.post(
+            endpoint,
+            data={"data": query},
+            headers=headers,
+            timeout=deadline.timeout(),
+        )
+        resp.raise_for_status()
+        payload = resp.json()
+        if not isinstance(payload, dict) or "elements" not in payload:
+            raise ValueError("Unexpected Overpass response shape")
+        remark = str(payload.get("remark") or "")
+        if remark and "error" in remark.lower():
+            raise ValueError(remark)
     return payload
 
 
-def _race_overpass(query, headers, budget_sec=_OVERPASS_BUDGET_SEC):
+def _race_overpass(query, headers, deadline):
     """Parallel mirror race; prefer first non-empty elements payload."""
+    if not deadline.can_start():
+        deadline.skip("overpass")
+        return None, "Request time budget exhausted"
     last_error = None
-    empty_payload = None
+    empty_payload = empty_mirror = None
+    started = time.monotonic()
     pool = ThreadPoolExecutor(max_workers=len(_OVERPASS_ENDPOINTS))
-    futures = [
-        pool.submit(_fetch_overpass, url, query, headers, budget_sec)
+    mirrors = {
+        pool.submit(_fetch_overpass, url, query, headers, deadline): _mirror_name(url)
         for url in _OVERPASS_ENDPOINTS
-    ]
+    }
+    futures = list(mirrors)
     pending = set(futures)
     try:
-        deadline = time.monotonic() + budget_sec
         while pending:
-            remaining = deadline - time.monotonic()
+            remaining = deadline.remaining()
             if remaining <= 0:
                 break
             done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
@@ -455,31 +771,38 @@ def _race_overpass(query, headers, budget_sec=_OVERPASS_BUDGET_SEC):
                 try:
                     payload = fut.result()
                     if payload.get("elements"):
+                        metrics.OVERPASS_RACE.inc("won", mirrors[fut])
                         return payload, None
+                    if empty_payload is None:
+                        empty_mirror = mirrors[fut]
                     empty_payload = payload
                 except Exception as exc:
                     last_error = str(exc)
         if empty_payload is not None:
+            metrics.OVERPASS_RACE.inc("empty", empty_mirror)
             return empty_payload, None
+        metrics.OVERPASS_RACE.inc("failed" if last_error else "timeout", "")
         return None, last_error or "Overpass timed out"
     finally:
+        deadline.record("overpass", time.monotonic() - started)
         for fut in futures:
             fut.cancel()
         pool.shutdown(wait=False, cancel_futures=True)
 
 
-def _photon_fetch(lat_f, lng_f, bucket_key, query, osm_tag, headers, bbox):
+def _photon_fetch(lat_f, lng_f, bucket_key, query, osm_tag, headers, bbox, deadline):
     params = {"q": query, "limit": 8, "bbox": bbox}
     if osm_tag:
         params["osm_tag"] = osm_tag
-    resp = requests.get(
-        "https://photon.komoot.io/api/",
-        params=params,
-        headers=headers,
-        timeout=(1.0, 2.5),
-    )
-    resp.raise_for_status()
-    data = resp.json()
+    with upstream_timer("photon"):
+        resp = requests.get(
+            _PHOTON_URL,
+            params=params,
+            headers=headers,
+            timeout=deadline.timeout(connect=1.0),
+        )
+        resp.raise_for_status()
+        data = resp.json()
     places = []
     for feature in (data.get("features") or []):
         props = feature.get("properties") or {}
@@ -507,30 +830,119 @@ def _photon_fetch(lat_f, lng_f, bucket_key, query, osm_tag, headers, bbox):
     return bucket_key, places
 
 
-def _fetch_photon_amenities(lat_f, lng_f, headers):
-    """Parallel Photon lookups with bbox — typically 1–2s."""
+class _AmenityProgress:
+    """
+    Places found so far by the Overpass and Photon legs of one lookup, so the
+    Photon fallback can skip buckets that are already filled and stop early.
+    """
+
+    def __init__(self, wanted, minimum):
+        self.wanted = tuple(wanted)
+        self.minimum = minimum
+        self._lock = threading.Lock()
+        self._counts = {key: 0 for key in _EMPTY_AMENITY_RESULTS}
+
+    def add(self, bucket_key, count):
+        with self._lock:
+            self._counts[bucket_key] += count
+
+    def satisfied(self, bucket_key):
+        with self._lock:
+            return bucket_key not in self.wanted or self._counts[bucket_key] >= self.minimum
+
+    def complete(self):
+        return all(self.satisfied(key) for key in self.wanted)
+
+
+def _photon_query_order(wanted):
+    """Photon queries for the wanted buckets, best historical payoff first."""
+    with _PHOTON_STATS_LOCK:
+        stats = dict(_PHOTON_QUERY_STATS)
+
+    def payoff(entry):
+        attempts, hits = stats.get(entry[:2], (0, 0))
+        # Laplace-smoothed hit rate so untried queries start at 0.5.
+        return (hits + 1) / (attempts + 2)
+
+    candidates = [entry for entry in _PHOTON_QUERIES if entry[0] in wanted]
+    return sorted(candidates, key=payoff, reverse=True)
+
+
+def _record_photon_payoff(bucket_key, query, hit):
+    with _PHOTON_STATS_LOCK:
+        attempts, hits = _PHOTON_QUERY_STATS.get((bucket_key, query), (0, 0))
+        _PHOTON_QUERY_STATS[(bucket_key, query)] = (attempts + 1, hits + (1 if hit else 0))
+
+
+def _fetch_photon_amenities(lat_f, lng_f, headers, deadline, progress=None):
+    """
+    Photon lookups with bbox, a few at a time in payoff order. Buckets that
+    already hold enough places (from Photon or Overpass) are not queried, and
+    the fallback returns as soon as every wanted bucket is satisfied. Queries
+    left out are reported per query on the deadline: photon_satisfied when
+    their bucket was already full, photon_skipped when time ran out.
+    """
     buckets = {key: [] for key in _EMPTY_AMENITY_RESULTS}
+    if progress is None:
+        progress = _AmenityProgress(_EMPTY_AMENITY_RESULTS, _PHOTON_MIN_RESULTS)
+    queue = _photon_query_order(progress.wanted)
+    if not deadline.can_start():
+        _note_photon_dropped(queue, progress, deadline)
+        return buckets
     bbox = _bbox_for(lat_f, lng_f)
-    pool = ThreadPoolExecutor(max_workers=len(_PHOTON_QUERIES))
-    futures = [
-        pool.submit(_photon_fetch, lat_f, lng_f, bucket, query, osm_tag, headers, bbox)
-        for bucket, query, osm_tag in _PHOTON_QUERIES
-    ]
+    started = time.monotonic()
+    pool = ThreadPoolExecutor(max_workers=_PHOTON_MAX_PARALLEL)
+    running = {}
     try:
-        done, _pending = wait(futures, timeout=3.0)
-        for fut in done:
-            try:
-                bucket_key, places = fut.result()
+        while (queue or running) and not progress.complete():
+            while queue and len(running) < _PHOTON_MAX_PARALLEL:
+                if not deadline.can_start():
+                    break
+                bucket, query, osm_tag = queue.pop(0)
+                if progress.satisfied(bucket):
+                    deadline.record("photon_satisfied", 0.0)
+                    continue
+                fut = pool.submit(
+                    _photon_fetch, lat_f, lng_f, bucket, query, osm_tag, headers, bbox, deadline
+                )
+                running[fut] = (bucket, query)
+            if not running:
+                break
+            remaining = deadline.remaining()
+            if remaining <= 0:
+                break
+            # Short poll so a bucket filled by Overpass meanwhile is noticed quickly.
+            done, _pending = wait(
+                running, timeout=min(remaining, _PHOTON_POLL_SEC), return_when=FIRST_COMPLETED
+            )
+            for fut in done:
+                bucket, query = running.pop(fut)
+                try:
+                    bucket_key, places = fut.result()
+                except Exception:
+                    _record_photon_payoff(bucket, query, False)
+                    continue
+                _record_photon_payoff(bucket, query, bool(places))
                 buckets[bucket_key].extend(places)
-            except Exception:
-                continue
+                progress.add(bucket_key, len(places))
     finally:
-        for fut in futures:
+        deadline.record("photon", time.monotonic() - started)
+        _note_photon_dropped(queue, progress, deadline)
+        for fut in running:
             fut.cancel()
         pool.shutdown(wait=False, cancel_futures=True)
     return buckets
 
 
+def _note_photon_dropped(queue, progress, deadline):
+    """Account for queries never started: bucket already satisfied, or out of time."""
+    for bucket, _query, _osm_tag in queue:
+        if progress.satisfied(bucket):
+            deadline.record("photon_satisfied", 0.0)
+        else:
+            deadline.skip("photon")
+
+
 def _merge_buckets(*bucket_maps):
     merged = {key: [] for key in _EMPTY_AMENITY_RESULTS}
     for buckets in bucket_maps:
@@ -629,79 +1041,55 @@ def _finalize_buckets(lat_f, lng_f, buckets):
     return results
 
 
-@require_http_methods(["GET"])
-def fetch_all_amenities(request):
+def _lookup_amenities(lat_f, lng_f, deadline):
     """
-    Nearby amenities (free): Overpass race first, Photon parallel fallback.
-    Hard ~5s budget, short cache, response shape for amenities.js.
-    """
-    lat = request.GET.get('lat')
-    lng = request.GET.get('lng')
-
-    if not lat or not lng:
-        return JsonResponse({'error': 'Missing required parameters: lat, lng'}, status=400)
-
-    try:
-        lat_f = float(lat)
-        lng_f = float(lng)
-    except (TypeError, ValueError):
-        return JsonResponse({'error': 'Invalid lat/lng'}, status=400)
-
-    cache_key = _amenity_cache_key(lat_f, lng_f)
-    cached = _amenity_cache_get(cache_key)
-    if cached is not None:
-        return JsonResponse(cached)
-
-    headers = {
-        "User-Agent": "PropertyLocationPicker/1.0 (mdaliraza92@gmail.com)",
-        "Accept": "application/json",
-    }
-
-    radius_m = 1500
-    query = f"""
-    [out:json][timeout:4];
-    (
-      nwr["railway"="station"](around:{radius_m},{lat_f},{lng_f});
-      nwr["railway"="halt"](around:{radius_m},{lat_f},{lng_f});
-      node["railway"="subway_entrance"](around:{radius_m},{lat_f},{lng_f});
-      nwr["public_transport"="station"]["subway"="yes"](around:{radius_m},{lat_f},{lng_f});
-      nwr["public_transport"="station"]["station"="subway"](around:{radius_m},{lat_f},{lng_f});
-      nwr["public_transport"="station"]["station"="metro"](around:{radius_m},{lat_f},{lng_f});
-      nwr["amenity"="hospital"](around:{radius_m},{lat_f},{lng_f});
-      nwr["amenity"="clinic"](around:{radius_m},{lat_f},{lng_f});
-      nwr["amenity"="school"](around:{radius_m},{lat_f},{lng_f});
-      nwr["amenity"="bank"](around:{radius_m},{lat_f},{lng_f});
-      nwr["amenity"="university"](around:{radius_m},{lat_f},{lng_f});
-      nwr["amenity"="college"](around:{radius_m},{lat_f},{lng_f});
-    );
-    out center tags;
+    Race Photon (fast) and Overpass (richer) for one point within deadline.
+    Returns (payload, last_error); payload is None when nothing came back.
     """
+    lookup_deadline = deadline.child(_AMENITY_MERGE_RESERVE_SEC)
+    overpass_deadline = deadline.child(_OVERPASS_RESERVE_SEC)
+    photon_deadline = deadline.child(_PHOTON_RESERVE_SEC)
+    cached_buckets = _amenity_bucket_cache_get(lat_f, lng_f)
+    missing = [key for key in _EMPTY_AMENITY_RESULTS if key not in cached_buckets]
+    if not missing:
+        results = _finalize_buckets(lat_f, lng_f, cached_buckets)
+        return {"status": "OK", "results": results}, None
+
+    # Ask the server to give up when we would, so it stops burning CPU for us.
+    plan = build_overpass_query(lat_f, lng_f, missing, overpass_deadline.remaining())
 
     # Race Photon (fast) and Overpass (richer) in parallel; merge whatever arrives in budget.
     overpass_buckets = {key: [] for key in _EMPTY_AMENITY_RESULTS}
     photon_buckets = {key: [] for key in _EMPTY_AMENITY_RESULTS}
+    progress = _AmenityProgress(missing, _PHOTON_MIN_RESULTS)
     last_error = None
 
     pool = ThreadPoolExecutor(max_workers=2)
 
     def run_overpass():
-        data, err = _race_overpass(query, headers, budget_sec=3.5)
+        data, err = _race_overpass(plan.query, _OSM_HEADERS, overpass_deadline)
         local = {key: [] for key in _EMPTY_AMENITY_RESULTS}
         if data and data.get("elements"):
+            record_density(lat_f, lng_f, plan, group_counts(plan, data["elements"]))
             for el in data["elements"]:
                 tags = el.get("tags", {}) or {}
                 key = _classify_osm_tags(tags)
-                if not key:
+                if key not in plan.buckets:
                     continue
                 place = _el_to_place(el, key)
                 if place:
                     local[key].append(place)
+            _amenity_bucket_cache_set(lat_f, lng_f, local)
+            for key, places in local.items():
+                progress.add(key, len(places))
         return local, err
 
     fut_overpass = pool.submit(run_overpass)
-    fut_photon = pool.submit(_fetch_photon_amenities, lat_f, lng_f, headers)
+    fut_photon = pool.submit(
+        _fetch_photon_amenities, lat_f, lng_f, _OSM_HEADERS, photon_deadline, progress
+    )
     try:
-        done, _pending = wait([fut_overpass, fut_photon], timeout=4.5)
+        done, _pending = wait([fut_overpass, fut_photon], timeout=lookup_deadline.remaining())
         if fut_photon in done:
             try:
                 photon_buckets = fut_photon.result()
@@ -719,16 +1107,435 @@ def fetch_all_amenities(request):
         fut_photon.cancel()
         pool.shutdown(wait=False, cancel_futures=True)
 
-    buckets = _merge_buckets(photon_buckets, overpass_buckets)
-
+    buckets = _merge_buckets(cached_buckets, photon_buckets, overpass_buckets)
     if not any(buckets.values()):
-        return JsonResponse({
+        return None, last_error
+
+    results = _finalize_buckets(lat_f, lng_f, buckets)
+    return {"status": "OK", "results": results}, None
+
+
+def _begin_amenity_lookup(cache_key):
+    """
+    Claim the lookup for cache_key. Returns (future, owner); when another
+    request or a prefetch already owns it, owner is False and the caller
+    should wait on the shared future instead of hitting the providers again.
+    """
+    with _AMENITY_INFLIGHT_LOCK:
+        fut = _AMENITY_INFLIGHT.get(cache_key)
+        if fut is not None:
+            return fut, False
+        fut = Future()
+        _AMENITY_INFLIGHT[cache_key] = fut
+        return fut, True
+
+
+def _run_amenity_lookup(cache_key, lat_f, lng_f, fut, deadline, prefetch=False):
+    """Owner side of an in-flight lookup: fetch, cache, then release waiters."""
+    outcome = (None, "Amenities providers unavailable")
+    try:
+        outcome = _lookup_amenities(lat_f, lng_f, deadline)
+        if outcome[0] is not None:
+            _amenity_cache_set(cache_key, dict(outcome[0], **{_PREFETCH_MARK: True}) if prefetch else outcome[0])
+    except Exception as exc:
+        outcome = (None, str(exc))
+    finally:
+        with _AMENITY_INFLIGHT_LOCK:
+            _AMENITY_INFLIGHT.pop(cache_key, None)
+        fut.set_result(outcome)
+    return outcome
+
+
+def _prefetch_stat(name, amount=1):
+    metrics.AMENITY_PREFETCH.inc(name, amount=amount)
+
+
+def _note_prefetch_used(cache_key, payload):
+    """
+    Count a live request served by a prefetched entry (cache hit or join)
+    and re-cache it unmarked, so later requests don't count it again.
+    Returns the payload without the mark.
+    """
+    if not payload.get(_PREFETCH_MARK):
+        return payload
+    payload = {k: v for k, v in payload.items() if k != _PREFETCH_MARK}
+    _prefetch_stat("used")
+    _amenity_cache_set(cache_key, payload)
+    return payload
+
+
+def _run_prefetch(cache_key, lat_f, lng_f, fut):
+    global _PREFETCH_ACTIVE
+    try:
+        payload, _err = _run_amenity_lookup(cache_key, lat_f, lng_f, fut, Deadline.from_settings(), prefetch=True)
+        _prefetch_stat("failed" if payload is None else "completed")
+    finally:
+        with _PREFETCH_LOCK:
+            _PREFETCH_ACTIVE -= 1
+        metrics.AMENITY_PREFETCH_ACTIVE.dec()
+
+
+def _schedule_amenity_prefetch(lat_f, lng_f):
+    """
+    Start warming the amenity cache for a point the user is looking at.
+    Skips points that are cached or already being fetched, and drops the
+    prefetch outright when the concurrency cap is reached.
+    """
+    global _PREFETCH_ACTIVE
+    if not getattr(settings, 'AMENITY_PREFETCH_ENABLED', True):
+        return
+    cache_key = _amenity_cache_key(lat_f, lng_f)
+    if _AMENITY_CACHE.peek(cache_key):
+        _prefetch_stat("skipped_cached")
+        return
+
+    with _PREFETCH_LOCK:
+        if _PREFETCH_ACTIVE >= _PREFETCH_MAX_CONCURRENT:
+            _prefetch_stat("dropped")
+            return
+        _PREFETCH_ACTIVE += 1
+
+    fut, owner = _begin_amenity_lookup(cache_key)
+    if not owner:
+        with _PREFETCH_LOCK:
+            _PREFETCH_ACTIVE -= 1
+        _prefetch_stat("skipped_inflight")
+        return
+
+    # Marked before the lookup starts so a request joining it counts as a use.
+    fut.prefetch = True
+    metrics.AMENITY_PREFETCH_ACTIVE.inc()
+    try:
+        _PREFETCH_POOL.submit(_run_prefetch, cache_key, lat_f, lng_f, fut)
+    except RuntimeError:
+        # Pool is shutting down (worker exit); release waiters and move on.
+        with _AMENITY_INFLIGHT_LOCK:
+            _AMENITY_INFLIGHT.pop(cache_key, None)
+        fut.set_result((None, "Prefetch unavailable"))
+        with _PREFETCH_LOCK:
+            _PREFETCH_ACTIVE -= 1
+        metrics.AMENITY_PREFETCH_ACTIVE.dec()
+        return
+    _prefetch_stat("scheduled")
+
+
+@require_http_methods(["GET"])
+@with_deadline
+def fetch_all_amenities(request):
+    """
+    Nearby amenities (free): Overpass race first, Photon parallel fallback.
+    Bounded by the request deadline (~5s), short cache, response shape for amenities.js.
+    """
+    lat = request.GET.get('lat')
+    lng = request.GET.get('lng')
+
+    if not lat or not lng:
+        return ApiJsonResponse({'error': 'Missing required parameters: lat, lng'}, status=400)
+
+    try:
+        lat_f = float(lat)
+        lng_f = float(lng)
+    except (TypeError, ValueError):
+        return ApiJsonResponse({'error': 'Invalid lat/lng'}, status=400)
+
+    cache_key = _amenity_cache_key(lat_f, lng_f)
+    compact = wants_compact(request)
+    cached = _amenity_cache_get(cache_key)
+    if cached is not None:
+        cached = _note_prefetch_used(cache_key, cached)
+        return ApiJsonResponse(compact_amenities(cached) if compact else cached)
+
+    fut, owner = _begin_amenity_lookup(cache_key)
+    if owner:
+        payload, last_error = _run_amenity_lookup(cache_key, lat_f, lng_f, fut, request.deadline)
+    else:
+        # A prefetch (or a concurrent request) is already fetching this point.
+        try:
+            with request.deadline.span("amenity_join"):
+                payload, last_error = fut.result(timeout=request.deadline.remaining())
+        except FutureTimeoutError:
+            payload, last_error = None, "Amenities lookup timed out"
+        with _PREFETCH_LOCK:
+            joined_prefetch, fut.prefetch = getattr(fut, 'prefetch', False), False
+        if payload is not None and joined_prefetch:
+            # The prefetch cached it marked; this join is the use that counts.
+            _prefetch_stat("used")
+            _amenity_cache_set(cache_key, payload)
+
+    if payload is None:
+        return ApiJsonResponse({
             "status": "ERROR",
             "error": last_error or "Amenities providers unavailable",
             "results": {k: dict(v) for k, v in _EMPTY_AMENITY_RESULTS.items()},
         }, status=502)
 
-    results = _finalize_buckets(lat_f, lng_f, buckets)
-    payload = {"status": "OK", "results": results}
-    _amenity_cache_set(cache_key, payload)
-    return JsonResponse(payload)
+    return ApiJsonResponse(compact_amenities(payload) if compact else payload)
+
+
+@require_http_methods(["GET"])
+def amenity_prefetch_stats(request):
+    """
+    Prefetch counters summed over all web workers (as on /metrics);
+    hit_ratio is the share of completed prefetches later served.
+    """
+    metrics.flush()
+    merged = metrics.collect()
+    counts = merged['amenity_prefetch_total']
+    stats = {name: int(counts.get((name,), 0)) for name in _PREFETCH_RESULTS}
+    stats["active"] = int(merged['amenity_prefetch_active'].get((), 0))
+    completed = stats["completed"]
+    stats["hit_ratio"] = round(stats["used"] / completed, 4) if completed else None
+    return ApiJsonResponse(stats)
+
+
+@require_http_methods(["GET"])
+def metrics_export(request):
+    """
+    Prometheus scrape endpoint: request, model, upstream and cache metrics
+    for all web workers, or for a management command with ?source=<command>.
+    """
+    if not metrics.enabled():
+        return ApiJsonResponse({'error': 'Metrics are disabled'}, status=404)
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return ApiJsonResponse({'error': 'Unauthorized'}, status=401)
+    source = request.GET.get('source') or metrics.WEB_SOURCE
+    if source not in metrics.sources():
+        return ApiJsonResponse({'error': f'Unknown metrics source: {source}', 'sources': metrics.sources()},
+                               status=404)
+    return HttpResponse(metrics.render(source), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def _parse_comparable_subject(data):
+    """Subject dict for find_comparables from query params or a JSON object."""
+    subject = {
+        'latitude': float(data.get('latitude', data.get('lat'))),
+        'longitude': float(data.get('longitude', data.get('lng', data.get('lon')))),
+        'living_area': float(data.get('living_area', 0) or 0),
+        'bedrooms': float(data.get('bedrooms', 0) or 0),
+        'bathrooms': float(data.get('bathrooms', 0) or 0),
+        'property_type': data.get('property_type', ''),
+    }
+    if not (-90 <= subject['latitude'] <= 90) or not (-180 <= subject['longitude'] <= 180):
+        raise ValueError("Latitude/longitude out of range")
+    return subject
+
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+def comparable_sales(request):
+    """
+    Top-k comparable sales from the training dataset.
+
+    GET  ?lat=&lng=&living_area=&bedrooms=&bathrooms=&property_type=&k=&mode=
+    POST {"subjects": [{...}, ...], "k": 5, "mode": "similar"|"nearby"}
+
+    Returns:
+      { "mode": "...", "results": [ [ {sale}, ... ], ... ] }  (one list per subject)
+    """
+    if request.method == 'POST':
+        try:
+            body = json.loads(request.body or b'{}')
+        except ValueError:
+            return ApiJsonResponse({'error': 'Invalid JSON body'}, status=400)
+        raw_subjects = body.get('subjects') or []
+        k = body.get('k', 5)
+        mode = body.get('mode', 'similar')
+    else:
+        raw_subjects = [request.GET]
+        k = request.GET.get('k', 5)
+        mode = request.GET.get('mode', 'similar')
+
+    if not isinstance(raw_subjects, list) or not raw_subjects:
+        return ApiJsonResponse({'error': 'No subjects given'}, status=400)
+    if mode not in ('similar', 'nearby'):
+        return ApiJsonResponse({'error': 'mode must be "similar" or "nearby"'}, status=400)
+    try:
+        k = max(1, min(int(k), _COMPARABLES_MAX_K))
+        subjects = [_parse_comparable_subject(item) for item in raw_subjects]
+    except (TypeError, ValueError, AttributeError) as e:
+        return ApiJsonResponse({'error': 'Invalid subject', 'details': str(e)}, status=400)
+    if mode == 'similar' and any(
+        s['living_area'] <= 0 or not s['property_type'] for s in subjects
+    ):
+        return ApiJsonResponse({'error': 'living_area and property_type are required for mode=similar'}, status=400)
+
+    results = find_comparables(subjects, k=k, mode=mode)
+    return ApiJsonResponse({'mode': mode, 'results': results})
+
+
+_TILE_IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+_TILE_MAX_AGE = 3600
+
+
+def _tile_cache_headers(response, request, tileset):
+    """Versioned URLs (?v=<tileset>) never change; unversioned ones revalidate hourly."""
+    if request.GET.get('v') == tileset['tileset']:
+        response['Cache-Control'] = f'public, max-age={_TILE_IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        response['Cache-Control'] = f'public, max-age={_TILE_MAX_AGE}'
+    return response
+
+
+@require_http_methods(["GET"])
+def price_tile_manifest(request):
+    """Layers, zoom range, covered regions and price legend of the current tileset."""
+    tileset = price_tiles.current_tileset()
+    if tileset is None:
+        return ApiJsonResponse({'error': 'Price tiles have not been generated'}, status=404)
+    response = ApiJsonResponse(price_tiles.public_manifest(tileset))
+    response['Cache-Control'] = 'public, max-age=300'
+    return response
+
+
+@require_http_methods(["GET"])
+def price_tile(request, layer, z, x, y, fmt):
+    """
+    One price-surface tile: a palette PNG for the map, or the raw quantised
+    uint8 cells (fmt='bin'). Tiles outside the covered area are 204.
+    """
+    tileset = price_tiles.current_tileset()
+    if tileset is None:
+        return ApiJsonResponse({'error': 'Price tiles have not been generated'}, status=404)
+    etag = f'"{tileset["tileset"]}:{layer}:{z}:{x}:{y}:{fmt}"'
+    if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+        response = HttpResponse(status=304)
+    else:
+        if fmt == 'png':
+            body = price_tiles.tile_png(tileset, layer, z, x, y)
+            content_type = 'image/png'
+        else:
+            body = price_tiles.read_tile(tileset, layer, z, x, y)
+            content_type = 'application/octet-stream'
+        if body is None:
+            response = HttpResponse(status=204)
+        else:
+            response = HttpResponse(body, content_type=content_type)
+            if fmt == 'bin':
+                response['X-Tile-Cells'] = str(tileset['cells'])
+                response['X-Tile-Log-Price-Range'] = ','.join(str(v) for v in tileset['scale'])
+    response['ETag'] = etag
+    return _tile_cache_headers(response, request, tileset)
+
+
+# What-if sweeps: API name → model input name, and limits per request.
+_WHAT_IF_FEATURES = {
+    'bedrooms': 'number of bedrooms',
+    'bathrooms': 'number of bathrooms',
+    'living_area': 'living area',
+    'lot_area': 'lot area',
+    'floor': 'floor',
+    'latitude': 'Lattitude',
+    'longitude': 'Longitude',
+    'property_type': 'property_type',
+}
+_WHAT_IF_INTEGER = {'bedrooms', 'living_area', 'lot_area', 'floor'}
+_WHAT_IF_MAX_STEPS = 200
+_WHAT_IF_MAX_POINTS = 40000
+
+
+def _what_if_values(spec):
+    """Values for one swept feature from {"feature", "values"} or {"feature", "start", "stop", "steps"}."""
+    feature = spec.get('feature')
+    if feature not in _WHAT_IF_FEATURES:
+        raise ValueError(f"feature must be one of: {', '.join(_WHAT_IF_FEATURES)}")
+    if feature == 'property_type':
+        values = np.array([str(v) for v in spec.get('values') or []])
+    elif 'values' in spec:
+        values = np.array(spec['values'], dtype=np.float64)
+    else:
+        steps = int(spec.get('steps', 50))
+        if steps < 2:
+            raise ValueError(f"{feature}: steps must be at least 2")
+        values = np.linspace(float(spec['start']), float(spec['stop']), min(steps, _WHAT_IF_MAX_STEPS))
+    if feature in _WHAT_IF_INTEGER:
+        # Keep order, drop duplicates created by rounding.
+        values = np.rint(values)
+        values = values[np.sort(np.unique(values, return_index=True)[1])]
+    if values.ndim != 1 or not len(values):
+        raise ValueError(f"{feature}: no values to sweep")
+    if len(values) > _WHAT_IF_MAX_STEPS:
+        raise ValueError(f"{feature}: at most {_WHAT_IF_MAX_STEPS} values per feature")
+    if feature in ('bedrooms', 'bathrooms', 'living_area', 'lot_area') and (values <= 0).any():
+        raise ValueError(f"{feature} must be greater than 0")
+    if feature == 'latitude' and (np.abs(values) > 90).any():
+        raise ValueError("Latitude must be between -90 and 90")
+    if feature == 'longitude' and (np.abs(values) > 180).any():
+        raise ValueError("Longitude must be between -180 and 180")
+    return feature, values
+
+
+def _json_values(values):
+    return values.tolist() if values.dtype.kind in 'US' else [float(v) for v in values]
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def what_if(request):
+    """
+    Price sensitivity to one or two features around a base property, scored
+    in a single batched model call.
+
+    POST {"base": {bedrooms, bathrooms, living_area, lot_area, floor,
+                   property_type, latitude, longitude},
+          "sweep": [{"feature": "living_area", "start": 800, "stop": 4000, "steps": 100},
+                    {"feature": "bathrooms", "values": [1, 2, 3]}],
+          "tier": optional "fast"|"balanced"|"full", or "latency_budget_ms"}
+
+    Returns:
+      1 feature:  {"base_price", "x": {"feature", "values"}, "prices": [...]}
+      2 features: {"base_price", "x": {...}, "y": {...}, "prices": [[...]]}
+                  (prices[i][j] is y.values[i] with x.values[j])
+    """
+    started = time.perf_counter()
+    try:
+        body = json.loads(request.body or b'{}')
+    except ValueError:
+        return ApiJsonResponse({'error': 'Invalid JSON body'}, status=400)
+    sweep = body.get('sweep')
+    if isinstance(sweep, dict):
+        sweep = [sweep]
+    if not isinstance(sweep, list) or not 1 <= len(sweep) <= 2:
+        return ApiJsonResponse({'error': 'sweep must list one or two features'}, status=400)
+
+    try:
+        form_data = extract_form_data(body.get('base') or {})
+        validate_form_data(form_data)
+        axes = [_what_if_values(spec) for spec in sweep]
+        tier, _ = get_prediction_tier(body)
+    except (TypeError, ValueError, KeyError, AttributeError) as e:
+        return ApiJsonResponse({'error': 'Invalid request', 'details': str(e)}, status=400)
+    if len(axes) == 2 and axes[0][0] == axes[1][0]:
+        return ApiJsonResponse({'error': 'Sweep two different features'}, status=400)
+    points = int(np.prod([len(values) for _, values in axes]))
+    if points > _WHAT_IF_MAX_POINTS:
+        return ApiJsonResponse({'error': f'At most {_WHAT_IF_MAX_POINTS} grid points per request'}, status=400)
+
+    # Grid rows followed by the unchanged base property as the last row.
+    base = prepare_model_input(form_data)
+    columns = dict(base)
+    grids = np.meshgrid(*[values for _, values in axes]) if len(axes) == 2 else [axes[0][1]]
+    for (feature, _values), grid in zip(axes, grids):
+        name = _WHAT_IF_FEATURES[feature]
+        columns[name] = np.append(grid.ravel(), base[name])
+    try:
+        prices = predict_house_prices(columns, tier=tier)
+    except (ValueError, KeyError, TypeError) as e:
+        return ApiJsonResponse({'error': 'Prediction failed', 'details': str(e)}, status=400)
+
+    base_price = float(prices[-1])
+    grid_prices = np.round(prices[:-1], 2)
+    payload = {
+        'base_price': base_price,
+        'formatted_base_price': format_price(base_price),
+        'x': {'feature': axes[0][0], 'values': _json_values(axes[0][1])},
+        'points': points,
+        'tier': tier,
+    }
+    if len(axes) == 2:
+        payload['y'] = {'feature': axes[1][0], 'values': _json_values(axes[1][1])}
+        payload['prices'] = grid_prices.reshape(len(axes[1][1]), len(axes[0][1])).tolist()
+    else:
+        payload['prices'] = grid_prices.tolist()
+    payload['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return ApiJsonResponse(payload)
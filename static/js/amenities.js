@@ -52,10 +52,18 @@ function fetchAmenities(propertyLat, propertyLng) {
             type: amenityType.name,
             walkingDistance: 'Calculating...',
             drivingDistance: 'Calculating...',
-            location: { lat: place.geometry.location.lat, lng: place.geometry.location.lng }
+            location: placeLocation(place)
         };
     }
 
+    // Compact responses carry lat/lng on the place itself.
+    function placeLocation(place) {
+        if (place.geometry && place.geometry.location) {
+            return { lat: place.geometry.location.lat, lng: place.geometry.location.lng };
+        }
+        return place.lat != null && place.lng != null ? { lat: place.lat, lng: place.lng } : null;
+    }
+
     function setAllDistancesToNA() {
         amenities.forEach(amenity => {
             amenity.walkingDistance = 'N/A';
@@ -101,7 +109,7 @@ function fetchAmenities(propertyLat, propertyLng) {
     }
 
     function placeDistanceKm(place) {
-        const loc = place.geometry && place.geometry.location;
+        const loc = placeLocation(place);
         if (!loc) return Number.POSITIVE_INFINITY;
         return calculateDistance(propertyLat, propertyLng, loc.lat, loc.lng);
     }
@@ -233,7 +241,7 @@ function fetchAmenities(propertyLat, propertyLng) {
             const controller = typeof AbortController !== 'undefined' ? new AbortController() : null;
             const abortTimer = controller ? setTimeout(() => controller.abort(), TIMEOUT) : null;
             const response = await fetch(
-                `/house-price-prediction/api/all-amenities/?lat=${propertyLat}&lng=${propertyLng}`,
+                `/house-price-prediction/api/all-amenities/?lat=${propertyLat}&lng=${propertyLng}&compact=1`,
                 controller ? { signal: controller.signal } : undefined
             );
             if (abortTimer) clearTimeout(abortTimer);
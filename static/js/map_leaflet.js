@@ -18,6 +18,15 @@ function updateStatus(statusDiv, text, className, hideIfEmpty = false) {
     statusDiv.className = className || '';
 }
 
+// Marker images: fingerprinted URLs from the template, plain paths otherwise.
+function leafletIconUrls() {
+    return window.LEAFLET_ICON_URLS || {
+        iconUrl: '/static/images/leaflet/marker-icon.png',
+        iconRetinaUrl: '/static/images/leaflet/marker-icon-2x.png',
+        shadowUrl: '/static/images/leaflet/marker-shadow.png'
+    };
+}
+
 function placeMarker(latlng) {
     const latInput = document.getElementById('latitude');
     const lonInput = document.getElementById('longitude');
@@ -29,9 +38,7 @@ function placeMarker(latlng) {
     if (!window.__leafletDefaultIcon) {
         // Explicit icon with local static URLs so Leaflet doesn't rely on its default assets.
         window.__leafletDefaultIcon = L.icon({
-            iconUrl: '/static/images/leaflet/marker-icon.png',
-            iconRetinaUrl: '/static/images/leaflet/marker-icon-2x.png',
-            shadowUrl: '/static/images/leaflet/marker-shadow.png',
+            ...leafletIconUrls(),
             iconSize: [25, 41],
             iconAnchor: [12, 41],
             popupAnchor: [1, -34],
@@ -269,12 +276,8 @@ window.initMapPicker = function () {
 
     // Fix default icon paths (Leaflet expects relative assets)
     if (L && L.Icon && L.Icon.Default) {
-        L.Icon.Default.mergeOptions({
-            // Use local static assets (no external CDN dependency).
-            iconRetinaUrl: '/static/images/leaflet/marker-icon-2x.png',
-            iconUrl: '/static/images/leaflet/marker-icon.png',
-            shadowUrl: '/static/images/leaflet/marker-shadow.png',
-        });
+        // Use local static assets (no external CDN dependency).
+        L.Icon.Default.mergeOptions(leafletIconUrls());
     }
 
     // Create map
@@ -296,8 +299,50 @@ window.initMapPicker = function () {
 
     setupButtons();
     setupLocationSearch();
+    setupPriceOverlay();
 };
 
+// Optional heat map of precomputed model prices (manage.py build_price_tiles).
+function setupPriceOverlay() {
+    fetch('api/price-tiles/manifest/')
+        .then(response => (response.ok ? response.json() : null))
+        .then(manifest => {
+            if (!manifest || !window.map) return;
+            const select = document.getElementById('property_type');
+            const types = [...new Set(manifest.layers.map(layer => layer.property_type))];
+            const layerFor = type => `${types.includes(type) ? type : types[0]}-standard`;
+            const urlFor = type =>
+                `api/price-tiles/${encodeURIComponent(layerFor(type))}/{z}/{x}/{y}.png?v=${manifest.tileset}`;
+
+            const overlay = L.tileLayer(urlFor(select ? select.value : ''), {
+                minNativeZoom: manifest.min_zoom,
+                maxNativeZoom: manifest.max_zoom,
+                minZoom: Math.max(0, manifest.min_zoom - 2),
+                opacity: 0.6,
+                className: 'price-tiles',
+                attribution: 'Price estimates: model v' + manifest.model_version,
+            });
+            L.control.layers(null, { 'Estimated prices': overlay }, { collapsed: true }).addTo(window.map);
+
+            const legend = L.control({ position: 'bottomleft' });
+            legend.onAdd = function () {
+                const div = L.DomUtil.create('div', 'price-legend');
+                const fmt = value => '₹' + (value / 100000).toFixed(0) + 'L';
+                div.innerHTML = `<span>${fmt(manifest.legend[0])}</span>` +
+                    '<span class="price-legend-bar"></span>' +
+                    `<span>${fmt(manifest.legend[manifest.legend.length - 1])}</span>`;
+                return div;
+            };
+            window.map.on('overlayadd', e => { if (e.layer === overlay) legend.addTo(window.map); });
+            window.map.on('overlayremove', e => { if (e.layer === overlay) legend.remove(); });
+
+            if (select) {
+                select.addEventListener('change', () => overlay.setUrl(urlFor(select.value)));
+            }
+        })
+        .catch(() => { /* overlay is optional */ });
+}
+
 // Auto-init on load (works whether scripts load before/after DOMContentLoaded)
 if (document.readyState === 'loading') {
     document.addEventListener('DOMContentLoaded', () => window.initMapPicker());